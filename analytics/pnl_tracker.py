@@ -1,3 +1,8 @@
+from dataclasses import dataclass
+import numpy as np
+
+_DIRECTION_SIGN = {'long': 1.0, 'short': -1.0}
+
 def calculate_position_pnl(entry_price: float, current_price: float, size: float, direction: str) -> float:
     """
     Calculate realized/unrealized P&L for a position.
@@ -20,21 +25,46 @@ def calculate_hedge_effectiveness(spot_pnl: float, hedge_pnl: float) -> float:
         return 0.0
     return (hedge_pnl / total_pnl) * 100
 
-def compute_portfolio_pnl(portfolio: list, market_prices: dict) -> dict:
-    spot_pnl = 0
-    hedge_pnl = 0
-    for pos in portfolio:
-        symbol = pos['symbol']
-        typ = pos['type']
-        entry = pos['entry_price']
-        curr = pos.get('current_price', market_prices.get(symbol, entry))
-        size = pos['size']
-        direction = pos['direction']
-        pnl = calculate_position_pnl(entry, curr, size, direction)
-        if typ == 'spot':
-            spot_pnl += pnl
-        else:
-            hedge_pnl += pnl
+@dataclass
+class Portfolio:
+    """
+    Positions as parallel arrays: one entry per leg.
+    direction_sign is +1 for long, -1 for short; is_hedge marks non-spot legs.
+    """
+    entry: np.ndarray
+    current: np.ndarray
+    size: np.ndarray
+    direction_sign: np.ndarray
+    is_hedge: np.ndarray
+
+    @classmethod
+    def from_dicts(cls, portfolio: list, market_prices: dict) -> 'Portfolio':
+        entry = [pos['entry_price'] for pos in portfolio]
+        current = [pos.get('current_price', market_prices.get(pos['symbol'], e)) for pos, e in zip(portfolio, entry)]
+        try:
+            sign = [_DIRECTION_SIGN[pos['direction']] for pos in portfolio]
+        except KeyError:
+            raise ValueError('direction must be "long" or "short"')
+        return cls(
+            entry=np.asarray(entry, dtype=np.float64),
+            current=np.asarray(current, dtype=np.float64),
+            size=np.asarray([pos['size'] for pos in portfolio], dtype=np.float64),
+            direction_sign=np.asarray(sign, dtype=np.float64),
+            is_hedge=np.asarray([pos['type'] != 'spot' for pos in portfolio], dtype=bool),
+        )
+
+    def position_pnl(self) -> np.ndarray:
+        return self.direction_sign * (self.current - self.entry) * self.size
+
+def compute_portfolio_pnl(portfolio, market_prices: dict = None) -> dict:
+    """
+    Accepts a Portfolio or a list of position dicts (converted once via Portfolio.from_dicts).
+    """
+    if not isinstance(portfolio, Portfolio):
+        portfolio = Portfolio.from_dicts(portfolio, market_prices or {})
+    pnl = portfolio.position_pnl()
+    spot_pnl = float(pnl[~portfolio.is_hedge].sum())
+    hedge_pnl = float(pnl[portfolio.is_hedge].sum())
     total_pnl = spot_pnl + hedge_pnl
     effectiveness = calculate_hedge_effectiveness(spot_pnl, hedge_pnl)
     return {
@@ -1,17 +1,88 @@
 import numpy as np
 import pandas as pd
-from scipy.stats import linregress
-from typing import List, Dict
+import os
+from functools import lru_cache
+from typing import List, Dict, Union
+from risk_engine.risk_metrics import calculate_greeks_batch
 
-def calculate_portfolio_delta(positions: List[Dict]) -> float:
-    return sum(p.get('delta', 0) * p.get('size', 1) for p in positions)
+try:
+    import pyarrow.csv as pacsv
+    import pyarrow.compute as pc
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
 
-def calculate_portfolio_greeks(positions: List[Dict]) -> Dict[str, float]:
-    total = {'delta': 0, 'gamma': 0, 'vega': 0, 'theta': 0}
-    for p in positions:
-        for greek in total:
-            total[greek] += p.get(greek, 0) * p.get('size', 1)
-    return total
+try:
+    import cupy as cp
+    HAS_CUPY = True
+except ImportError:
+    HAS_CUPY = False
+
+GREEKS = ('delta', 'gamma', 'vega', 'theta')
+
+class GreeksPortfolio:
+    """
+    Option positions stacked into a (N, 4) greeks matrix and a size vector.
+    The matrix is built lazily and rebuilt only after set_positions() bumps the version.
+    """
+    def __init__(self, positions: List[Dict]):
+        self.version = 0
+        self.set_positions(positions)
+
+    def set_positions(self, positions: List[Dict]):
+        self.positions = positions
+        self.version += 1
+        self._matrix_version = None
+
+    def to_greeks_matrix(self):
+        """
+        Returns (greeks_mat (N, 4) in GREEKS order, sizes (N,)).
+        """
+        if self._matrix_version != self.version:
+            self._greeks_mat = np.array([[p.get(g, 0) for g in GREEKS] for p in self.positions],
+                                        dtype=np.float64).reshape(-1, len(GREEKS))
+            self._sizes = np.array([p.get('size', 1) for p in self.positions], dtype=np.float64)
+            self._matrix_version = self.version
+        return self._greeks_mat, self._sizes
+
+def _as_greeks_portfolio(positions: Union[List[Dict], GreeksPortfolio]) -> GreeksPortfolio:
+    return positions if isinstance(positions, GreeksPortfolio) else GreeksPortfolio(positions)
+
+def calculate_portfolio_delta(positions: Union[List[Dict], GreeksPortfolio]) -> float:
+    greeks_mat, sizes = _as_greeks_portfolio(positions).to_greeks_matrix()
+    return float(sizes @ greeks_mat[:, 0])
+
+def calculate_portfolio_greeks(positions: Union[List[Dict], GreeksPortfolio]) -> Dict[str, float]:
+    greeks_mat, sizes = _as_greeks_portfolio(positions).to_greeks_matrix()
+    totals = np.einsum('i,ij->j', sizes, greeks_mat)
+    return dict(zip(GREEKS, totals.tolist()))
+
+# --- Greeks on a spot grid ---
+def calculate_portfolio_greeks_grid(positions: List[Dict], S_grid: np.ndarray) -> np.ndarray:
+    """
+    Portfolio greeks at each spot in S_grid, shape (len(S_grid), 4) in GREEKS order.
+    Positions follow the risk_engine schema: option legs carry K, T, r, sigma, option_type
+    and position_size; any other leg adds position_size to delta. Vega is per 1 vol point,
+    theta per day, matching risk_engine.risk_metrics.
+    """
+    options = [p for p in positions if p.get('type') == 'option']
+    linear_delta = float(sum(p.get('position_size', 1) for p in positions if p.get('type') != 'option'))
+    # Grid spots down the rows, option legs across the columns, priced in one batched pass
+    greeks = calculate_greeks_batch(
+        np.asarray(S_grid, dtype=np.float64)[:, None],
+        *(np.array([p[f] for p in options], dtype=np.float64) for f in ('K', 'T', 'r', 'sigma')),
+        np.array([p['option_type'] == 'call' for p in options], dtype=bool),
+    )
+    sizes = np.array([p.get('position_size', 1) for p in options], dtype=np.float64)
+    greeks_mat = np.column_stack([greeks[g] @ sizes for g in GREEKS])
+    greeks_mat[:, 0] += linear_delta
+    return greeks_mat
+
+def interpolate_portfolio_greeks(S_now: float, S_grid: np.ndarray, greeks_mat: np.ndarray) -> Dict[str, float]:
+    """
+    Per-tick greeks from a precomputed grid by linear interpolation in spot.
+    """
+    return {g: float(np.interp(S_now, S_grid, greeks_mat[:, k])) for k, g in enumerate(GREEKS)}
 
 def calculate_portfolio_var(price_history: np.ndarray, weights: np.ndarray, confidence: float = 0.95) -> float:
     returns = np.diff(np.log(price_history), axis=0)
@@ -21,41 +92,78 @@ def calculate_portfolio_var(price_history: np.ndarray, weights: np.ndarray, conf
     var = abs(np.percentile(port_returns, (1-confidence)*100))
     return var
 
-def calculate_max_drawdown(price_series: List[float]) -> float:
-    arr = np.array(price_series)
+def calculate_max_drawdown(price_series: Union[np.ndarray, List[float]]) -> float:
+    arr = np.asarray(price_series, dtype=np.float64)
     roll_max = np.maximum.accumulate(arr)
-    drawdown = (arr - roll_max) / roll_max
-    return abs(drawdown.min())
-
-def calculate_pnl_attribution(positions: List[Dict], current_prices: Dict[str, float]) -> Dict[str, float]:
-    pnl = {}
-    for p in positions:
-        symbol = p['instrument_name']
-        entry = p.get('entry_price', current_prices.get(symbol, 0))
-        exit = current_prices.get(symbol, entry)
-        size = p.get('size', 1)
-        side = p.get('side', 'buy')
-        pnl[symbol] = (exit - entry) * size if side == 'buy' else (entry - exit) * size
-    return pnl
-
-def calculate_asset_correlation(price_dict: Dict[str, List[float]]) -> pd.DataFrame:
-    df = pd.DataFrame(price_dict)
-    return df.pct_change().corr()
+    return float(((roll_max - arr) / roll_max).max())
+
+def calculate_max_drawdown_batch(price_matrix: np.ndarray) -> np.ndarray:
+    """
+    Max drawdown of each column of a (T, N) price matrix.
+    """
+    arr = np.asarray(price_matrix, dtype=np.float64)
+    roll_max = np.maximum.accumulate(arr, axis=0)
+    return ((roll_max - arr) / roll_max).max(axis=0)
+
+class AttributionBook:
+    """
+    Position set pre-split into arrays for repeated calculate_pnl_attribution calls.
+    Missing entry prices are stored as NaN and resolved against current prices per call.
+    """
+    def __init__(self, positions: List[Dict]):
+        self.symbols = [p['instrument_name'] for p in positions]
+        self.entry = np.array([p.get('entry_price', np.nan) for p in positions], dtype=np.float64)
+        self.size = np.array([p.get('size', 1) for p in positions], dtype=np.float64)
+        self.sign = np.where(np.array([p.get('side', 'buy') for p in positions]) == 'buy', 1.0, -1.0)
+
+    def pnl(self, current_prices: Dict[str, float]) -> np.ndarray:
+        current = np.array([current_prices.get(s, np.nan) for s in self.symbols], dtype=np.float64)
+        entry = np.where(np.isnan(self.entry), np.nan_to_num(current, nan=0.0), self.entry)
+        exit = np.where(np.isnan(current), entry, current)
+        return self.sign * (exit - entry) * self.size + 0.0  # + 0.0 folds -0.0 from short legs
+
+def calculate_pnl_attribution(positions: Union[List[Dict], AttributionBook], current_prices: Dict[str, float]) -> Dict[str, float]:
+    book = positions if isinstance(positions, AttributionBook) else AttributionBook(positions)
+    return dict(zip(book.symbols, book.pnl(current_prices).tolist()))
+
+def calculate_asset_correlation(price_dict: Dict[str, List[float]], use_gpu: bool = False) -> pd.DataFrame:
+    cols = list(price_dict)
+    mat = np.asarray([price_dict[c] for c in cols], dtype=np.float64).T
+    rets = mat[1:] / mat[:-1] - 1.0
+    if use_gpu and HAS_CUPY:
+        corr = cp.asnumpy(cp.corrcoef(cp.asarray(rets), rowvar=False))
+    else:
+        corr = np.corrcoef(rets, rowvar=False)
+    return pd.DataFrame(np.atleast_2d(corr), index=cols, columns=cols)
 
 def calculate_beta(asset_returns: np.ndarray, benchmark_returns: np.ndarray) -> float:
-    slope, _, _, _, _ = linregress(benchmark_returns, asset_returns)
-    return slope
-
-def simulate_market_shock(positions: List[Dict], price_drop: float) -> Dict:
-    shocked = []
-    for p in positions:
-        shocked_price = p['S'] * (1 + price_drop)
-        shocked_pos = p.copy()
-        shocked_pos['S'] = shocked_price
-        shocked.append(shocked_pos)
+    # OLS slope of asset on benchmark: cov(a, b) / var(b)
+    a = np.asarray(asset_returns, dtype=np.float64)
+    b = np.asarray(benchmark_returns, dtype=np.float64)
+    a = a - a.mean()
+    b = b - b.mean()
+    return float(a @ b) / float(b @ b)
+
+def simulate_market_shock_batch(S: np.ndarray, drops: np.ndarray) -> np.ndarray:
+    """
+    Shocked spot prices for every (drop, position) pair: returns shape (K, N).
+    """
+    S = np.asarray(S, dtype=np.float64)
+    drops = np.atleast_1d(np.asarray(drops, dtype=np.float64))
+    return S[None, :] * (1.0 + drops[:, None])
+
+def simulate_market_shock(positions: List[Dict], price_drop: float, as_dicts: bool = False) -> Dict:
+    """
+    Returns {'shocked_S': array of shocked spots}, or the legacy
+    {'shocked_positions': [...]} copies when as_dicts=True.
+    """
+    S = np.array([p['S'] for p in positions], dtype=np.float64)
+    shocked_S = simulate_market_shock_batch(S, price_drop)[0]
+    if not as_dicts:
+        return {'shocked_S': shocked_S}
     # Recalculate greeks (assume functions available)
     # For demo, just return shocked positions
-    return {'shocked_positions': shocked}
+    return {'shocked_positions': [{**p, 'S': s} for p, s in zip(positions, shocked_S.tolist())]}
 
 def calculate_realized_pnl(entry_price, exit_price, size, side):
     if side == 'buy':
@@ -63,11 +171,17 @@ def calculate_realized_pnl(entry_price, exit_price, size, side):
     else:
         return (entry_price - exit_price) * size
 
+@lru_cache(maxsize=32)
+def _sum_cost_column(file_path: str, mtime: float) -> float:
+    # mtime is part of the cache key so an appended log is re-read
+    if HAS_PYARROW:
+        table = pacsv.read_csv(
+            file_path,
+            convert_options=pacsv.ConvertOptions(include_columns=['cost'], include_missing_columns=True),
+        )
+        return float(pc.sum(table['cost']).as_py() or 0.0)
+    df = pd.read_csv(file_path, usecols=lambda c: c == 'cost')
+    return float(pd.to_numeric(df['cost']).sum()) if 'cost' in df else 0.0
+
 def get_hedging_costs_from_log(file_path: str) -> float:
-    import csv
-    total_cost = 0
-    with open(file_path, 'r') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            total_cost += float(row.get('cost', 0))
-    return total_cost
+    return _sum_cost_column(file_path, os.path.getmtime(file_path))
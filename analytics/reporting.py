@@ -1,61 +1,204 @@
 import os
+import io
 import csv
+import json
+import atexit
 import sqlite3
 import datetime
-import matplotlib.pyplot as plt
+import threading
 from typing import List, Dict, Optional
+from analytics.hedge_ring import HedgeRing
 
 DB_PATH = "hedge_logs.db"
 CSV_PATH = "hedge_logs.csv"
+RING_PATH = "hedge_logs.ring"
+
+# Rows are buffered in memory and written with one executemany per batch, at the latest
+# FLUSH_INTERVAL_S after the first buffered row
+FLUSH_ROWS = 128
+FLUSH_INTERVAL_S = 1.0
+
+_conn: Optional[sqlite3.Connection] = None
+_csv_fh = None
+_ring: Optional[HedgeRing] = None
+_buffer: List[tuple] = []
+_detail_buffer: List[tuple] = []
+_flush_timer: Optional[threading.Timer] = None
+_lock = threading.Lock()
+
+# One off-screen figure is reused for every saved chart instead of a new pyplot figure per call
+_fig = None
+# Line and metric currently drawn on _fig, so a repeat chart of the same metric only swaps line data
+_line = None
+_line_metric = None
+_plot_lock = threading.Lock()
+CHART_DPI = 90
+
+def _get_conn() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(DB_PATH, isolation_level=None, check_same_thread=False)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute("PRAGMA synchronous=NORMAL")
+        _conn.execute('''CREATE TABLE IF NOT EXISTS hedge_logs (
+            asset TEXT, size REAL, price REAL, cost REAL, timestamp TEXT, strategy TEXT, status TEXT
+        )''')
+        _conn.execute("CREATE INDEX IF NOT EXISTS idx_asset_ts ON hedge_logs(asset, timestamp)")
+        # Full execution dicts (JSON) for last-hedge lookups; asset is stored upper-cased
+        _conn.execute('''CREATE TABLE IF NOT EXISTS hedge_details (
+            asset TEXT, timestamp TEXT, details TEXT
+        )''')
+        _conn.execute("CREATE INDEX IF NOT EXISTS idx_details_asset_ts ON hedge_details(asset, timestamp)")
+    return _conn
+
+def _get_csv():
+    global _csv_fh
+    if _csv_fh is None:
+        _csv_fh = open(CSV_PATH, mode='a', newline='')
+    return _csv_fh
+
+def _get_ring() -> HedgeRing:
+    global _ring
+    if _ring is None:
+        _ring = HedgeRing(RING_PATH)
+    return _ring
+
+def _flush_locked():
+    global _flush_timer
+    if _flush_timer is not None:
+        _flush_timer.cancel()
+        _flush_timer = None
+    if not _buffer:
+        return
+    conn = _get_conn()
+    conn.execute("BEGIN")
+    conn.executemany('''INSERT INTO hedge_logs (asset, size, price, cost, timestamp, strategy, status)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)''', _buffer)
+    conn.executemany("INSERT INTO hedge_details (asset, timestamp, details) VALUES (?, ?, ?)", _detail_buffer)
+    conn.execute("COMMIT")
+    _buffer.clear()
+    _detail_buffer.clear()
+
+def _flush():
+    """
+    Write any buffered hedge rows to SQLite.
+    """
+    with _lock:
+        _flush_locked()
+
+atexit.register(_flush)
+
+def _arm_flush_timer():
+    # Called with _lock held when the buffer goes from empty to non-empty
+    global _flush_timer
+    _flush_timer = threading.Timer(FLUSH_INTERVAL_S, _flush)
+    _flush_timer.daemon = True
+    _flush_timer.start()
 
 # --- Logging ---
 def log_hedge_execution(details: dict):
     """
     Save hedge execution details to CSV and SQLite DB.
     """
-    # CSV
-    file_exists = os.path.isfile(CSV_PATH)
-    with open(CSV_PATH, mode='a', newline='') as csvfile:
+    row = (details['asset'], details['size'], details['price'], details['cost'], details['timestamp'], details.get('strategy'), details.get('status'))
+    detail_row = (str(details['asset']).upper(), details['timestamp'], json.dumps(details, default=str))
+    with _lock:
+        # CSV
+        csvfile = _get_csv()
         writer = csv.DictWriter(csvfile, fieldnames=list(details.keys()))
-        if not file_exists:
+        if csvfile.tell() == 0:
             writer.writeheader()
         writer.writerow(details)
-    # SQLite
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS hedge_logs (
-        asset TEXT, size REAL, price REAL, cost REAL, timestamp TEXT, strategy TEXT, status TEXT
-    )''')
-    c.execute('''INSERT INTO hedge_logs (asset, size, price, cost, timestamp, strategy, status)
-                 VALUES (?, ?, ?, ?, ?, ?, ?)''',
-              (details['asset'], details['size'], details['price'], details['cost'], details['timestamp'], details['strategy'], details['status']))
-    conn.commit()
-    conn.close()
+        csvfile.flush()
+        # Ring buffer: O(1) newest-per-asset lookups
+        _get_ring().append(details)
+        # SQLite
+        _buffer.append(row)
+        _detail_buffer.append(detail_row)
+        if len(_buffer) >= FLUSH_ROWS:
+            _flush_locked()
+        elif _flush_timer is None:
+            _arm_flush_timer()
+
+def _tail_csv_last(asset: str, chunk_size: int = 8192) -> Optional[Dict]:
+    """
+    Scan CSV_PATH backwards in chunks for the newest row for asset (pre-SQLite logs).
+    """
+    try:
+        with open(CSV_PATH, 'rb') as f:
+            header = next(csv.reader([f.readline().decode('utf-8')]), None)
+            if not header:
+                return None
+            start = f.tell()
+            pos = f.seek(0, os.SEEK_END)
+            tail = b''
+            while pos > start:
+                step = min(chunk_size, pos - start)
+                pos -= step
+                f.seek(pos)
+                tail = f.read(step) + tail
+                lines = tail.split(b'\n')
+                # The first piece may be a partial line unless we've reached the header
+                complete, tail = (lines, b'') if pos == start else (lines[1:], lines[0])
+                for line in reversed(complete):
+                    if not line.strip():
+                        continue
+                    row = dict(zip(header, next(csv.reader(io.StringIO(line.decode('utf-8'))))))
+                    if row.get('asset', '').upper() == asset:
+                        return row
+    except OSError:
+        pass
+    return None
+
+def get_last_hedge_execution(asset: str) -> Optional[Dict]:
+    """
+    Most recent logged hedge for asset (case-insensitive), or None.
+    Served from the mmap ring when it still holds the record (fixed field set:
+    timestamp, asset, exchange, side, size, price, cost, slippage, strategy, status);
+    older hedges fall back to the full JSON details in SQLite.
+    """
+    asset = asset.upper()
+    with _lock:
+        hit = _get_ring().last(asset)
+        if hit is not None:
+            return hit
+        _flush_locked()
+        hit = _get_conn().execute(
+            "SELECT details FROM hedge_details WHERE asset=? ORDER BY timestamp DESC LIMIT 1", (asset,)).fetchone()
+    if hit:
+        return json.loads(hit[0])
+    return _tail_csv_last(asset)
 
 # --- Reporting ---
-def generate_hedge_report(asset: str, timeframe: str = "7d") -> Dict:
+def generate_hedge_report(asset: str, timeframe: str = "7d", include_rows: bool = False) -> Dict:
     """
     Load hedge logs for asset and timeframe, compute stats.
+    Aggregates are computed in SQLite; detail rows are fetched only with include_rows=True.
     """
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
     since = (datetime.datetime.utcnow() - datetime.timedelta(days=int(timeframe.rstrip('d')))).isoformat()
-    c.execute('''SELECT size, cost, price, status, timestamp FROM hedge_logs WHERE asset=? AND timestamp>=?''', (asset, since))
-    rows = c.fetchall()
-    conn.close()
-    total_hedges = len(rows)
-    cum_volume = sum(abs(r[0]) for r in rows)
-    avg_cost = sum(r[1] for r in rows) / total_hedges if total_hedges else 0
+    with _lock:
+        _flush_locked()
+        conn = _get_conn()
+        total_hedges, cum_volume, avg_cost = conn.execute(
+            '''SELECT COUNT(*), COALESCE(SUM(ABS(size)), 0), COALESCE(AVG(cost), 0)
+               FROM hedge_logs WHERE asset=? AND timestamp>=?''', (asset, since)).fetchone()
+        rows = None
+        if include_rows:
+            rows = conn.execute(
+                '''SELECT size, cost, price, status, timestamp FROM hedge_logs WHERE asset=? AND timestamp>=?''',
+                (asset, since)).fetchall()
     avg_slippage = 0  # Placeholder, can be computed if slippage is logged
     effectiveness = 0  # Optional: needs price data
-    return {
+    report = {
         'total_hedges': total_hedges,
         'cumulative_volume': cum_volume,
         'average_cost': avg_cost,
         'average_slippage': avg_slippage,
-        'effectiveness': effectiveness,
-        'rows': rows
+        'effectiveness': effectiveness
     }
+    if include_rows:
+        report['rows'] = rows
+    return report
 
 def generate_portfolio_risk_summary() -> Dict:
     """
@@ -64,19 +207,46 @@ def generate_portfolio_risk_summary() -> Dict:
     # Placeholder: would require risk logs
     return {}
 
+def _get_figure():
+    global _fig
+    if _fig is None:
+        from matplotlib.figure import Figure
+        _fig = Figure(figsize=(10, 4))
+        _fig.add_subplot(1, 1, 1)
+    return _fig
+
+def _draw_metric(ax, times, values, metric: str):
+    line, = ax.plot(times, values, marker='o')
+    ax.set_title(f"{metric.capitalize()} Over Time")
+    ax.set_xlabel("Time")
+    ax.set_ylabel(metric.capitalize())
+    return line
+
 def plot_risk_metrics_over_time(risk_history: List[Dict], metric: str = "delta", out_path: Optional[str] = None):
     """
     Plot risk metric over time and save as PNG.
     """
     times = [r['timestamp'] for r in risk_history]
     values = [r[metric] for r in risk_history]
-    plt.figure(figsize=(10, 4))
-    plt.plot(times, values, marker='o')
-    plt.title(f"{metric.capitalize()} Over Time")
-    plt.xlabel("Time")
-    plt.ylabel(metric.capitalize())
-    plt.tight_layout()
     if out_path:
-        plt.savefig(out_path)
+        global _line, _line_metric
+        with _plot_lock:
+            fig = _get_figure()
+            ax = fig.axes[0]
+            # String timestamps are categorical axes, whose categories would accumulate across updates
+            if _line is not None and _line_metric == metric and times and not isinstance(times[0], str):
+                _line.set_data(times, values)
+                ax.relim()
+                ax.autoscale_view()
+            else:
+                ax.clear()
+                _line, _line_metric = _draw_metric(ax, times, values, metric), metric
+                fig.tight_layout()
+            fig.savefig(out_path, format='png', dpi=CHART_DPI)
     else:
+        import matplotlib.pyplot as plt
+        fig, ax = plt.subplots(figsize=(10, 4))
+        _draw_metric(ax, times, values, metric)
+        fig.tight_layout()
         plt.show()
+        plt.close(fig)
@@ -2,12 +2,42 @@ import os
 import json
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-from typing import Callable, List, Dict, Any
+from typing import Callable, List, Dict, Any, NamedTuple
 from datetime import datetime
+from functools import lru_cache
+from utils.jit import njit, HAS_NUMBA, NumbaError
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+try:
+    import msgpack
+    HAS_MSGPACK = True
+except ImportError:
+    HAS_MSGPACK = False
+
+try:
+    from joblib import Parallel, delayed
+    HAS_JOBLIB = True
+except ImportError:
+    HAS_JOBLIB = False
 
 USE_MOCK = os.getenv("USE_MOCK_BACKTEST", "False").lower() == "true"
 
+FEE_RATE = 0.0005
+SLIPPAGE_RATE = 0.0002
+
+class StrategySpec(NamedTuple):
+    name: str
+    fn: Callable
+    positions: List[Dict] = None
+
+# Reused off-screen figure for plot_results(out_path=...)
+_fig = None
+
 class BacktestEngine:
     def __init__(self, results_dir: str = "backtesting/results"):
         self.results_dir = results_dir
@@ -20,9 +50,8 @@ class BacktestEngine:
         fname = f"mock_{symbol}_{timeframe}.csv" if USE_MOCK else f"{symbol}_{timeframe}.csv"
         path = os.path.join(self.results_dir, "..", fname)
         if os.path.exists(path):
-            df = pd.read_csv(path, parse_dates=[0])
-            df.columns = [c.lower() for c in df.columns]
-            return df
+            # Parsed frames are cached per file version; hand out a copy so callers can't mutate the cache
+            return _load_price_csv(os.path.abspath(path), os.path.getmtime(path)).copy()
         # Fallback: generate mock data
         n = 24 * 7 if timeframe == "1h" else 30
         price = np.cumprod(1 + 0.01 * np.random.randn(n)) * 30000
@@ -30,10 +59,82 @@ class BacktestEngine:
         df = pd.DataFrame({"timestamp": dt, "close": price})
         return df
 
-    def run_backtest(self, strategy: Callable, positions: List[Dict], price_data: pd.DataFrame, strategy_name: str = "strategy") -> Dict:
+    def run_backtest(self, strategy: Callable, positions: List[Dict], price_data: pd.DataFrame, strategy_name: str = "strategy", vectorized: bool = True, fmt: str = "json") -> Dict:
         """
         Simulate applying the given strategy over time.
+        Results are saved as results_dir/<strategy_name>.json, or .mpk with fmt="msgpack".
+        With vectorized=True, strategies registered in VECTORIZED_STRATEGIES run as
+        whole-array NumPy passes and those in STEP_STRATEGIES run in a Numba kernel;
+        anything else (or a failed JIT compile) uses the per-step loop.
+        """
+        result = None
+        strategy_vec = VECTORIZED_STRATEGIES.get(strategy) if vectorized else None
+        step_fn = STEP_STRATEGIES.get(strategy) if vectorized and HAS_NUMBA else None
+        if strategy_vec is not None:
+            result = self._run_vectorized(strategy_vec, positions, price_data)
+        elif step_fn is not None:
+            try:
+                result = self._run_jit(step_fn, price_data)
+            except NumbaError:
+                # Step function is not Numba-compilable; runtime errors still propagate
+                result = None
+        if result is None:
+            result = self._run_loop(strategy, positions, price_data)
+        self._save_result(result, strategy_name, fmt)
+        return result
+
+    def run_sweep(self, strategy_specs: List[StrategySpec], price_data: pd.DataFrame, n_jobs: int = -1, fmt: str = "json") -> List[Dict]:
         """
+        Run independent backtests in parallel worker processes (joblib/loky).
+        Large arrays in price_data are memory-mapped read-only into the workers.
+        Falls back to a sequential loop when joblib is not installed.
+        """
+        if not HAS_JOBLIB or n_jobs == 1:
+            return [self.run_backtest(spec.fn, spec.positions or [], price_data, spec.name, fmt=fmt) for spec in strategy_specs]
+        return Parallel(n_jobs=n_jobs, backend='loky', mmap_mode='r')(
+            delayed(self.run_backtest)(spec.fn, spec.positions or [], price_data, spec.name, fmt=fmt)
+            for spec in strategy_specs
+        )
+
+    def _save_result(self, result: Dict, strategy_name: str, fmt: str = "json"):
+        if fmt == "msgpack":
+            if not HAS_MSGPACK:
+                raise ImportError("msgpack is required for fmt='msgpack'")
+            out_path = os.path.join(self.results_dir, f"{strategy_name}.mpk")
+            with open(out_path, "wb") as f:
+                f.write(msgpack.packb(result, default=str))
+        elif fmt != "json":
+            raise ValueError(f"Unsupported result format: {fmt}")
+        elif HAS_ORJSON:
+            out_path = os.path.join(self.results_dir, f"{strategy_name}.json")
+            with open(out_path, "wb") as f:
+                f.write(orjson.dumps(result, default=str, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_INDENT_2))
+        else:
+            out_path = os.path.join(self.results_dir, f"{strategy_name}.json")
+            with open(out_path, "w") as f:
+                json.dump(result, f, indent=2, default=str)
+
+    def _run_vectorized(self, strategy_vec: Callable, positions: List[Dict], price_data: pd.DataFrame) -> Dict:
+        price = price_data['close'].to_numpy(dtype=np.float64)
+        hedge_size = np.asarray(strategy_vec(price, positions), dtype=np.float64)
+        position = np.cumsum(hedge_size)
+        costs = np.abs(hedge_size) * price * (FEE_RATE + SLIPPAGE_RATE)
+        cash = -np.cumsum(costs)
+        mtm = position * (price - price[0])
+        equity = cash + mtm
+        # Running peak starts at 0, same as the step loop
+        drawdowns = np.maximum(np.maximum.accumulate(equity), 0) - equity
+        return _build_result(hedge_size, equity, position, drawdowns, costs)
+
+    def _run_jit(self, step_fn: Callable, price_data: pd.DataFrame) -> Dict:
+        jitted = _JITTED_STEPS.get(step_fn)
+        if jitted is None:
+            jitted = _JITTED_STEPS[step_fn] = njit(step_fn)
+        price = price_data['close'].to_numpy(dtype=np.float64)
+        hedge_size, equity, position, drawdowns, costs = _run_backtest_with_strategy(price, jitted, FEE_RATE, SLIPPAGE_RATE)
+        return _build_result(hedge_size, equity, position, drawdowns, costs)
+
+    def _run_loop(self, strategy: Callable, positions: List[Dict], price_data: pd.DataFrame) -> Dict:
         pnl_curve = []
         hedge_costs = []
         exposures = []
@@ -43,6 +144,7 @@ class BacktestEngine:
         position = 0
         max_equity = 0
         equity_curve = []
+        baseline = float(price_data['close'].iat[0]) if len(price_data) else 0.0
         for i, row in price_data.iterrows():
             step_data = row.to_dict()
             # Apply strategy
@@ -52,13 +154,13 @@ class BacktestEngine:
             price = step_data.get('close', step_data.get('price', 0))
             if action.get('hedge'):
                 hedge_size = action['hedge_size']
-                cost = abs(hedge_size) * price * 0.0005  # fee
-                slippage = abs(hedge_size) * price * 0.0002
+                cost = abs(hedge_size) * price * FEE_RATE  # fee
+                slippage = abs(hedge_size) * price * SLIPPAGE_RATE
                 cash -= cost + slippage
                 hedge_costs.append(cost + slippage)
                 position += hedge_size
             # Mark-to-market PnL
-            mtm = position * (price - price_data.iloc[0]['close'])
+            mtm = position * (price - baseline)
             equity = cash + mtm
             pnl_curve.append(equity)
             exposures.append(position)
@@ -69,7 +171,7 @@ class BacktestEngine:
         # VaR (historical)
         returns = pd.Series(pnl_curve).diff().dropna()
         var_95 = np.percentile(returns, 5)
-        result = {
+        return {
             'pnl_curve': pnl_curve,
             'hedge_costs': hedge_costs,
             'exposures': exposures,
@@ -78,11 +180,6 @@ class BacktestEngine:
             'final_pnl': pnl_curve[-1] if pnl_curve else 0,
             'actions': actions
         }
-        # Save results
-        out_path = os.path.join(self.results_dir, f"{strategy_name}.json")
-        with open(out_path, "w") as f:
-            json.dump(result, f, indent=2, default=str)
-        return result
 
     def apply_strategy_at_step(self, step_data: Dict, current_position: float, strategy_func: Callable) -> Dict:
         """
@@ -90,25 +187,112 @@ class BacktestEngine:
         """
         return strategy_func(step_data, current_position)
 
-    def plot_results(self, result: Dict, price_data: pd.DataFrame, strategy_name: str = "strategy"):
-        plt.figure(figsize=(12, 8))
-        plt.subplot(3, 1, 1)
-        plt.plot(price_data['timestamp'], price_data['close'], label='Price')
-        plt.title(f"{strategy_name} - Price & Hedge Actions")
-        for i, a in enumerate(result['actions']):
-            if a.get('hedge'):
-                plt.scatter(price_data['timestamp'].iloc[i], price_data['close'].iloc[i], color='red', marker='^')
-        plt.legend()
-        plt.subplot(3, 1, 2)
-        plt.plot(price_data['timestamp'], result['pnl_curve'], label='PnL')
-        plt.title("PnL Curve")
-        plt.legend()
-        plt.subplot(3, 1, 3)
-        plt.plot(price_data['timestamp'], result['exposures'], label='Exposure')
-        plt.title("Delta Exposure Over Time")
-        plt.legend()
-        plt.tight_layout()
-        plt.show()
+    def plot_results(self, result: Dict, price_data: pd.DataFrame, strategy_name: str = "strategy", out_path: str = None):
+        """
+        Show the price/PnL/exposure panels, or render them off-screen to out_path.
+        """
+        if out_path:
+            global _fig
+            if _fig is None:
+                from matplotlib.figure import Figure
+                _fig = Figure(figsize=(12, 8))
+                _fig.subplots(3, 1)
+            fig = _fig
+            for ax in fig.axes:
+                ax.clear()
+            _draw_results(fig.axes, result, price_data, strategy_name)
+            fig.tight_layout()
+            fig.savefig(out_path)
+        else:
+            import matplotlib.pyplot as plt
+            fig, axes = plt.subplots(3, 1, figsize=(12, 8))
+            _draw_results(axes, result, price_data, strategy_name)
+            fig.tight_layout()
+            plt.show()
+            plt.close(fig)
+
+def _draw_results(axes, result: Dict, price_data: pd.DataFrame, strategy_name: str):
+    ts = price_data['timestamp'].to_numpy()
+    close = price_data['close'].to_numpy()
+    hedged = np.array([a.get('hedge', False) for a in result['actions']], dtype=bool)
+    axes[0].plot(ts, close, label='Price')
+    axes[0].set_title(f"{strategy_name} - Price & Hedge Actions")
+    axes[0].scatter(ts[hedged], close[hedged], color='red', marker='^')
+    axes[0].legend()
+    axes[1].plot(ts, result['pnl_curve'], label='PnL')
+    axes[1].set_title("PnL Curve")
+    axes[1].legend()
+    axes[2].plot(ts, result['exposures'], label='Exposure')
+    axes[2].set_title("Delta Exposure Over Time")
+    axes[2].legend()
+
+@lru_cache(maxsize=32)
+def _load_price_csv(path: str, mtime: float) -> pd.DataFrame:
+    df = pd.read_csv(path, parse_dates=[0])
+    df.columns = df.columns.str.lower()
+    return df
+
+def _build_result(hedge_size: np.ndarray, equity: np.ndarray, position: np.ndarray, drawdowns: np.ndarray, costs: np.ndarray) -> Dict:
+    hedged = hedge_size != 0
+    var_95 = np.percentile(np.diff(equity), 5)
+    return {
+        'pnl_curve': equity.tolist(),
+        'hedge_costs': costs[hedged].tolist(),
+        'exposures': position.tolist(),
+        'drawdowns': drawdowns.tolist(),
+        'VaR_95': var_95,
+        'final_pnl': float(equity[-1]) if equity.size else 0,
+        'actions': [{'hedge': bool(h), 'hedge_size': float(s)} for h, s in zip(hedged, hedge_size)]
+    }
+
+# --- Compiled kernels ---
+@njit(fastmath=True, cache=True)
+def _run_backtest_kernel(close, hedge_sizes, fee, slip):
+    """
+    Single pass over precomputed hedge sizes: returns equity, exposure,
+    drawdown and per-step hedge cost arrays.
+    """
+    n = close.shape[0]
+    pnl_curve = np.empty(n)
+    exposures = np.empty(n)
+    drawdowns = np.empty(n)
+    hedge_costs = np.zeros(n)
+    cash = 0.0
+    position = 0.0
+    max_equity = 0.0
+    base = close[0]
+    for i in range(n):
+        h = hedge_sizes[i]
+        if h != 0.0:
+            cost = abs(h) * close[i] * (fee + slip)
+            cash -= cost
+            hedge_costs[i] = cost
+            position += h
+        equity = cash + position * (close[i] - base)
+        if equity > max_equity:
+            max_equity = equity
+        pnl_curve[i] = equity
+        exposures[i] = position
+        drawdowns[i] = max_equity - equity
+    return pnl_curve, exposures, drawdowns, hedge_costs
+
+@njit
+def _run_backtest_with_strategy(close, step_fn, fee, slip):
+    """
+    Drive a jitted step_fn(price, current_position) -> hedge_size over the
+    close series, then account for the resulting hedges.
+    """
+    n = close.shape[0]
+    hedge_sizes = np.zeros(n)
+    position = 0.0
+    for i in range(n):
+        h = step_fn(close[i], position)
+        hedge_sizes[i] = h
+        position += h
+    pnl_curve, exposures, drawdowns, hedge_costs = _run_backtest_kernel(close, hedge_sizes, fee, slip)
+    return hedge_sizes, pnl_curve, exposures, drawdowns, hedge_costs
+
+_JITTED_STEPS: Dict[Callable, Callable] = {}
 
 # --- Example/test strategies ---
 def delta_neutral_strategy(step_data: Dict, positions: List[Dict], current_position: float) -> Dict:
@@ -121,6 +305,31 @@ def delta_neutral_strategy(step_data: Dict, positions: List[Dict], current_posit
 def no_hedge_strategy(step_data: Dict, positions: List[Dict], current_position: float) -> Dict:
     return {'hedge': False, 'hedge_size': 0}
 
+# --- Vectorized equivalents: (close prices, positions) -> hedge size per step ---
+def delta_neutral_strategy_vec(price: np.ndarray, positions: List[Dict]) -> np.ndarray:
+    # Trade the difference between consecutive target positions
+    target = np.zeros_like(price)
+    hedge_size = np.diff(target, prepend=0.0)
+    hedge_size[np.abs(hedge_size) <= 1e-4] = 0.0
+    return hedge_size
+
+def no_hedge_strategy_vec(price: np.ndarray, positions: List[Dict]) -> np.ndarray:
+    return np.zeros_like(price)
+
+VECTORIZED_STRATEGIES: Dict[Callable, Callable] = {
+    delta_neutral_strategy: delta_neutral_strategy_vec,
+    no_hedge_strategy: no_hedge_strategy_vec,
+}
+
+# --- Scalar step equivalents: (price, current_position) -> hedge size, Numba-compilable ---
+def delta_neutral_step(price: float, current_position: float) -> float:
+    hedge_size = -current_position
+    return hedge_size if abs(hedge_size) > 1e-4 else 0.0
+
+STEP_STRATEGIES: Dict[Callable, Callable] = {
+    delta_neutral_strategy: delta_neutral_step,
+}
+
 # --- Unit Test ---
 def _unit_test():
     engine = BacktestEngine()
@@ -128,6 +337,22 @@ def _unit_test():
     positions = []
     res1 = engine.run_backtest(delta_neutral_strategy, positions, price_data, 'delta_neutral')
     res2 = engine.run_backtest(no_hedge_strategy, positions, price_data, 'no_hedge')
+    res_loop = engine.run_backtest(delta_neutral_strategy, positions, price_data, 'delta_neutral_loop', vectorized=False)
+    assert np.allclose(res1['pnl_curve'], res_loop['pnl_curve']), "Vectorized and loop backtests should agree"
+    if HAS_NUMBA:
+        res_jit = engine._run_jit(delta_neutral_step, price_data)
+        assert np.allclose(res_jit['pnl_curve'], res_loop['pnl_curve']), "JIT and loop backtests should agree"
+        assert res_jit['actions'] == [{'hedge': a['hedge'], 'hedge_size': float(a['hedge_size'])} for a in res_loop['actions']]
+        # A step that actually trades: open one unit when flat, close it on the next bar
+        def flip_step(price, current_position):
+            return 1.0 if current_position == 0.0 else -current_position
+        def flip_strategy(step_data, positions, current_position):
+            h = flip_step(step_data['close'], current_position)
+            return {'hedge': h != 0.0, 'hedge_size': h}
+        res_jit = engine._run_jit(flip_step, price_data)
+        res_loop = engine._run_loop(flip_strategy, positions, price_data)
+        assert np.allclose(res_jit['pnl_curve'], res_loop['pnl_curve']) and np.allclose(res_jit['drawdowns'], res_loop['drawdowns'])
+        assert np.allclose(res_jit['hedge_costs'], res_loop['hedge_costs'])
     print(f"Delta-neutral final PnL: {res1['final_pnl']:.2f}")
     print(f"No-hedge final PnL: {res2['final_pnl']:.2f}")
     assert res1['final_pnl'] > res2['final_pnl'] or abs(res1['final_pnl']) < 1e-2, "Delta-neutral should outperform or be flat in high vol"
@@ -1,4 +1,15 @@
 import datetime
+from functools import lru_cache
+import numpy as np
+
+@lru_cache(maxsize=16)
+def _threshold_arrays(items: tuple):
+    """
+    Split threshold (key, limit) pairs into parallel key tuple and limit array, once per threshold set.
+    """
+    keys = tuple(k for k, _ in items)
+    limits = np.array([v for _, v in items], dtype=np.float64)
+    return keys, limits
 
 def generate_risk_report(positions, metrics, compliance_thresholds=None, recent_hedges=None):
     """
@@ -8,7 +19,10 @@ def generate_risk_report(positions, metrics, compliance_thresholds=None, recent_
     compliance_thresholds: dict of limits (optional)
     recent_hedges: list of recent hedge dicts (optional)
     """
-    notional = sum(abs(p.get('size', 0)) * p.get('S', 0) for p in positions)
+    n = len(positions)
+    size = np.fromiter((p.get('size', 0) for p in positions), dtype=np.float64, count=n)
+    S = np.fromiter((p.get('S', 0) for p in positions), dtype=np.float64, count=n)
+    notional = float(np.abs(size) @ S)
     report = [
         f"\U0001F4C8 <b>Regulatory Risk Report</b> ({datetime.datetime.utcnow().isoformat()} UTC)",
         f"Notional Exposure: <b>${notional:,.2f}</b>",
@@ -21,9 +35,11 @@ def generate_risk_report(positions, metrics, compliance_thresholds=None, recent_
     # Compliance warnings
     warnings = []
     if compliance_thresholds:
-        for k, v in compliance_thresholds.items():
-            if abs(metrics.get(k, 0)) > v:
-                warnings.append(f"⚠️ {k.upper()} exceeds threshold ({metrics.get(k, 0):.2f} > {v})")
+        keys, limits = _threshold_arrays(tuple(compliance_thresholds.items()))
+        values = np.array([metrics.get(k, 0) for k in keys], dtype=np.float64)
+        exceed = np.abs(values) > limits
+        warnings = [f"⚠️ {k.upper()} exceeds threshold ({metrics.get(k, 0):.2f} > {compliance_thresholds[k]})"
+                    for k, hit in zip(keys, exceed) if hit]
     if warnings:
         report.append("<b>Compliance Warnings:</b>")
         report.extend(warnings)
@@ -1,4 +1,6 @@
 import os
+from functools import lru_cache
+from types import MappingProxyType
 from dotenv import load_dotenv
 
 # Load environment variables from .env.local file
@@ -9,11 +11,11 @@ OKX_BASE_URL = "https://www.okx.com/api/v5"
 BYBIT_BASE_URL = "https://api.bybit.com"
 DERIBIT_BASE_URL = "https://www.deribit.com/api/v2"
 
-# Symbol mapping used for consistency
-SYMBOL_MAPPINGS = {
+# Symbol mapping used for consistency (read-only)
+SYMBOL_MAPPINGS = MappingProxyType({
     "BTC": "BTC-USDT",
     "ETH": "ETH-USDT"
-}
+})
 
 # API Keys (fetched securely from environment variables)
 OKX_API_KEY = os.getenv("OKX_API_KEY", "")
@@ -31,11 +33,13 @@ TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "")
 # --- Bonus: Dynamic strike/expiry optimization toggle ---
 DYNAMIC_STRIKE_EXPIRY_OPTIMIZATION = os.getenv("DYNAMIC_STRIKE_EXPIRY_OPTIMIZATION", "false").lower() == "true"
 
+@lru_cache(maxsize=1)
 def get_config():
     """
-    Returns a config dictionary for use in other modules.
+    Returns a read-only config mapping for use in other modules.
+    Built once per process; environment changes after import are not picked up.
     """
-    return {
+    return MappingProxyType({
         'OKX_API_KEY': OKX_API_KEY,
         'OKX_API_SECRET': OKX_API_SECRET,
         'BYBIT_API_KEY': BYBIT_API_KEY,
@@ -45,4 +49,4 @@ def get_config():
         'TELEGRAM_BOT_TOKEN': TELEGRAM_BOT_TOKEN,
         'DYNAMIC_STRIKE_EXPIRY_OPTIMIZATION': DYNAMIC_STRIKE_EXPIRY_OPTIMIZATION,
         # Add more config values as needed
-    }
+    })
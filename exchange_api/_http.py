@@ -0,0 +1,26 @@
+import httpx
+
+try:
+    import h2  # noqa: F401
+    HAS_H2 = True
+except ImportError:
+    HAS_H2 = False
+
+TIMEOUT = 5.0
+LIMITS = httpx.Limits(max_keepalive_connections=16)
+
+# Shared keep-alive pools for all exchange modules, created on first use
+_client = None
+_async_client = None
+
+def get_client() -> httpx.Client:
+    global _client
+    if _client is None:
+        _client = httpx.Client(http2=HAS_H2, timeout=TIMEOUT, limits=LIMITS)
+    return _client
+
+def get_async_client() -> httpx.AsyncClient:
+    global _async_client
+    if _async_client is None:
+        _async_client = httpx.AsyncClient(http2=HAS_H2, timeout=TIMEOUT, limits=LIMITS)
+    return _async_client
@@ -1,27 +1,69 @@
-import requests
+import asyncio
+import httpx
+from functools import lru_cache
+from typing import Dict, List
 from config import BYBIT_BASE_URL, SYMBOL_MAPPINGS
+from exchange_api._http import get_client, get_async_client
+from exchange_api.order_book import OrderBook
+
+@lru_cache(maxsize=64)
+def _ticker_url(symbol: str) -> str:
+    instrument_id = SYMBOL_MAPPINGS.get(symbol, symbol)
+    return f"{BYBIT_BASE_URL}/v5/market/tickers?category=spot&symbol={instrument_id}"
+
+def _parse_spot(data: dict):
+    if data.get('result') and data['result']['list']:
+        return float(data['result']['list'][0]['lastPrice'])
+    else:
+        return None
+
+@lru_cache(maxsize=64)
+def _book_url(symbol: str, depth: int) -> str:
+    instrument_id = SYMBOL_MAPPINGS.get(symbol, symbol).replace('-', '')
+    return f"{BYBIT_BASE_URL}/v5/market/orderbook?category=spot&symbol={instrument_id}&limit={depth}"
+
+def _parse_book(data: dict):
+    if not data.get('result'):
+        return None
+    return OrderBook.from_levels(data['result'].get('b'), data['result'].get('a'))
 
 def fetch_spot_price(symbol: str):
     """Fetch the spot price for a given symbol from Bybit."""
-    instrument_id = SYMBOL_MAPPINGS.get(symbol, symbol)
-    url = f"{BYBIT_BASE_URL}/v5/market/tickers?category=spot&symbol={instrument_id}"
     try:
-        response = requests.get(url)
+        response = get_client().get(_ticker_url(symbol))
+        response.raise_for_status()
+        return _parse_spot(response.json())
+    except (httpx.HTTPError, ValueError) as e:
+        print(f"Error fetching spot price from Bybit: {e}")
+        return None
+
+async def fetch_spot_price_async(symbol: str):
+    """Async variant of fetch_spot_price on the shared keep-alive client."""
+    try:
+        response = await get_async_client().get(_ticker_url(symbol))
         response.raise_for_status()
-        data = response.json()
-        if data.get('result') and data['result']['list']:
-            return float(data['result']['list'][0]['lastPrice'])
-        else:
-            return None
-    except requests.exceptions.RequestException as e:
+        return _parse_spot(response.json())
+    except (httpx.HTTPError, ValueError) as e:
         print(f"Error fetching spot price from Bybit: {e}")
         return None
 
+async def fetch_spot_prices(symbols: List[str]) -> Dict[str, float]:
+    """Fetch several symbols concurrently."""
+    prices = await asyncio.gather(*(fetch_spot_price_async(s) for s in symbols))
+    return dict(zip(symbols, prices))
+
 def fetch_futures_price(symbol: str):
     pass
 
-def fetch_order_book(symbol: str):
-    pass
+def fetch_order_book(symbol: str, depth: int = 5):
+    """Fetch the top `depth` levels of the Bybit order book as a packed OrderBook."""
+    try:
+        response = get_client().get(_book_url(symbol, depth))
+        response.raise_for_status()
+        return _parse_book(response.json())
+    except (httpx.HTTPError, ValueError, KeyError) as e:
+        print(f"Error fetching order book from Bybit: {e}")
+        return None
 
 def fetch_open_positions():
     pass
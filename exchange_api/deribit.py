@@ -1,29 +1,69 @@
-import requests
+import asyncio
+import httpx
+from functools import lru_cache
+from typing import Dict, List
 from config import DERIBIT_BASE_URL, SYMBOL_MAPPINGS
+from exchange_api._http import get_client, get_async_client
+from exchange_api.order_book import OrderBook
 
-def fetch_spot_price(symbol: str):
-    """Fetch the spot price for a given symbol from Deribit."""
+@lru_cache(maxsize=64)
+def _ticker_url(symbol: str) -> str:
     # Deribit does not have a direct spot price endpoint, it's primarily a derivatives exchange.
     # We can get the index price which is close to the spot price.
-    instrument_name = f"{symbol.upper()}-PERPETUAL"
-    url = f"{DERIBIT_BASE_URL}/public/get_index_price?index_name={symbol.lower()}_usd"
+    return f"{DERIBIT_BASE_URL}/public/get_index_price?index_name={symbol.lower()}_usd"
+
+def _parse_spot(data: dict):
+    if data.get('result'):
+        return float(data['result']['index_price'])
+    else:
+        return None
+
+@lru_cache(maxsize=64)
+def _book_url(symbol: str, depth: int) -> str:
+    return f"{DERIBIT_BASE_URL}/public/get_order_book?instrument_name={symbol.upper()}-PERPETUAL&depth={depth}"
+
+def _parse_book(data: dict):
+    if not data.get('result'):
+        return None
+    return OrderBook.from_levels(data['result'].get('bids'), data['result'].get('asks'))
+
+def fetch_spot_price(symbol: str):
+    """Fetch the spot price for a given symbol from Deribit."""
     try:
-        response = requests.get(url)
+        response = get_client().get(_ticker_url(symbol))
         response.raise_for_status()
-        data = response.json()
-        if data.get('result'):
-            return float(data['result']['index_price'])
-        else:
-            return None
-    except requests.exceptions.RequestException as e:
+        return _parse_spot(response.json())
+    except (httpx.HTTPError, ValueError) as e:
         print(f"Error fetching index price from Deribit: {e}")
         return None
 
+async def fetch_spot_price_async(symbol: str):
+    """Async variant of fetch_spot_price on the shared keep-alive client."""
+    try:
+        response = await get_async_client().get(_ticker_url(symbol))
+        response.raise_for_status()
+        return _parse_spot(response.json())
+    except (httpx.HTTPError, ValueError) as e:
+        print(f"Error fetching index price from Deribit: {e}")
+        return None
+
+async def fetch_spot_prices(symbols: List[str]) -> Dict[str, float]:
+    """Fetch several symbols concurrently."""
+    prices = await asyncio.gather(*(fetch_spot_price_async(s) for s in symbols))
+    return dict(zip(symbols, prices))
+
 def fetch_futures_price(symbol: str):
     pass
 
-def fetch_order_book(symbol: str):
-    pass
+def fetch_order_book(symbol: str, depth: int = 5):
+    """Fetch the top `depth` levels of the Deribit order book as a packed OrderBook."""
+    try:
+        response = get_client().get(_book_url(symbol, depth))
+        response.raise_for_status()
+        return _parse_book(response.json())
+    except (httpx.HTTPError, ValueError, KeyError) as e:
+        print(f"Error fetching order book from Deribit: {e}")
+        return None
 
 def fetch_open_positions():
     pass
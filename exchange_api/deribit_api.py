@@ -1,8 +1,16 @@
 import os
+import time
 import asyncio
+from datetime import datetime, timezone
 import httpx
 from dotenv import load_dotenv
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple
+
+try:
+    import h2  # enables httpx's HTTP/2 transport (httpx[http2])
+    HAS_HTTP2 = True
+except ImportError:
+    HAS_HTTP2 = False
 
 # Load environment variables
 load_dotenv(dotenv_path=".env.local")
@@ -12,17 +20,46 @@ DERIBIT_CLIENT_ID = os.getenv("DERIBIT_API_KEY")
 DERIBIT_CLIENT_SECRET = os.getenv("DERIBIT_API_SECRET")
 USE_MOCK = os.getenv("USE_MOCK_DERIBIT", "False").lower() == "true"
 
+# Retry with exponential backoff: 0.1s, 0.2s, ... between attempts
+MAX_RETRIES = 3
+BACKOFF_BASE_S = 0.1
+# Re-authenticate this long before the token actually expires
+TOKEN_REFRESH_MARGIN_S = 60
+# One pooled client serves every chat's requests concurrently; with HTTP/2 they share a single connection
+HTTP_MAX_CONNECTIONS = 100
+HTTP_MAX_KEEPALIVE = 20
+
+# Deribit options expire at 08:00 UTC on the date in the instrument name
+EXPIRY_HOUR_UTC = 8
+
+def parse_option_instrument(name: str) -> Tuple[float, float, bool]:
+    """
+    (expiry epoch seconds, strike, is_call) from an option name such as BTC-30AUG24-60000-C.
+    """
+    _, expiry, strike, kind = name.split("-")
+    day = datetime.strptime(expiry, "%d%b%y").replace(hour=EXPIRY_HOUR_UTC, tzinfo=timezone.utc)
+    return day.timestamp(), float(strike), kind == "C"
+
+async def _backoff(attempt: int):
+    if attempt < MAX_RETRIES - 1:
+        await asyncio.sleep(BACKOFF_BASE_S * 2 ** attempt)
+
 class DeribitClient:
     def __init__(self):
         self.base_url = DERIBIT_BASE_URL
         self.client_id = DERIBIT_CLIENT_ID
         self.client_secret = DERIBIT_CLIENT_SECRET
         self.access_token: Optional[str] = None
-        self._client = httpx.AsyncClient()
+        self.token_expires_at = 0.0
+        self._client = httpx.AsyncClient(
+            http2=HAS_HTTP2,
+            limits=httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_MAX_KEEPALIVE),
+        )
 
     async def authenticate(self):
         if USE_MOCK:
             self.access_token = "mock_token"
+            self.token_expires_at = float('inf')
             return
         url = f"{self.base_url}/public/auth"
         params = {
@@ -30,30 +67,39 @@ class DeribitClient:
             "client_id": self.client_id,
             "client_secret": self.client_secret
         }
-        for _ in range(3):
+        for attempt in range(MAX_RETRIES):
             try:
                 resp = await self._client.get(url, params=params, timeout=10)
                 resp.raise_for_status()
-                self.access_token = resp.json()["result"]["access_token"]
+                result = resp.json()["result"]
+                self.access_token = result["access_token"]
+                self.token_expires_at = time.monotonic() + result.get("expires_in", 0)
                 return
             except Exception as e:
-                await asyncio.sleep(1)
+                await _backoff(attempt)
         raise RuntimeError("Failed to authenticate with Deribit API.")
 
+    def is_expired(self, margin_s: float = TOKEN_REFRESH_MARGIN_S) -> bool:
+        return self.access_token is None or time.monotonic() >= self.token_expires_at - margin_s
+
     async def _request(self, endpoint: str, params: dict = None, private: bool = False) -> Dict[str, Any]:
         if USE_MOCK:
             return {"mock": True}
         url = f"{self.base_url}{endpoint}"
-        headers = {}
-        if private and self.access_token:
-            headers["Authorization"] = f"Bearer {self.access_token}"
-        for _ in range(3):
+        for attempt in range(MAX_RETRIES):
+            headers = {}
+            if private and self.access_token:
+                headers["Authorization"] = f"Bearer {self.access_token}"
             try:
                 resp = await self._client.get(url, params=params, headers=headers, timeout=10)
+                if private and resp.status_code == 401:
+                    # Token expired or revoked server-side: refresh it and retry right away
+                    await self.authenticate()
+                    continue
                 resp.raise_for_status()
                 return resp.json()["result"]
             except Exception as e:
-                await asyncio.sleep(1)
+                await _backoff(attempt)
         raise RuntimeError(f"Failed to fetch {endpoint} from Deribit API.")
 
     async def get_orderbook(self, instrument_name: str) -> Dict[str, Any]:
@@ -73,6 +119,11 @@ class DeribitClient:
             return {"equity": 1.0, "available_funds": 0.8}
         return await self._request("/private/get_account_summary", {"currency": currency}, private=True)
 
+    async def get_positions(self, currency: str = "BTC", kind: str = "future") -> List[Dict[str, Any]]:
+        if USE_MOCK:
+            return [{"instrument_name": f"{currency}-PERPETUAL", "kind": "future", "size": 0.0, "delta": 0.0}]
+        return await self._request("/private/get_positions", {"currency": currency, "kind": kind}, private=True)
+
     async def close(self):
         await self._client.aclose()
 
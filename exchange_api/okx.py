@@ -1,27 +1,70 @@
-import requests
+import asyncio
+import httpx
+from functools import lru_cache
+from typing import Dict, List
 from config import OKX_BASE_URL, SYMBOL_MAPPINGS
+from exchange_api._http import get_client, get_async_client
+from exchange_api.order_book import OrderBook
+
+@lru_cache(maxsize=64)
+def _ticker_url(symbol: str) -> str:
+    instrument_id = SYMBOL_MAPPINGS.get(symbol, symbol)
+    return f"{OKX_BASE_URL}/market/ticker?instId={instrument_id}"
+
+def _parse_spot(data: dict):
+    if data['data']:
+        return float(data['data'][0]['last'])
+    else:
+        return None
+
+@lru_cache(maxsize=64)
+def _book_url(symbol: str, depth: int) -> str:
+    instrument_id = SYMBOL_MAPPINGS.get(symbol, symbol)
+    return f"{OKX_BASE_URL}/market/books?instId={instrument_id}&sz={depth}"
+
+def _parse_book(data: dict):
+    if not data.get('data'):
+        return None
+    book = data['data'][0]
+    return OrderBook.from_levels(book['bids'], book['asks'])
 
 def fetch_spot_price(symbol: str):
     """Fetch the spot price for a given symbol from OKX."""
-    instrument_id = SYMBOL_MAPPINGS.get(symbol, symbol)
-    url = f"{OKX_BASE_URL}/market/ticker?instId={instrument_id}"
     try:
-        response = requests.get(url)
-        response.raise_for_status()  # Raise an exception for bad status codes
-        data = response.json()
-        if data['data']:
-            return float(data['data'][0]['last'])
-        else:
-            return None
-    except requests.exceptions.RequestException as e:
+        response = get_client().get(_ticker_url(symbol))
+        response.raise_for_status()
+        return _parse_spot(response.json())
+    except (httpx.HTTPError, ValueError) as e:
         print(f"Error fetching spot price from OKX: {e}")
         return None
 
+async def fetch_spot_price_async(symbol: str):
+    """Async variant of fetch_spot_price on the shared keep-alive client."""
+    try:
+        response = await get_async_client().get(_ticker_url(symbol))
+        response.raise_for_status()
+        return _parse_spot(response.json())
+    except (httpx.HTTPError, ValueError) as e:
+        print(f"Error fetching spot price from OKX: {e}")
+        return None
+
+async def fetch_spot_prices(symbols: List[str]) -> Dict[str, float]:
+    """Fetch several symbols concurrently."""
+    prices = await asyncio.gather(*(fetch_spot_price_async(s) for s in symbols))
+    return dict(zip(symbols, prices))
+
 def fetch_futures_price(symbol: str):
     pass
 
-def fetch_order_book(symbol: str):
-    pass
+def fetch_order_book(symbol: str, depth: int = 5):
+    """Fetch the top `depth` levels of the OKX order book as a packed OrderBook."""
+    try:
+        response = get_client().get(_book_url(symbol, depth))
+        response.raise_for_status()
+        return _parse_book(response.json())
+    except (httpx.HTTPError, ValueError, KeyError) as e:
+        print(f"Error fetching order book from OKX: {e}")
+        return None
 
 def fetch_open_positions():
     pass
@@ -0,0 +1,45 @@
+import time
+import numpy as np
+from typing import NamedTuple, Optional
+
+_EMPTY = np.empty((0, 2), dtype=np.float64)
+
+def _levels(levels) -> np.ndarray:
+    # Exchanges send [price, qty, ...] rows, often as strings; keep the first two columns
+    if levels is None or len(levels) == 0:
+        return _EMPTY
+    return np.ascontiguousarray(np.asarray(levels, dtype=np.float64)[:, :2])
+
+class OrderBook(NamedTuple):
+    """
+    Packed order book: bids and asks are contiguous (N, 2) float64 arrays of
+    [price, qty] rows, best level first; ts is the local receive time (epoch seconds).
+    """
+    bids: np.ndarray
+    asks: np.ndarray
+    ts: float
+
+    @classmethod
+    def from_levels(cls, bids, asks, ts: float = None) -> "OrderBook":
+        return cls(_levels(bids), _levels(asks), time.time() if ts is None else ts)
+
+    def side(self, side: str) -> np.ndarray:
+        """Levels a taker on `side` would hit: asks for 'buy', bids for 'sell'."""
+        return self.asks if side == 'buy' else self.bids
+
+    def __getitem__(self, key):
+        # Dict-style access keeps ob['asks'][0][0] callers working
+        if isinstance(key, str):
+            return getattr(self, key)
+        return tuple.__getitem__(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+def as_order_book(ob) -> Optional[OrderBook]:
+    """
+    Normalize a {'bids': [...], 'asks': [...]} dict (or an OrderBook) to OrderBook; None passes through.
+    """
+    if ob is None or isinstance(ob, OrderBook):
+        return ob
+    return OrderBook.from_levels(ob.get('bids'), ob.get('asks'), ob.get('ts'))
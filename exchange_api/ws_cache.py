@@ -0,0 +1,145 @@
+import json
+import time
+import asyncio
+from typing import Dict, List, Optional, Tuple
+from config import SYMBOL_MAPPINGS
+from exchange_api.order_book import OrderBook
+
+try:
+    import websockets
+    HAS_WEBSOCKETS = True
+except ImportError:
+    HAS_WEBSOCKETS = False
+
+OKX_WS_URL = "wss://ws.okx.com:8443/ws/v5/public"
+BYBIT_WS_URL = "wss://stream.bybit.com/v5/public/spot"
+DERIBIT_WS_URL = "wss://www.deribit.com/ws/api/v2"
+
+# Quotes older than this are treated as missing so callers fall back to REST
+MAX_QUOTE_AGE_S = 2.0
+RECONNECT_MAX_S = 30.0
+# Levels per side in the Deribit book snapshots (OKX books5 streams 5, Bybit orderbook.1 streams 1)
+DERIBIT_BOOK_DEPTH = 10
+
+# --- Per-exchange subscribe messages and parsers ---
+def _okx_inst(symbol: str) -> str:
+    return SYMBOL_MAPPINGS.get(symbol, symbol)
+
+def _bybit_inst(symbol: str) -> str:
+    return SYMBOL_MAPPINGS.get(symbol, symbol).replace('-', '')
+
+def _deribit_inst(symbol: str) -> str:
+    return f"{symbol.upper()}-PERPETUAL"
+
+def _okx_subscribe(symbols: List[str]) -> dict:
+    return {"op": "subscribe", "args": [{"channel": "books5", "instId": _okx_inst(s)} for s in symbols]}
+
+def _bybit_subscribe(symbols: List[str]) -> dict:
+    return {"op": "subscribe", "args": [f"orderbook.1.{_bybit_inst(s)}" for s in symbols]}
+
+def _deribit_subscribe(symbols: List[str]) -> dict:
+    return {"jsonrpc": "2.0", "id": 1, "method": "public/subscribe",
+            "params": {"channels": [f"book.{_deribit_inst(s)}.none.{DERIBIT_BOOK_DEPTH}.100ms" for s in symbols]}}
+
+# Each parser returns (instrument, bids, asks) with [price, qty, ...] rows, best first, or None
+def _okx_parse(msg: dict):
+    if msg.get('arg', {}).get('channel') != 'books5' or not msg.get('data'):
+        return None
+    book = msg['data'][0]
+    if not book.get('bids') or not book.get('asks'):
+        return None
+    return msg['arg']['instId'], book['bids'], book['asks']
+
+def _bybit_parse(msg: dict):
+    if not str(msg.get('topic', '')).startswith('orderbook.') or not msg.get('data'):
+        return None
+    book = msg['data']
+    if not book.get('b') or not book.get('a'):
+        return None
+    return book['s'], book['b'], book['a']
+
+def _deribit_parse(msg: dict):
+    if msg.get('method') != 'subscription':
+        return None
+    book = msg['params']['data']
+    if not book.get('bids') or not book.get('asks'):
+        return None
+    return book['instrument_name'], book['bids'], book['asks']
+
+FEEDS = {
+    'okx': (OKX_WS_URL, _okx_inst, _okx_subscribe, _okx_parse),
+    'bybit': (BYBIT_WS_URL, _bybit_inst, _bybit_subscribe, _bybit_parse),
+    'deribit': (DERIBIT_WS_URL, _deribit_inst, _deribit_subscribe, _deribit_parse),
+}
+
+class TOBCache:
+    """
+    Streaming order book cache: one websocket task per exchange keeps the latest
+    streamed levels as an OrderBook plus a receive time per (exchange, symbol) in memory.
+    """
+    def __init__(self):
+        self._cache: Dict[Tuple[str, str], tuple] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def get(self, exchange: str, symbol: str, size: float = 0.0, side: str = None,
+            max_age_s: float = MAX_QUOTE_AGE_S) -> Optional[OrderBook]:
+        """
+        Fresh streamed book, else None. With size, the book is only served when its streamed
+        levels on `side` (both sides if side is None) hold at least that quantity, since only
+        the top levels are streamed.
+        """
+        hit = self._cache.get((exchange, symbol))
+        if hit is None or time.monotonic_ns() - hit[1] > max_age_s * 1e9:
+            return None
+        book = hit[0]
+        sides = (book.side(side),) if side else (book.bids, book.asks)
+        if size and any(levels[:, 1].sum() < size for levels in sides):
+            return None
+        return book
+
+    def update(self, exchange: str, symbol: str, bids, asks):
+        self._cache[(exchange, symbol)] = (OrderBook.from_levels(bids, asks), time.monotonic_ns())
+
+    @property
+    def running(self) -> bool:
+        return any(not t.done() for t in self._tasks.values())
+
+    def start(self, symbols: List[str], exchanges: List[str] = None):
+        """
+        Start (or restart) the feed tasks on the running event loop.
+        """
+        if not HAS_WEBSOCKETS:
+            raise ImportError("websockets is required for the streaming order book cache")
+        for ex in exchanges or FEEDS:
+            task = self._tasks.get(ex)
+            if task is None or task.done():
+                self._tasks[ex] = asyncio.create_task(self._run(ex, list(symbols)), name=f"tob-{ex}")
+
+    async def stop(self):
+        for task in self._tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        self._tasks.clear()
+
+    async def _run(self, exchange: str, symbols: List[str]):
+        url, to_inst, subscribe, parse = FEEDS[exchange]
+        by_inst = {to_inst(s): s for s in symbols}
+        backoff = 0.5
+        while True:
+            try:
+                async with websockets.connect(url, ping_interval=20) as ws:
+                    await ws.send(json.dumps(subscribe(symbols)))
+                    backoff = 0.5
+                    async for raw in ws:
+                        book = parse(json.loads(raw))
+                        if book and book[0] in by_inst:
+                            self.update(exchange, by_inst[book[0]], *book[1:])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Order book stream for {exchange} dropped: {e}")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, RECONNECT_MAX_S)
+
+# Shared process-wide cache; the bots start it from post_init and stop it on shutdown
+tob_cache = TOBCache()
@@ -1,26 +1,110 @@
 import os
 import time
-import random
-import datetime
+import threading
+import asyncio
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal, ROUND_DOWN
+from typing import Dict, List, Optional, Sequence
 from analytics.reporting import log_hedge_execution
+from utils.clock import fast_utcnow_iso
 from exchange_api.okx import fetch_order_book as okx_order_book
 from exchange_api.bybit import fetch_order_book as bybit_order_book
 from exchange_api.deribit import fetch_order_book as deribit_order_book
+from exchange_api.ws_cache import tob_cache
+from exchange_api.order_book import OrderBook, as_order_book
 
 USE_MOCK = os.getenv("USE_MOCK_EXECUTION", "False").lower() == "true"
 
+# --- Mock Fill Randomness ---
+# Draws are generated in blocks and handed out one at a time instead of one random call per fill
+MOCK_DRAW_BATCH = 4096
+_rng = np.random.default_rng()
+_draw_lock = threading.Lock()
+_draws = None
+_draw_pos = MOCK_DRAW_BATCH
+
+def _next_mock_draw():
+    """
+    Returns (price_offset in [-100, 100], slippage_bps in [5, 20), trade id in [100000, 999999]).
+    """
+    global _draws, _draw_pos
+    with _draw_lock:
+        if _draw_pos >= MOCK_DRAW_BATCH:
+            _draws = (_rng.integers(-100, 101, size=MOCK_DRAW_BATCH).tolist(),
+                      _rng.uniform(5, 20, size=MOCK_DRAW_BATCH).tolist(),
+                      _rng.integers(100000, 1000000, size=MOCK_DRAW_BATCH).tolist())
+            _draw_pos = 0
+        i = _draw_pos
+        _draw_pos += 1
+    return _draws[0][i], _draws[1][i], _draws[2][i]
+
+# --- Order Book Fetching ---
+ORDER_BOOK_FETCHERS = {
+    'okx': okx_order_book,
+    'bybit': bybit_order_book,
+    'deribit': deribit_order_book,
+}
+# Books younger than this are reused instead of refetched
+OB_CACHE_TTL_S = 0.2
+_ob_cache: Dict[tuple, tuple] = {}
+_ob_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="orderbook")
+
+def get_order_book(exchange: str, symbol: str, size: float = 0.0, side: str = None) -> Optional[OrderBook]:
+    """
+    Order book for (exchange, symbol). The streamed book is used when the websocket cache is
+    running and its levels cover `size` on `side`; otherwise REST depth, behind a short TTL cache.
+    """
+    streamed = tob_cache.get(exchange, symbol, size, side)
+    if streamed is not None:
+        return streamed
+    key = (exchange, symbol)
+    now = time.monotonic()
+    hit = _ob_cache.get(key)
+    if hit is not None and now - hit[0] < OB_CACHE_TTL_S:
+        return hit[1]
+    ob = as_order_book(ORDER_BOOK_FETCHERS[exchange](symbol))
+    if ob is not None:
+        _ob_cache[key] = (now, ob)
+    return ob
+
+def fetch_order_books(exchanges: List[str], symbol: str, size: float = 0.0,
+                      side: str = None) -> Dict[str, Optional[OrderBook]]:
+    """
+    Fetch several exchanges' books concurrently; keys keep the order of `exchanges`.
+    """
+    exchanges = [ex for ex in exchanges if ex in ORDER_BOOK_FETCHERS]
+    books = _ob_pool.map(lambda ex: get_order_book(ex, symbol, size, side), exchanges)
+    return dict(zip(exchanges, books))
+
+async def fetch_order_books_async(exchanges: List[str], symbol: str, size: float = 0.0,
+                                  side: str = None) -> Dict[str, Optional[OrderBook]]:
+    exchanges = [ex for ex in exchanges if ex in ORDER_BOOK_FETCHERS]
+    books = await asyncio.gather(*(asyncio.to_thread(get_order_book, ex, symbol, size, side) for ex in exchanges))
+    return dict(zip(exchanges, books))
+
+def _best_price(order_books: Dict[str, Optional[OrderBook]], side: str):
+    venues = [ex for ex, ob in order_books.items() if ob is not None and len(ob.side(side))]
+    if not venues:
+        return None, None
+    tops = np.array([order_books[ex].side(side)[0, 0] for ex in venues], dtype=np.float64)
+    # argmin/argmax return the first venue on ties, as the old scan did
+    i = int(np.argmin(tops) if side == 'buy' else np.argmax(tops))
+    return venues[i], float(tops[i])
+
 # --- Universal Order Execution ---
 def execute_order(exchange: str, symbol: str, side: str, size: float, order_type: str = "market") -> dict:
     '''
     Execute an order and return order execution details.
     '''
-    timestamp = datetime.datetime.utcnow().isoformat()
+    timestamp = fast_utcnow_iso()
     if USE_MOCK:
         # Simulate execution
-        price = 57000 + random.randint(-100, 100)
-        slippage_bps = random.uniform(5, 20)
+        price_offset, slippage_bps, _ = _next_mock_draw()
+        price = 57000 + price_offset
         fee = 0.0005
-        cost = abs(size) * price * (1 + fee) + abs(size) * price * (slippage_bps / 10000)
+        notional = abs(size) * price
+        cost = notional * (1 + fee + slippage_bps * 1e-4)
         status = 'success'
         details = {
             'timestamp': timestamp,
@@ -42,30 +126,20 @@ def execute_order(exchange: str, symbol: str, side: str, size: float, order_type
 
 # --- Smart Order Routing ---
 def get_best_execution(exchange_list: list, symbol: str, side: str, size: float):
-    order_books = {}
-    for ex in exchange_list:
-        if ex.lower() == 'okx':
-            order_books['okx'] = okx_order_book(symbol)
-        elif ex.lower() == 'bybit':
-            order_books['bybit'] = bybit_order_book(symbol)
-        elif ex.lower() == 'deribit':
-            order_books['deribit'] = deribit_order_book(symbol)
-    # Find best price
-    best_ex = None
-    best_price = None
-    for ex, ob in order_books.items():
-        price = ob['asks'][0][0] if side == 'buy' else ob['bids'][0][0]
-        if best_price is None or (side == 'buy' and price < best_price) or (side == 'sell' and price > best_price):
-            best_price = price
-            best_ex = ex
-    return best_ex, best_price
+    order_books = fetch_order_books([ex.lower() for ex in exchange_list], symbol, abs(size), side)
+    return _best_price(order_books, side)
+
+async def get_best_execution_async(exchange_list: list, symbol: str, side: str, size: float):
+    order_books = await fetch_order_books_async([ex.lower() for ex in exchange_list], symbol, abs(size), side)
+    return _best_price(order_books, side)
 
 # --- Cost Estimation ---
 def estimate_cost(symbol: str, size: float, entry_price: float, execution_price: float):
     slippage = abs(execution_price - entry_price)
     slippage_bps = (slippage / entry_price) * 10000 if entry_price else 0
-    fee = 0.0005 * abs(size) * execution_price
-    total_cost = abs(size) * execution_price + fee + abs(size) * slippage
+    abs_size = abs(size)
+    fee = 0.0005 * abs_size * execution_price
+    total_cost = abs_size * (execution_price + slippage) + fee
     return {
         'slippage_bps': slippage_bps,
         'fee': fee,
@@ -80,48 +154,58 @@ def notify_execution(details: dict, notify_func=None):
         notify_func(msg)
     return msg
 
+# --- VWAP Child-Order Slicing ---
+VWAP_LOT_SIZE = "0.0001"
+
+def u_shape_weights(n: int) -> List[float]:
+    """Heavier slices at the start and end of the horizon, lightest in the middle."""
+    return [abs(i - n / 2) + 1 for i in range(n)]
+
+def vwap_slices(size: float, weights: Sequence[float], lot_size: str = VWAP_LOT_SIZE) -> List[float]:
+    """
+    Split size across weights, rounding each slice down to lot_size; the rounding
+    remainder goes to the last slice so the slices sum exactly to size.
+    """
+    total_w = sum(weights)
+    if total_w <= 0:
+        raise ValueError("VWAP weights must sum to a positive number")
+    lot = Decimal(lot_size)
+    parent = Decimal(str(abs(size)))
+    sign = -1 if size < 0 else 1
+    qtys = [(parent * Decimal(str(w)) / Decimal(str(total_w))).quantize(lot, rounding=ROUND_DOWN) for w in weights]
+    qtys[-1] += parent - sum(qtys)
+    return [sign * float(q) for q in qtys]
+
 class ExecutionEngine:
     def __init__(self, exchanges=None, use_mock=None):
         self.exchanges = exchanges or ['okx', 'bybit', 'deribit']
         self.use_mock = USE_MOCK if use_mock is None else use_mock
 
-    def get_best_quote(self, asset: str, side: str, exchanges: list = None) -> dict:
-        exchanges = exchanges or self.exchanges
-        best_ex = None
-        best_price = None
-        best_ob = None
-        for ex in exchanges:
-            if ex == 'okx':
-                ob = okx_order_book(asset)
-            elif ex == 'bybit':
-                ob = bybit_order_book(asset)
-            elif ex == 'deribit':
-                ob = deribit_order_book(asset)
-            else:
-                continue
-            if not ob:
-                continue
-            price = ob['asks'][0][0] if side == 'buy' else ob['bids'][0][0]
-            if best_price is None or (side == 'buy' and price < best_price) or (side == 'sell' and price > best_price):
-                best_price = price
-                best_ex = ex
-                best_ob = ob
-        return {'exchange': best_ex, 'price': best_price, 'order_book': best_ob}
-
-    def estimate_slippage(self, order_size: float, order_book: dict, side: str, depth: int = 5) -> float:
-        levels = order_book['asks'] if side == 'buy' else order_book['bids']
-        filled = 0
-        cost = 0
-        for price, qty in levels[:depth]:
-            take = min(order_size - filled, qty)
-            cost += take * price
-            filled += take
-            if filled >= order_size:
-                break
-        avg_price = cost / order_size if order_size else 0
-        top_price = levels[0][0]
-        slippage = abs(avg_price - top_price)
-        return slippage
+    def get_best_quote(self, asset: str, side: str, exchanges: list = None, size: float = 0.0) -> dict:
+        order_books = fetch_order_books(exchanges or self.exchanges, asset, abs(size), side)
+        best_ex, best_price = _best_price(order_books, side)
+        return {'exchange': best_ex, 'price': best_price, 'order_book': order_books.get(best_ex)}
+
+    async def get_best_quote_async(self, asset: str, side: str, exchanges: list = None, size: float = 0.0) -> dict:
+        order_books = await fetch_order_books_async(exchanges or self.exchanges, asset, abs(size), side)
+        best_ex, best_price = _best_price(order_books, side)
+        return {'exchange': best_ex, 'price': best_price, 'order_book': order_books.get(best_ex)}
+
+    def estimate_slippage(self, order_size, order_book: OrderBook, side: str, depth: int = 5):
+        """
+        Distance between the average fill price and top of book when walking `depth` levels.
+        order_size may be a scalar or an array of candidate sizes (one result per size).
+        """
+        levels = as_order_book(order_book).side(side)[:depth]
+        prices, qtys = levels[:, 0], levels[:, 1]
+        sizes = np.asarray(order_size, dtype=np.float64)
+        # Quantity taken from each level: whatever is left after the levels above it, capped at its size
+        before = np.cumsum(qtys) - qtys
+        fills = np.clip(sizes[..., None] - before, 0.0, qtys)
+        cost = fills @ prices
+        avg_price = np.divide(cost, sizes, out=np.zeros_like(cost), where=sizes != 0)
+        slippage = np.abs(avg_price - prices[0])
+        return float(slippage) if slippage.ndim == 0 else slippage
 
     def calculate_hedging_cost(self, entry_price, hedge_size, fee_rate, slippage):
         fee = abs(hedge_size) * entry_price * fee_rate
@@ -130,20 +214,50 @@ class ExecutionEngine:
         return total_cost, pct_cost
 
     def execute_perpetual_hedge(self, asset: str, size: float, side: str) -> dict:
-        quote = self.get_best_quote(asset, side)
+        return self._fill_perpetual(asset, size, side, self.get_best_quote(asset, side, size=size))
+
+    async def _execute_slice(self, asset: str, size: float, side: str) -> dict:
+        # Books come from the streaming cache when it is running and deep enough, else the TTL-cached REST books
+        return self._fill_perpetual(asset, size, side, await self.get_best_quote_async(asset, side, size=size))
+
+    async def execute_perpetual_hedge_vwap(self, asset: str, size: float, side: str, horizon_s: float = 60.0,
+                                           interval_s: float = 10.0, weights: Sequence[float] = None) -> dict:
+        """
+        Work a large perpetual hedge as child orders spaced interval_s apart over horizon_s,
+        sized by weights (default U-shaped profile), instead of crossing the book in one shot.
+        """
+        if weights is None:
+            weights = u_shape_weights(max(1, int(horizon_s // interval_s)))
+        fills = []
+        for i, qty in enumerate(vwap_slices(size, weights)):
+            if i:
+                await asyncio.sleep(interval_s)
+            if qty:
+                fills.append(await self._execute_slice(asset, qty, side))
+        filled = sum(abs(f['size']) for f in fills)
+        return {
+            'asset': asset,
+            'side': side,
+            'size': size,
+            'slices': fills,
+            'avg_price': sum(abs(f['size']) * f['price'] for f in fills) / filled if filled else None,
+            'cost': sum(f['cost'] for f in fills),
+        }
+
+    def _fill_perpetual(self, asset: str, size: float, side: str, quote: dict) -> dict:
         price = quote['price']
         ex = quote['exchange']
         ob = quote['order_book']
         slippage = self.estimate_slippage(abs(size), ob, side)
         fee_rate = 0.0005
         cost, pct_cost = self.calculate_hedging_cost(price, size, fee_rate, slippage)
-        timestamp = datetime.datetime.utcnow().isoformat()
+        timestamp = fast_utcnow_iso()
         if self.use_mock:
-            trade_id = f"MOCK-{random.randint(100000,999999)}"
+            trade_id = f"MOCK-{_next_mock_draw()[2]}"
             status = 'mocked'
         else:
             # Real execution logic would go here
-            trade_id = f"REAL-{random.randint(100000,999999)}"
+            trade_id = f"REAL-{_next_mock_draw()[2]}"
             status = 'executed'
         result = {
             'status': status,
@@ -163,19 +277,19 @@ class ExecutionEngine:
 
     def execute_option_hedge(self, asset: str, option_type: str, strike: float, size: float) -> dict:
         # For simplicity, use Deribit order book for options
-        ob = deribit_order_book(asset)
         side = 'buy' if size > 0 else 'sell'
+        ob = get_order_book('deribit', asset, abs(size), side)
         slippage = self.estimate_slippage(abs(size), ob, side)
-        price = ob['asks'][0][0] if side == 'buy' else ob['bids'][0][0]
+        price = float(ob.side(side)[0, 0])
         fee_rate = 0.0005
         cost, pct_cost = self.calculate_hedging_cost(price, size, fee_rate, slippage)
-        timestamp = datetime.datetime.utcnow().isoformat()
+        timestamp = fast_utcnow_iso()
         if self.use_mock:
-            trade_id = f"MOCKOPT-{random.randint(100000,999999)}"
+            trade_id = f"MOCKOPT-{_next_mock_draw()[2]}"
             status = 'mocked'
         else:
             # Real execution logic would go here
-            trade_id = f"REALOPT-{random.randint(100000,999999)}"
+            trade_id = f"REALOPT-{_next_mock_draw()[2]}"
             status = 'executed'
         result = {
             'status': status,
@@ -195,7 +309,50 @@ class ExecutionEngine:
         return result
 
 # --- Unit Test ---
+def _estimate_slippage_reference(order_size, order_book, side, depth=5):
+    # Original per-level walk over a {'bids': [...], 'asks': [...]} dict
+    levels = order_book['asks'] if side == 'buy' else order_book['bids']
+    filled = 0
+    cost = 0
+    for price, qty in levels[:depth]:
+        take = min(order_size - filled, qty)
+        cost += take * price
+        filled += take
+        if filled >= order_size:
+            break
+    avg_price = cost / order_size if order_size else 0
+    return abs(avg_price - levels[0][0])
+
+def _check_slippage_equivalence(n_books=200, seed=0):
+    """
+    estimate_slippage against the original level walk on random books: sizes inside the top
+    level, exactly on level boundaries, and past `depth` (partial fills), scalar and batched.
+    """
+    rng = np.random.default_rng(seed)
+    engine = ExecutionEngine(use_mock=True)
+    for _ in range(n_books):
+        n_levels = int(rng.integers(1, 12))
+        mid = rng.uniform(1000, 60000)
+        steps = np.cumsum(rng.uniform(0.5, 20, n_levels))
+        book = {
+            'bids': [[mid - s, q] for s, q in zip(steps, rng.uniform(0.01, 3, n_levels))],
+            'asks': [[mid + s, q] for s, q in zip(steps, rng.uniform(0.01, 3, n_levels))],
+        }
+        depth = int(rng.integers(1, 8))
+        for side in ('buy', 'sell'):
+            qtys = np.array([q for _, q in book['asks' if side == 'buy' else 'bids'][:depth]])
+            sizes = np.concatenate([[0.0], rng.uniform(0, 1, 3) * qtys.sum(), np.cumsum(qtys),
+                                    qtys.sum() * rng.uniform(1.01, 3, 2)])
+            want = np.array([_estimate_slippage_reference(x, book, side, depth) for x in sizes])
+            got = engine.estimate_slippage(sizes, book, side, depth)
+            assert np.allclose(got, want, rtol=1e-12, atol=1e-9), (book, side, depth, sizes, got, want)
+            for x, w in zip(sizes, want):
+                g = engine.estimate_slippage(float(x), as_order_book(book), side, depth)
+                assert isinstance(g, float) and abs(g - w) <= 1e-9 + 1e-12 * w, (book, side, depth, x, g, w)
+    print('estimate_slippage matches the level walk.')
+
 def _unit_test():
+    _check_slippage_equivalence()
     engine = ExecutionEngine(use_mock=True)
     # Perpetual hedge test
     res1 = engine.execute_perpetual_hedge('BTC', 0.3, 'buy')
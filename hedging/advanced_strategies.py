@@ -1,6 +1,7 @@
 import numpy as np
-import matplotlib.pyplot as plt
-from scipy.stats import norm
+# ndtr is the kernel behind norm.cdf; scipy.special imports far faster than scipy.stats
+from scipy.special import ndtr
+from utils.jit import njit, HAS_NUMBA
 
 def option_payoff(S, K, type, position, premium=0):
     if type == 'call':
@@ -8,6 +9,22 @@ def option_payoff(S, K, type, position, premium=0):
     else:
         return position * (np.maximum(K - S, 0) - premium)
 
+def _price_legs(S, legs, T, r, sigma):
+    """
+    Black-Scholes premium for every leg in one vectorized pass; sets leg['premium'].
+    """
+    K = np.array([leg['K'] for leg in legs], dtype=float)
+    is_call = np.array([leg['type'] == 'call' for leg in legs])
+    sqrt_t = np.sqrt(T)
+    disc = np.exp(-r * T)
+    d1 = (np.log(S / K) + (r + 0.5 * sigma ** 2) * T) / (sigma * sqrt_t)
+    d2 = d1 - sigma * sqrt_t
+    call_price = S * ndtr(d1) - K * disc * ndtr(d2)
+    put_price = K * disc * ndtr(-d2) - S * ndtr(-d1)
+    for leg, price in zip(legs, np.where(is_call, call_price, put_price).tolist()):
+        leg['premium'] = price
+    return legs
+
 def construct_iron_condor(S, K_center, width, T, r, sigma):
     legs = [
         {'type': 'call', 'K': K_center + width, 'position': -1},  # Sell OTM call
@@ -16,15 +33,7 @@ def construct_iron_condor(S, K_center, width, T, r, sigma):
         {'type': 'put', 'K': K_center - 2*width, 'position': 1},  # Buy further OTM put
     ]
     # Calculate premiums using Black-Scholes
-    for leg in legs:
-        d1 = (np.log(S / leg['K']) + (r + 0.5 * sigma ** 2) * T) / (sigma * np.sqrt(T))
-        d2 = d1 - sigma * np.sqrt(T)
-        if leg['type'] == 'call':
-            price = S * norm.cdf(d1) - leg['K'] * np.exp(-r * T) * norm.cdf(d2)
-        else:
-            price = leg['K'] * np.exp(-r * T) * norm.cdf(-d2) - S * norm.cdf(-d1)
-        leg['premium'] = price
-    return legs
+    return _price_legs(S, legs, T, r, sigma)
 
 def construct_butterfly_spread(S, K_center, width, T, r, sigma, type='call'):
     legs = [
@@ -32,38 +41,53 @@ def construct_butterfly_spread(S, K_center, width, T, r, sigma, type='call'):
         {'type': type, 'K': K_center, 'position': -2},
         {'type': type, 'K': K_center + width, 'position': 1},
     ]
-    for leg in legs:
-        d1 = (np.log(S / leg['K']) + (r + 0.5 * sigma ** 2) * T) / (sigma * np.sqrt(T))
-        d2 = d1 - sigma * np.sqrt(T)
-        if leg['type'] == 'call':
-            price = S * norm.cdf(d1) - leg['K'] * np.exp(-r * T) * norm.cdf(d2)
-        else:
-            price = leg['K'] * np.exp(-r * T) * norm.cdf(-d2) - S * norm.cdf(-d1)
-        leg['premium'] = price
-    return legs
+    return _price_legs(S, legs, T, r, sigma)
 
 def construct_straddle(S, K, T, r, sigma):
     legs = [
         {'type': 'call', 'K': K, 'position': 1},
         {'type': 'put', 'K': K, 'position': 1},
     ]
-    for leg in legs:
-        d1 = (np.log(S / leg['K']) + (r + 0.5 * sigma ** 2) * T) / (sigma * np.sqrt(T))
-        d2 = d1 - sigma * np.sqrt(T)
-        if leg['type'] == 'call':
-            price = S * norm.cdf(d1) - leg['K'] * np.exp(-r * T) * norm.cdf(d2)
-        else:
-            price = leg['K'] * np.exp(-r * T) * norm.cdf(-d2) - S * norm.cdf(-d1)
-        leg['premium'] = price
-    return legs
+    return _price_legs(S, legs, T, r, sigma)
 
-def evaluate_strategy_payoff(strategy, price_range):
-    payoff = np.zeros_like(price_range, dtype=float)
-    for leg in strategy:
-        payoff += option_payoff(price_range, leg['K'], leg['type'], leg['position'], leg['premium'])
+@njit(cache=True, fastmath=True)
+def _payoff_kernel(S, Ks, is_call, positions, premiums):
+    # Fused intrinsic/premium/position accumulation: one pass over the price grid
+    out = np.empty(S.shape[0])
+    for i in range(S.shape[0]):
+        total = 0.0
+        for j in range(Ks.shape[0]):
+            if is_call[j]:
+                intrinsic = max(S[i] - Ks[j], 0.0)
+            else:
+                intrinsic = max(Ks[j] - S[i], 0.0)
+            total += positions[j] * (intrinsic - premiums[j])
+        out[i] = total
+    return out
+
+def _payoff_matmul(S, Ks, is_call, positions, premiums):
+    # intrinsic[i, j] = max(sign_j * (S_i - K_j), 0); legs reduce in one BLAS gemv
+    diff = S[:, None] - Ks[None, :]
+    intrinsic = np.maximum(np.where(is_call, diff, -diff), 0.0)
+    payoff = intrinsic @ positions
+    if premiums.any():
+        payoff -= positions @ premiums
     return payoff
 
+def evaluate_strategy_payoff(strategy, price_range):
+    args = (
+        np.asarray(price_range, dtype=np.float64),
+        np.array([leg['K'] for leg in strategy], dtype=np.float64),
+        np.array([leg['type'] == 'call' for leg in strategy], dtype=np.bool_),
+        np.array([leg['position'] for leg in strategy], dtype=np.float64),
+        np.array([leg['premium'] for leg in strategy], dtype=np.float64),
+    )
+    if HAS_NUMBA:
+        return _payoff_kernel(*args)
+    return _payoff_matmul(*args)
+
 def plot_payoff(price_range, payoff, title='Strategy Payoff'):
+    import matplotlib.pyplot as plt
     plt.figure(figsize=(8,4))
     plt.plot(price_range, payoff, label='Payoff')
     plt.axhline(0, color='gray', linestyle='--')
@@ -1,11 +1,10 @@
 import os
 from config import HEDGE_STRATEGY, AUTO_EXECUTE, HEDGE_SLIPPAGE_BPS
-from exchange_api.okx import fetch_order_book as okx_order_book
-from exchange_api.bybit import fetch_order_book as bybit_order_book
-from exchange_api.deribit import fetch_order_book as deribit_order_book, fetch_futures_price, fetch_spot_price
+from exchange_api.deribit import fetch_futures_price, fetch_spot_price
+from execution.execution_engine import fetch_order_books
 from risk_engine.risk_metrics import calculate_delta
 from analytics.reporting import log_hedge_execution
-import datetime
+from utils.clock import fast_utcnow_iso
 
 class StrategyEngine:
     def __init__(self, logger=None):
@@ -38,30 +37,29 @@ class StrategyEngine:
         Simulate smart order routing and execution for perpetual or option hedge.
         """
         auto_execute = AUTO_EXECUTE if auto_execute is None else auto_execute
-        # Fetch order books
-        ob_okx = okx_order_book(asset)
-        ob_bybit = bybit_order_book(asset)
-        ob_deribit = deribit_order_book(asset)
+        # Fetch order books (concurrently, TTL-cached)
+        books = fetch_order_books(['okx', 'bybit', 'deribit'], asset, abs(size), 'sell' if size < 0 else 'buy')
+        ob_okx, ob_bybit, ob_deribit = books['okx'], books['bybit'], books['deribit']
         # Pick best price
         if size < 0:
             # Sell: pick highest bid
             best = max([
-                ('OKX', ob_okx['bids'][0][0]),
-                ('Bybit', ob_bybit['bids'][0][0]),
-                ('Deribit', ob_deribit['bids'][0][0])
+                ('OKX', ob_okx.bids[0, 0]),
+                ('Bybit', ob_bybit.bids[0, 0]),
+                ('Deribit', ob_deribit.bids[0, 0])
             ], key=lambda x: x[1])
         else:
             # Buy: pick lowest ask
             best = min([
-                ('OKX', ob_okx['asks'][0][0]),
-                ('Bybit', ob_bybit['asks'][0][0]),
-                ('Deribit', ob_deribit['asks'][0][0])
+                ('OKX', ob_okx.asks[0, 0]),
+                ('Bybit', ob_bybit.asks[0, 0]),
+                ('Deribit', ob_deribit.asks[0, 0])
             ], key=lambda x: x[1])
-        price = best[1]
+        price = float(best[1])
         exchange = best[0]
-        slippage = abs(size) * price * (HEDGE_SLIPPAGE_BPS / 10000)
-        cost = abs(size) * price + slippage
-        timestamp = datetime.datetime.utcnow().isoformat()
+        notional = abs(size) * price
+        cost = notional * (1 + HEDGE_SLIPPAGE_BPS / 10000)
+        timestamp = fast_utcnow_iso()
         details = {
             'asset': asset,
             'size': size,
@@ -1,5 +1,18 @@
 import math
-from typing import Dict, Any, Tuple
+import numpy as np
+from typing import Dict, Any, List, Tuple
+from exchange_api.ws_cache import tob_cache
+from exchange_api.order_book import OrderBook, as_order_book
+
+_EXCHANGES = np.array(['OKX', 'Bybit', 'Deribit'])
+# Fallback books used when the streaming cache has no fresh quote
+_MOCK_BOOKS = {
+    'OKX': OrderBook.from_levels([[57000, 10]], [[57100, 10]]),
+    'Bybit': OrderBook.from_levels([[56990, 10]], [[57110, 10]]),
+    'Deribit': OrderBook.from_levels([[57010, 10]], [[57120, 10]]),
+}
+TAKER_FEE_RATE = 0.0005  # 0.05% typical taker fee
+SLIPPAGE_PER_UNIT = 0.001
 
 class HedgingEngine:
     def __init__(self, okx_client=None, bybit_client=None, deribit_client=None, logger=None):
@@ -27,49 +40,59 @@ class HedgingEngine:
         else:
             raise ValueError("Unknown hedging strategy")
 
-    def estimate_execution_cost(self, symbol: str, side: str, size: float, exchange: str, order_book: dict = None) -> float:
+    def estimate_execution_cost(self, symbol: str, side: str, size: float, exchange: str, order_book: OrderBook = None) -> float:
         """
         Estimate cost using order book depth, fees, and price impact.
         """
         if not order_book:
             return 0.0
-        price = order_book['asks'][0][0] if side == 'buy' else order_book['bids'][0][0]
+        levels = as_order_book(order_book).side(side)
+        price = float(levels[0, 0])
         # Simple slippage: assume linear impact for small size
-        depth = sum([lvl[1] for lvl in (order_book['asks'] if side == 'buy' else order_book['bids'])])
-        slippage = 0.001 * abs(size) if depth > 0 else 0
-        fee_rate = 0.0005  # 0.05% typical taker fee
-        cost = abs(size) * price * (1 + fee_rate) + slippage * price
+        depth = levels[:, 1].sum()
+        slippage = SLIPPAGE_PER_UNIT * abs(size) if depth > 0 else 0
+        cost = abs(size) * price * (1 + TAKER_FEE_RATE) + slippage * price
         return cost
 
+    @staticmethod
+    def estimate_execution_costs(side: str, size: float, order_books: List[OrderBook]) -> np.ndarray:
+        """
+        Vectorized estimate_execution_cost over several venues' books; returns an (N,) cost array.
+        """
+        levels = [as_order_book(ob).side(side) for ob in order_books]
+        prices = np.fromiter((lv[0, 0] for lv in levels), dtype=np.float64, count=len(levels))
+        depths = np.fromiter((lv[:, 1].sum() for lv in levels), dtype=np.float64, count=len(levels))
+        qty = abs(size)
+        slippage = np.where(depths > 0, SLIPPAGE_PER_UNIT * qty, 0.0)
+        return qty * prices * (1 + TAKER_FEE_RATE) + slippage * prices
+
     def route_order(self, symbol: str, side: str, size: float) -> Tuple[str, str]:
         """
         Select best exchange based on estimated cost. Returns (exchange, fallback_exchange)
         """
-        # Mock order books
-        ob_okx = {'bids': [[57000, 10]], 'asks': [[57100, 10]]}
-        ob_bybit = {'bids': [[56990, 10]], 'asks': [[57110, 10]]}
-        ob_deribit = {'bids': [[57010, 10]], 'asks': [[57120, 10]]}
-        costs = {
-            'OKX': self.estimate_execution_cost(symbol, side, size, 'OKX', ob_okx),
-            'Bybit': self.estimate_execution_cost(symbol, side, size, 'Bybit', ob_bybit),
-            'Deribit': self.estimate_execution_cost(symbol, side, size, 'Deribit', ob_deribit)
-        }
-        sorted_ex = sorted(costs.items(), key=lambda x: x[1])
-        return sorted_ex[0][0], sorted_ex[1][0]
+        # Streamed books when available and deep enough for the order, else mock order books
+        books = [tob_cache.get(ex.lower(), symbol, abs(size), side) or _MOCK_BOOKS[ex] for ex in _EXCHANGES]
+        costs = self.estimate_execution_costs(side, size, books)
+        # Top-2 without a full sort; ties resolve to the earlier venue
+        top2 = np.sort(np.argpartition(costs, 1)[:2])
+        order = top2[np.argsort(costs[top2], kind='stable')]
+        return str(_EXCHANGES[order[0]]), str(_EXCHANGES[order[1]])
 
     def execute_hedge(self, strategy: str, asset: str, size: float, side: str = None, notify=None) -> Dict[str, Any]:
         """
         Place a mock or real hedge order. Calls notify callback if provided.
         """
-        exchange, fallback = self.route_order(asset, side or ("sell" if size < 0 else "buy"), abs(size))
+        abs_size = abs(size)
+        side = side or ("sell" if size < 0 else "buy")
+        exchange, fallback = self.route_order(asset, side, abs_size)
         # Mock execution
         order_response = {
             'exchange': exchange,
             'asset': asset,
             'size': size,
-            'side': side or ("sell" if size < 0 else "buy"),
+            'side': side,
             'status': 'success',
-            'cost': abs(size) * 57000,
+            'cost': abs_size * 57000,
             'fallback': fallback
         }
         if self.logger:
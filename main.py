@@ -1,23 +1,40 @@
 from utils.logger import logger
-from exchange_api.okx import fetch_spot_price as fetch_okx_spot_price
-from exchange_api.bybit import fetch_spot_price as fetch_bybit_spot_price
-from exchange_api.deribit import fetch_spot_price as fetch_deribit_spot_price
+from exchange_api.okx import fetch_spot_price_async as fetch_okx_spot_price
+from exchange_api.bybit import fetch_spot_price_async as fetch_bybit_spot_price
+from exchange_api.deribit import fetch_spot_price_async as fetch_deribit_spot_price
 import telegram_bot
 import os
 import asyncio
 import json
+import numpy as np
 from dotenv import load_dotenv
 from tabulate import tabulate
+try:
+    import pandas as pd
+    HAS_PANDAS = True
+except ImportError:
+    HAS_PANDAS = False
 from exchange_api.deribit_api import DeribitClient
-from risk_engine.risk_metrics import (
-    calculate_delta, calculate_gamma, calculate_vega, calculate_theta,
-    aggregate_portfolio_risks, calculate_var
-)
+from risk_engine.risk_metrics import calculate_greeks_batch, aggregate_portfolio_risks, calculate_var
 
 # Load environment variables
 load_dotenv(dotenv_path=".env.local")
 USE_MOCK = os.getenv("USE_MOCK_DERIBIT", "False").lower() == "true"
 
+POSITION_COLUMNS = ["instrument_name", "size", "type", "delta", "gamma", "vega", "theta"]
+POSITION_HEADERS = ["Instrument", "Size", "Type", "Delta", "Gamma", "Vega", "Theta"]
+GREEK_COLUMNS = ["delta", "gamma", "vega", "theta"]
+
+def format_table(records, columns, headers) -> str:
+    """
+    Render dict records as a text table; pandas when available, tabulate otherwise.
+    """
+    if HAS_PANDAS:
+        df = pd.DataFrame.from_records(records, columns=columns)
+        df.columns = headers
+        return df.to_string(index=False)
+    return tabulate([[r.get(c) for c in columns] for r in records], headers=headers)
+
 # Try to load mock positions from file, else use hardcoded
 MOCK_POSITIONS_PATH = "mock_positions.json"
 def load_mock_positions():
@@ -33,17 +50,17 @@ def load_mock_positions():
 async def main():
     logger.info("Starting the trading bot...")
 
-    btc_price_okx = fetch_okx_spot_price("BTC")
+    # Spot fetches and Deribit auth are independent round-trips; overlap them
+    client = DeribitClient()
+    btc_price_okx, btc_price_bybit, btc_price_deribit, _ = await asyncio.gather(
+        fetch_okx_spot_price("BTC"),
+        fetch_bybit_spot_price("BTC"),
+        fetch_deribit_spot_price("BTC"),
+        client.authenticate(),
+    )
     logger.info(f"BTC price on OKX: {btc_price_okx}")
-
-    btc_price_bybit = fetch_bybit_spot_price("BTC")
     logger.info(f"BTC price on Bybit: {btc_price_bybit}")
-
-    btc_price_deribit = fetch_deribit_spot_price("BTC")
     logger.info(f"BTC price on Deribit: {btc_price_deribit}")
-
-    client = DeribitClient()
-    await client.authenticate()
     positions = load_mock_positions()
 
     # Fetch spot and perpetual prices
@@ -51,22 +68,30 @@ async def main():
     perp_price = None
     if not USE_MOCK:
         try:
-            spot_price = (await client.get_orderbook("BTC-30AUG24-60000-C")).get("index_price")
-            perp_price = (await client.get_orderbook("BTC-PERPETUAL")).get("mark_price")
+            spot_ob, perp_ob = await asyncio.gather(
+                client.get_orderbook("BTC-30AUG24-60000-C"),
+                client.get_orderbook("BTC-PERPETUAL"),
+            )
+            spot_price = spot_ob.get("index_price")
+            perp_price = perp_ob.get("mark_price")
         except Exception:
             spot_price = perp_price = None
     else:
         spot_price = 57000
         perp_price = 57000
 
-    # Compute Greeks for each position
+    # Compute Greeks: all option legs in one batched pass, then write back per position
+    options = [pos for pos in positions if pos["type"] == "option"]
+    n = len(options)
+    greeks = calculate_greeks_batch(
+        *(np.fromiter((pos[f] for pos in options), dtype=float, count=n) for f in ("S", "K", "T", "r", "sigma")),
+        np.fromiter((pos["option_type"] == "call" for pos in options), dtype=bool, count=n),
+    )
+    for i, pos in enumerate(options):
+        for g in ("delta", "gamma", "vega", "theta"):
+            pos[g] = float(greeks[g][i])
     for pos in positions:
-        if pos["type"] == "option":
-            pos["delta"] = calculate_delta(pos["S"], pos["K"], pos["T"], pos["r"], pos["sigma"], pos["option_type"])
-            pos["gamma"] = calculate_gamma(pos["S"], pos["K"], pos["T"], pos["r"], pos["sigma"])
-            pos["vega"] = calculate_vega(pos["S"], pos["K"], pos["T"], pos["r"], pos["sigma"])
-            pos["theta"] = calculate_theta(pos["S"], pos["K"], pos["T"], pos["r"], pos["sigma"], pos["option_type"])
-        else:
+        if pos["type"] != "option":
             pos["delta"] = pos["size"]
             pos["gamma"] = 0
             pos["vega"] = 0
@@ -75,7 +100,7 @@ async def main():
     # Aggregate portfolio metrics
     agg = aggregate_portfolio_risks(positions)
     # Mock price series for VaR
-    price_series = [57000 + 1000 * __import__('math').sin(i/5) for i in range(100)]
+    price_series = 57000.0 + 1000.0 * np.sin(np.arange(100, dtype=np.float64) / 5.0)
     var = calculate_var(price_series)
 
     # Print results
@@ -83,12 +108,9 @@ async def main():
     print(f"Spot Price: {spot_price}")
     print(f"Perpetual Mark Price: {perp_price}")
     print("\nPositions:")
-    print(tabulate([
-        [p["instrument_name"], p["size"], p["type"], p.get("delta"), p.get("gamma"), p.get("vega"), p.get("theta")]
-        for p in positions
-    ], headers=["Instrument", "Size", "Type", "Delta", "Gamma", "Vega", "Theta"]))
+    print(format_table(positions, POSITION_COLUMNS, POSITION_HEADERS))
     print("\nAggregate Portfolio Risk:")
-    print(tabulate([[agg["delta"], agg["gamma"], agg["vega"], agg["theta"]]], headers=["Delta", "Gamma", "Vega", "Theta"]))
+    print(format_table([agg], GREEK_COLUMNS, [c.capitalize() for c in GREEK_COLUMNS]))
     print(f"\nHistorical VaR: {var:.2f}")
     await client.close()
 
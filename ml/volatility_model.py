@@ -1,11 +1,34 @@
 import numpy as np
 import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
 from sklearn.linear_model import LinearRegression
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.metrics import mean_absolute_error, mean_squared_error
-from typing import Tuple, Any
-import matplotlib.pyplot as plt
+from sklearn import config_context
+from typing import Tuple, Any, Optional
 import os
+import math
+from utils.jit import njit, HAS_NUMBA
+
+try:
+    from joblib import parallel_backend
+    HAS_JOBLIB = True
+except ImportError:
+    HAS_JOBLIB = False
+
+try:
+    import bottleneck as bn
+    HAS_BOTTLENECK = True
+except ImportError:
+    HAS_BOTTLENECK = False
+
+try:
+    import onnxruntime as ort
+    from skl2onnx import convert_sklearn
+    from skl2onnx.common.data_types import FloatTensorType
+    HAS_ONNX = True
+except ImportError:
+    HAS_ONNX = False
 
 try:
     from arch import arch_model
@@ -14,57 +37,265 @@ except ImportError:
     HAS_ARCH = False
 
 # --- 1. Historical Volatility Dataset Preparation ---
+def _rolling_mean_std(x: np.ndarray, window: int, with_std: bool = True):
+    """
+    Trailing-window mean and sample std (ddof=1, as pandas rolling); the first window-1
+    entries are NaN, and any window containing NaN yields NaN. Uses bottleneck's O(n)
+    running moments when installed, else one O(n*window) window view.
+    """
+    if HAS_BOTTLENECK:
+        mean = bn.move_mean(x, window, min_count=window)
+        return mean, (bn.move_std(x, window, min_count=window, ddof=1) if with_std else None)
+    mean = np.full(len(x), np.nan)
+    std = np.full(len(x), np.nan) if with_std else None
+    if len(x) >= window:
+        W = sliding_window_view(x, window)
+        mean[window - 1:] = W.mean(axis=1)
+        if with_std:
+            std[window - 1:] = W.std(axis=1, ddof=1)
+    return mean, std
+
+def _rsi(price: np.ndarray, window: int) -> np.ndarray:
+    """
+    RSI from simple moving averages of gains and losses; both averages come from
+    one window view over a stacked (gains, losses) array.
+    """
+    rsi = np.full(len(price), np.nan)
+    if len(price) < window:
+        return rsi
+    delta = np.empty(len(price))
+    delta[0] = np.nan
+    np.subtract(price[1:], price[:-1], out=delta[1:])
+    gains = np.maximum(delta, 0.0)  # NaN propagates, as with Series.clip
+    moves = np.stack((gains, gains - delta))
+    if HAS_BOTTLENECK:
+        roll_up, roll_down = bn.move_mean(moves, window, min_count=window, axis=1)
+        return 100 - 100 / (1 + roll_up / (roll_down + 1e-8))
+    roll_up, roll_down = sliding_window_view(moves, window, axis=1).mean(axis=2)
+    rsi[window - 1:] = 100 - 100 / (1 + roll_up / (roll_down + 1e-8))
+    return rsi
+
+_EMA_SPANS = (10, 20, 12, 26)
+_EMA_ALPHAS = np.array([2.0 / (span + 1) for span in _EMA_SPANS])
+
+@njit(cache=True)
+def _emas(price: np.ndarray, alphas: np.ndarray) -> np.ndarray:
+    """
+    All EMAs in one pass: row k is price.ewm(alpha=alphas[k]).mean() (adjusted weights,
+    NaN prices skipped but still decaying earlier observations, as pandas does).
+    """
+    k, n = len(alphas), len(price)
+    out = np.empty((k, n))
+    num = np.zeros(k)
+    den = np.zeros(k)
+    for t in range(n):
+        p = price[t]
+        valid = not np.isnan(p)
+        for j in range(k):
+            beta = 1.0 - alphas[j]
+            num[j] *= beta
+            den[j] *= beta
+            if valid:
+                num[j] += p
+                den[j] += 1.0
+            out[j, t] = num[j] / den[j] if den[j] > 0.0 else np.nan
+    return out
+
+FEATURE_COLUMNS = ('log_return', 'realized_vol', 'lagged_return', 'ema_10', 'ema_20', 'momentum', 'rsi',
+                   'macd', 'high', 'low', 'close', 'tr', 'atr', 'bb_width')
+DATASET_COLUMNS = ('price',) + FEATURE_COLUMNS + ('target_vol',)
+
+def _fill_dataset(price: np.ndarray, window: int, out: np.ndarray) -> np.ndarray:
+    """
+    Write the DATASET_COLUMNS for every price into the (N, len(DATASET_COLUMNS)) buffer out,
+    column by column; warm-up rows and the last row (no next-day target) hold NaN.
+    """
+    n = len(price)
+    col = {name: out[:, j] for j, name in enumerate(DATASET_COLUMNS)}
+    log_return = np.full(n, np.nan)
+    log_return[1:] = np.diff(np.log(price))
+    _, ret_std = _rolling_mean_std(log_return, window)
+    realized_vol = ret_std * np.sqrt(365)
+    # ATR (high == low == close here, so true range is zero)
+    tr = price - price
+    atr, _ = _rolling_mean_std(tr, window, with_std=False)
+    # Bollinger Band width
+    ma, std = _rolling_mean_std(price, window)
+    if HAS_NUMBA:
+        ema10, ema20, ema12, ema26 = _emas(price, _EMA_ALPHAS)
+    else:
+        # The fused loop is only a win compiled; pandas' C ewm beats it interpreted
+        price_s = pd.Series(price)
+        ema10, ema20, ema12, ema26 = (price_s.ewm(alpha=a).mean().to_numpy() for a in _EMA_ALPHAS)
+    for name in ('price', 'high', 'low', 'close'):
+        col[name][:] = price
+    col['log_return'][:] = log_return
+    col['realized_vol'][:] = realized_vol
+    col['lagged_return'][0] = np.nan
+    col['lagged_return'][1:] = log_return[:-1]
+    col['ema_10'][:] = ema10
+    col['ema_20'][:] = ema20
+    col['momentum'][:window] = np.nan
+    col['momentum'][window:] = price[window:] - price[:-window]
+    col['rsi'][:] = _rsi(price, window)
+    col['macd'][:] = ema12 - ema26
+    col['tr'][:] = tr
+    col['atr'][:] = atr
+    col['bb_width'][:] = (ma + 2*std - (ma - 2*std)) / ma
+    # Label: next-day realized volatility
+    col['target_vol'][:-1] = realized_vol[1:]
+    col['target_vol'][-1:] = np.nan
+    return out
+
+def _complete_rows(buf: np.ndarray) -> np.ndarray:
+    return ~np.isnan(buf).any(axis=1)
+
+def prepare_volatility_features(price, window: int = 10, dtype=np.float32) -> Tuple[np.ndarray, np.ndarray, list]:
+    """
+    Array form of prepare_volatility_dataset without pandas: returns (X, y, feature_names)
+    with X of shape (rows, len(FEATURE_COLUMNS)) in dtype, incomplete rows dropped.
+    """
+    price = np.asarray(price, dtype=np.float64)
+    buf = _fill_dataset(price, window, np.empty((len(price), len(DATASET_COLUMNS)), dtype=dtype))
+    buf = buf[_complete_rows(buf)]
+    return buf[:, 1:-1], buf[:, -1], list(FEATURE_COLUMNS)
+
 def prepare_volatility_dataset(price_series: pd.Series, window: int = 10) -> pd.DataFrame:
     """
     Prepare features for volatility forecasting.
     Computes realized volatility, lagged returns, momentum, and technical indicators.
     """
-    df = pd.DataFrame({'price': price_series})
-    df['log_return'] = np.log(df['price']).diff()
-    df['realized_vol'] = df['log_return'].rolling(window).std() * np.sqrt(365)
-    df['lagged_return'] = df['log_return'].shift(1)
-    df['ema_10'] = df['price'].ewm(span=10).mean()
-    df['ema_20'] = df['price'].ewm(span=20).mean()
-    df['momentum'] = df['price'] - df['price'].shift(window)
-    # RSI
-    delta = df['price'].diff()
-    up = delta.clip(lower=0)
-    down = -delta.clip(upper=0)
-    roll_up = up.rolling(window).mean()
-    roll_down = down.rolling(window).mean()
-    rs = roll_up / (roll_down + 1e-8)
-    df['rsi'] = 100 - (100 / (1 + rs))
-    # MACD
-    ema12 = df['price'].ewm(span=12).mean()
-    ema26 = df['price'].ewm(span=26).mean()
-    df['macd'] = ema12 - ema26
-    # ATR
-    df['high'] = df['price']
-    df['low'] = df['price']
-    df['close'] = df['price']
-    df['tr'] = df['high'] - df['low']
-    df['atr'] = df['tr'].rolling(window).mean()
-    # Bollinger Band width
-    ma = df['price'].rolling(window).mean()
-    std = df['price'].rolling(window).std()
-    df['bb_width'] = (ma + 2*std - (ma - 2*std)) / ma
-    # Label: next-day realized volatility
-    df['target_vol'] = df['realized_vol'].shift(-1)
-    df = df.dropna()
-    return df
+    price_s = pd.Series(price_series, dtype=np.float64)
+    price = price_s.to_numpy()
+    buf = _fill_dataset(price, window, np.empty((len(price), len(DATASET_COLUMNS))))
+    keep = _complete_rows(buf)
+    return pd.DataFrame(buf[keep], columns=list(DATASET_COLUMNS), index=price_s.index[keep])
+
+class VolFeatureStreamer:
+    """
+    O(1)-per-tick version of prepare_volatility_dataset for live prices.
+    push(price) returns the feature row (FEATURE_COLUMNS) for that tick, or None
+    while fewer than window + 1 prices have been seen (the rows dropna would drop).
+    EMAs use the same adjusted weights as pandas ewm; window sums are updated
+    incrementally and re-synced from the ring buffers once per wrap to stop drift.
+    """
+    __slots__ = ('window', '_n', '_ref', '_prices', '_rets', '_gains', '_losses', '_last_ret', '_last_log',
+                 '_ema_num', '_ema_den', '_sum_ret', '_sumsq_ret', '_sum_gain', '_sum_loss',
+                 '_sum_px', '_sumsq_px')
+
+    def __init__(self, window: int = 10):
+        if window < 2:
+            raise ValueError("window must be at least 2")
+        self.window = window
+        self._n = 0
+        self._ref = 0.0  # prices are summed relative to the first one for numerical stability
+        self._prices = np.empty(window + 1, dtype=np.float64)
+        self._rets = np.zeros(window, dtype=np.float64)
+        self._gains = np.zeros(window, dtype=np.float64)
+        self._losses = np.zeros(window, dtype=np.float64)
+        self._last_ret = math.nan
+        self._last_log = math.nan
+        self._ema_num = [0.0] * len(_EMA_SPANS)
+        self._ema_den = [0.0] * len(_EMA_SPANS)
+        self._sum_ret = self._sumsq_ret = self._sum_gain = self._sum_loss = 0.0
+        self._sum_px = self._sumsq_px = 0.0
+
+    def _resync(self):
+        w, n = self.window, self._n
+        self._sum_ret = float(self._rets.sum())
+        self._sumsq_ret = float(self._rets @ self._rets)
+        self._sum_gain = float(self._gains.sum())
+        self._sum_loss = float(self._losses.sum())
+        px = self._prices[[(n - 1 - j) % (w + 1) for j in range(w)]] - self._ref
+        self._sum_px = float(px.sum())
+        self._sumsq_px = float(px @ px)
+
+    def push(self, price: float) -> Optional[dict]:
+        price = float(price)
+        w, n = self.window, self._n
+        if n == 0:
+            self._ref = price
+        for i, span in enumerate(_EMA_SPANS):
+            decay = 1.0 - 2.0 / (span + 1)
+            self._ema_num[i] = self._ema_num[i] * decay + price
+            self._ema_den[i] = self._ema_den[i] * decay + 1.0
+        lagged = self._last_ret
+        if n > 0:
+            prev = self._prices[(n - 1) % (w + 1)]
+            ret = math.log(price) - self._last_log
+            gain, loss = max(price - prev, 0.0), max(prev - price, 0.0)
+            k = (n - 1) % w
+            if n > w:
+                old_ret = self._rets[k]
+                self._sum_ret -= old_ret
+                self._sumsq_ret -= old_ret * old_ret
+                self._sum_gain -= self._gains[k]
+                self._sum_loss -= self._losses[k]
+            self._rets[k], self._gains[k], self._losses[k] = ret, gain, loss
+            self._sum_ret += ret
+            self._sumsq_ret += ret * ret
+            self._sum_gain += gain
+            self._sum_loss += loss
+            self._last_ret = ret
+        self._last_log = math.log(price)
+        # The ring holds w + 1 prices, so the one leaving the w-price window is still there for momentum
+        old_px = self._prices[(n + 1) % (w + 1)] if n >= w else math.nan
+        self._prices[n % (w + 1)] = price
+        shifted = price - self._ref
+        self._sum_px += shifted
+        self._sumsq_px += shifted * shifted
+        if n >= w:
+            old_shifted = old_px - self._ref
+            self._sum_px -= old_shifted
+            self._sumsq_px -= old_shifted * old_shifted
+        self._n = n = n + 1
+        if n > w and n % w == 0:
+            self._resync()
+        if n <= w:
+            return None
+        var_ret = max((self._sumsq_ret - self._sum_ret * self._sum_ret / w) / (w - 1), 0.0)
+        var_px = max((self._sumsq_px - self._sum_px * self._sum_px / w) / (w - 1), 0.0)
+        ma = self._sum_px / w + self._ref
+        std = math.sqrt(var_px)
+        ema10, ema20, ema12, ema26 = (num / den for num, den in zip(self._ema_num, self._ema_den))
+        rs = (self._sum_gain / w) / (self._sum_loss / w + 1e-8)
+        return {
+            'log_return': self._last_ret,
+            'realized_vol': math.sqrt(var_ret) * math.sqrt(365),
+            'lagged_return': lagged,
+            'ema_10': ema10,
+            'ema_20': ema20,
+            'momentum': price - old_px,
+            'rsi': 100 - (100 / (1 + rs)),
+            'macd': ema12 - ema26,
+            'high': price,
+            'low': price,
+            'close': price,
+            'tr': 0.0,
+            'atr': 0.0,
+            'bb_width': (ma + 2*std - (ma - 2*std)) / ma,
+        }
 
 # --- 2. ML Models for Volatility Forecasting ---
+# Depth/leaf caps stop trees from growing out on noise; accuracy is flat past these on daily vol
+RF_PARAMS = {'n_estimators': 100, 'max_depth': 12, 'min_samples_leaf': 5}
+RF_UPDATE_TREES = 20
+
 def train_vol_model(X_train: pd.DataFrame, y_train: pd.Series, model_type: str = 'rf') -> Any:
     """
     Train a volatility forecasting model. model_type: 'lr', 'rf', or 'garch'.
     """
     if model_type == 'lr':
         model = LinearRegression()
-        model.fit(X_train, y_train)
+        model.fit(np.asarray(X_train, dtype=np.float64), y_train)
         return model
     elif model_type == 'rf':
-        model = RandomForestRegressor(n_estimators=100, random_state=42)
-        model.fit(X_train, y_train)
+        model = RandomForestRegressor(**RF_PARAMS, n_jobs=-1, random_state=42)
+        model.fit(np.asarray(X_train, dtype=np.float64), y_train)
+        # Trees are built on all cores; predict is mostly called on a handful of rows, where joblib dispatch dominates
+        model.n_jobs = 1
+        if HAS_ONNX:
+            attach_onnx_session(model, X_train.shape[1])
         return model
     elif model_type == 'garch' and HAS_ARCH:
         am = arch_model(y_train, vol='Garch', p=1, q=1)
@@ -73,15 +304,54 @@ def train_vol_model(X_train: pd.DataFrame, y_train: pd.Series, model_type: str =
     else:
         raise ValueError('Unknown or unavailable model_type')
 
+def update_vol_model(model: RandomForestRegressor, X_new: pd.DataFrame, y_new: pd.Series, n_new_trees: int = RF_UPDATE_TREES) -> RandomForestRegressor:
+    """
+    Grow a fitted forest by n_new_trees trained on the new window only (warm_start),
+    instead of refitting every tree on the full history.
+    """
+    model.set_params(warm_start=True, n_estimators=len(model.estimators_) + n_new_trees, n_jobs=-1)
+    model.fit(np.asarray(X_new, dtype=np.float64), y_new)
+    model.n_jobs = 1
+    if getattr(model, '_onnx_sess', None) is not None:
+        attach_onnx_session(model, model.n_features_in_)
+    return model
+
+def attach_onnx_session(model: Any, n_features: int) -> Any:
+    """
+    Compile a fitted sklearn regressor to ONNX and keep an onnxruntime session on it
+    as model._onnx_sess, which predict_volatility prefers. Inputs are cast to float32,
+    so predictions can differ from sklearn in the last few digits.
+    """
+    if not HAS_ONNX:
+        raise ImportError("skl2onnx and onnxruntime are required for ONNX inference")
+    onx = convert_sklearn(model, initial_types=[('X', FloatTensorType([None, n_features]))])
+    model._onnx_sess = ort.InferenceSession(onx.SerializeToString(), providers=['CPUExecutionProvider'])
+    return model
+
+# Batches this small are predicted sequentially with finiteness checks skipped
+SMALL_BATCH_ROWS = 32
+
 def predict_volatility(model: Any, X_test: pd.DataFrame, model_type: str = 'rf') -> np.ndarray:
+    sess = getattr(model, '_onnx_sess', None)
+    if sess is not None:
+        return sess.run(None, {'X': np.asarray(X_test, dtype=np.float32)})[0].ravel()
     if model_type in ['lr', 'rf']:
-        return model.predict(X_test)
+        # sklearn models are fitted on plain arrays, so skip DataFrame feature-name checks
+        X = np.asarray(X_test, dtype=np.float64)
+        if len(X) <= SMALL_BATCH_ROWS:
+            with config_context(assume_finite=True):
+                if HAS_JOBLIB:
+                    with parallel_backend('sequential'):
+                        return model.predict(X)
+                return model.predict(X)
+        return model.predict(X)
     elif model_type == 'garch' and HAS_ARCH:
         return model.forecast(horizon=len(X_test)).variance.values[-1] ** 0.5
     else:
         raise ValueError('Unknown or unavailable model_type')
 
 # --- 3. Hedge Timing Optimization ---
+@njit(cache=True)
 def should_hedge(vol_forecast: float, delta_exposure: float, threshold: float) -> bool:
     """
     Decide whether to hedge based on forecasted volatility and delta exposure.
@@ -102,24 +372,22 @@ def backtest_hedge_strategy(price_series: pd.Series, delta_series: pd.Series, th
     Backtest hedge strategy using vol forecast + delta exposure.
     Returns performance metrics and comparison to naive strategy.
     """
-    df = prepare_volatility_dataset(price_series)
-    X = df.drop(['price', 'target_vol'], axis=1)
-    y = df['target_vol']
-    split = int(0.7 * len(df))
-    X_train, X_test = X.iloc[:split], X.iloc[split:]
-    y_train, y_test = y.iloc[:split], y.iloc[split:]
+    X, y, _ = prepare_volatility_features(price_series)
+    split = int(0.7 * len(X))
+    X_train, X_test = X[:split], X[split:]
+    y_train, y_test = y[:split], y[split:]
     model = train_vol_model(X_train, y_train, model_type)
     y_pred = predict_volatility(model, X_test, model_type)
     # Align delta_series
-    delta_test = delta_series.iloc[-len(y_pred):]
-    # Strategy: hedge if should_hedge
-    hedge_signals = [should_hedge(v, d, threshold) for v, d in zip(y_pred, delta_test)]
-    naive_signals = [abs(d) > threshold for d in delta_test]
+    abs_delta = np.abs(delta_series.to_numpy(dtype=np.float64)[-len(y_pred):])
+    # Strategy: should_hedge applied to the whole test window at once
+    hedge_signals = abs_delta * np.asarray(y_pred, dtype=np.float64) > threshold
+    naive_signals = abs_delta > threshold
     # Performance: count hedges, compare to naive
     perf = {
-        'hedge_count': sum(hedge_signals),
-        'naive_hedge_count': sum(naive_signals),
-        'model_metrics': evaluate_vol_model(y_test.values, y_pred),
+        'hedge_count': int(hedge_signals.sum()),
+        'naive_hedge_count': int(naive_signals.sum()),
+        'model_metrics': evaluate_vol_model(y_test, y_pred),
     }
     return perf
 
@@ -133,17 +401,20 @@ def _unit_test():
     n = 400
     price = pd.Series(np.cumprod(1 + 0.01 * np.random.randn(n)) * 30000)
     delta = pd.Series(np.random.randn(n))
+    X, y, names = prepare_volatility_features(price)
     df = prepare_volatility_dataset(price)
-    X = df.drop(['price', 'target_vol'], axis=1)
-    y = df['target_vol']
-    split = int(0.7 * len(df))
-    X_train, X_test = X.iloc[:split], X.iloc[split:]
-    y_train, y_test = y.iloc[:split], y.iloc[split:]
+    assert names == list(df.columns[1:-1]) and len(X) == len(df)
+    assert np.allclose(X, df[names].to_numpy(), rtol=1e-6) and X.dtype == np.float32
+    split = int(0.7 * len(X))
+    X_train, X_test = X[:split], X[split:]
+    y_train, y_test = y[:split], y[split:]
     model = train_vol_model(X_train, y_train, 'rf')
     y_pred = predict_volatility(model, X_test, 'rf')
     assert (y_pred > 0).all(), "Predicted volatility must be positive"
-    metrics = evaluate_vol_model(y_test.values, y_pred)
+    metrics = evaluate_vol_model(y_test, y_pred)
     print("Unit test metrics:", metrics)
+    model = update_vol_model(model, X_test, y_test)
+    assert len(model.estimators_) == RF_PARAMS['n_estimators'] + RF_UPDATE_TREES
     perf = backtest_hedge_strategy(price, delta, threshold=0.5, model_type='rf')
     print("Backtest performance:", perf)
 
@@ -1,29 +1,99 @@
 import pandas as pd
 import numpy as np
+from functools import lru_cache
+from scipy.linalg import cho_solve
+from portfolio.types import Position
 
-def calculate_cross_asset_correlation(price_data: dict) -> pd.DataFrame:
+# Diagonal loading keeps Cholesky usable on PSD (not strictly PD) correlation matrices
+CORR_RIDGE = 1e-8
+# Below this pivot ratio the matrix is treated as singular and solved by least squares
+CHOL_MIN_PIVOT_RATIO = 1e-6
+
+CORR_CACHE_SIZE = 32
+
+def calculate_cross_asset_correlation_arr(prices: np.ndarray) -> np.ndarray:
+    """
+    Correlation of simple returns for a (T, n_assets) price array with no gaps or zeros.
+    """
+    P = np.asarray(prices, dtype=np.float64)
+    return np.corrcoef(P[1:] / P[:-1] - 1.0, rowvar=False)
+
+@lru_cache(maxsize=CORR_CACHE_SIZE)
+def _corr_cached(prices: tuple) -> np.ndarray:
+    # prices is one row per asset
+    corr = calculate_cross_asset_correlation_arr(np.array(prices, dtype=np.float64).T)
+    corr.flags.writeable = False
+    return corr
+
+def calculate_cross_asset_correlation(price_data) -> pd.DataFrame:
     """
     Calculate correlation matrix for multiple assets.
-    price_data: { 'BTC': [...], 'ETH': [...], ... }
+    price_data: { 'BTC': [...], 'ETH': [...], ... } or a DataFrame with one column per asset.
+    Identical price histories reuse a memoized matrix; gappy or ragged data takes pandas'
+    pairwise-NaN path.
     """
+    if isinstance(price_data, pd.DataFrame):
+        P = price_data.to_numpy(dtype=np.float64)
+        if np.isfinite(P).all() and np.all(P):
+            corr = calculate_cross_asset_correlation_arr(P)
+            return pd.DataFrame(corr, index=price_data.columns, columns=price_data.columns)
+        return price_data.pct_change().corr()
+    assets = list(price_data)
+    key = tuple(tuple(map(float, price_data[a])) for a in assets)
+    if len({len(row) for row in key}) == 1 and np.isfinite(key).all() and np.all(np.asarray(key)):
+        return pd.DataFrame(_corr_cached(key).copy(), index=assets, columns=assets)
     df = pd.DataFrame(price_data)
     return df.pct_change().corr()
 
+EXPOSURE_GREEKS = ('delta', 'gamma', 'vega', 'theta')
+
+def _columns(positions: list):
+    # Direct field access; dicts missing a field take the defaulting path
+    if positions and isinstance(positions[0], Position):
+        return ([pos.symbol for pos in positions],
+                [[pos.delta for pos in positions], [pos.gamma for pos in positions],
+                 [pos.vega for pos in positions], [pos.theta for pos in positions]])
+    try:
+        return [pos['symbol'] for pos in positions], [[pos[g] for pos in positions] for g in EXPOSURE_GREEKS]
+    except KeyError:
+        return [pos.get('symbol') for pos in positions], [[pos.get(g, 0) for pos in positions] for g in EXPOSURE_GREEKS]
+
+def _to_soa(positions: list):
+    """
+    Positions (dicts or Position) as (symbols in first-seen order, int symbol index per position,
+    (n_greeks, N) greek array).
+    """
+    symbols, columns = _columns(positions)
+    index = {}
+    sym_idx = np.fromiter((index.setdefault(s, len(index)) for s in symbols), dtype=np.intp, count=len(symbols))
+    greeks = np.array(columns, dtype=np.float64).reshape(len(EXPOSURE_GREEKS), len(symbols))
+    return list(index), sym_idx, greeks
+
 def compute_portfolio_exposure(positions: list) -> dict:
     """
     Calculate total delta, gamma, vega, theta by asset.
     Returns: { 'BTC': {'delta': ..., 'gamma': ...}, ... }
     """
-    exposures = {}
-    for pos in positions:
-        asset = pos.get('symbol')
-        if asset not in exposures:
-            exposures[asset] = {'delta': 0, 'gamma': 0, 'vega': 0, 'theta': 0}
-        exposures[asset]['delta'] += pos.get('delta', 0)
-        exposures[asset]['gamma'] += pos.get('gamma', 0)
-        exposures[asset]['vega'] += pos.get('vega', 0)
-        exposures[asset]['theta'] += pos.get('theta', 0)
-    return exposures
+    symbols, sym_idx, greeks = _to_soa(positions)
+    # One weighted bincount per greek: (n_greeks, n_symbols)
+    totals = np.array([np.bincount(sym_idx, weights=g, minlength=len(symbols)) for g in greeks])
+    return {asset: dict(zip(EXPOSURE_GREEKS, totals[:, i].tolist())) for i, asset in enumerate(symbols)}
+
+def _solve_corr(C: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    Solve C x = b for a symmetric PSD correlation matrix via Cholesky; near-singular
+    matrices fall back to the minimum-norm least-squares solution (what pinv gave).
+    """
+    if not np.isfinite(C).all():
+        raise np.linalg.LinAlgError("correlation matrix has non-finite entries")
+    try:
+        L = np.linalg.cholesky(C + CORR_RIDGE * np.eye(len(C)))
+        pivots = np.diag(L) ** 2
+        if pivots.min() >= CHOL_MIN_PIVOT_RATIO * pivots.max():
+            return cho_solve((L, True), b)
+    except np.linalg.LinAlgError:
+        pass
+    return np.linalg.lstsq(C, b, rcond=None)[0]
 
 def optimal_hedge_allocation(exposures: dict, corr_matrix: pd.DataFrame) -> dict:
     """
@@ -32,10 +102,9 @@ def optimal_hedge_allocation(exposures: dict, corr_matrix: pd.DataFrame) -> dict
     """
     assets = list(exposures.keys())
     deltas = np.array([exposures[a]['delta'] for a in assets])
-    # Invert correlation matrix for risk-parity-like allocation
+    # Solve C w = -deltas for a risk-parity-like allocation (no explicit inverse)
     try:
-        inv_corr = np.linalg.pinv(corr_matrix.values)
-        weights = -inv_corr @ deltas
+        weights = -_solve_corr(np.asarray(corr_matrix.values, dtype=np.float64), deltas)
         # Normalize weights to total delta magnitude
         total_abs = np.sum(np.abs(weights))
         if total_abs > 0:
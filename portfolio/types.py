@@ -0,0 +1,18 @@
+from dataclasses import dataclass
+
+@dataclass(slots=True)
+class Position:
+    """
+    Greek exposure of one leg. Slots keep instances small and attribute reads cheaper than dict lookups.
+    """
+    symbol: str
+    delta: float = 0.0
+    gamma: float = 0.0
+    vega: float = 0.0
+    theta: float = 0.0
+
+    @classmethod
+    def from_dict(cls, pos: dict) -> 'Position':
+        # Validate once at ingest; missing greeks default to zero
+        return cls(pos['symbol'], float(pos.get('delta', 0)), float(pos.get('gamma', 0)),
+                   float(pos.get('vega', 0)), float(pos.get('theta', 0)))
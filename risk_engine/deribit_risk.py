@@ -1,10 +1,15 @@
 import os
 import time
+import asyncio
+import httpx
+import numpy as np
 import requests
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 from typing import List, Dict, Optional
+from exchange_api._http import HAS_H2, LIMITS
 from risk_engine.risk_metrics import (
-    calculate_delta, calculate_gamma, calculate_vega, calculate_theta,
+    calculate_greeks_cached,
     calculate_var, aggregate_portfolio_risks
 )
 
@@ -15,11 +20,21 @@ DERIBIT_BASE_URL = "https://www.deribit.com/api/v2"
 CLIENT_ID = os.getenv("DERIBIT_API_KEY")
 CLIENT_SECRET = os.getenv("DERIBIT_API_SECRET")
 USE_MOCK = os.getenv("USE_MOCK_OKX", "False").lower() == "true"
+# From this many option legs on, one book-summary call beats fanning out per-instrument tickers
+BOOK_SUMMARY_MIN_INSTRUMENTS = 20
+TICKER_TIMEOUT_S = 5.0
 
 class DeribitAPI:
     def __init__(self):
         self.base_url = DERIBIT_BASE_URL
         self.access_token = None
+        # One keep-alive session so a refresh reuses a single TLS connection
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+        # Ticker fan-outs run on this private loop so the async client's pooled connections
+        # (bound to the loop that opened them) survive from one refresh to the next
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._aclient: Optional[httpx.AsyncClient] = None
         if not USE_MOCK:
             self.authenticate()
 
@@ -30,16 +45,14 @@ class DeribitAPI:
             "client_id": CLIENT_ID,
             "client_secret": CLIENT_SECRET
         }
-        response = requests.get(url, params=data)
+        response = self.session.get(url, params=data)
         response.raise_for_status()
         self.access_token = response.json()['result']['access_token']
+        self.session.headers['Authorization'] = f"Bearer {self.access_token}"
 
     def _get(self, endpoint, params=None, private=False):
-        url = f"{self.base_url}{endpoint}"
-        headers = {}
-        if private and self.access_token:
-            headers['Authorization'] = f"Bearer {self.access_token}"
-        response = requests.get(url, params=params, headers=headers)
+        # The bearer token lives on the session once authenticated; public endpoints ignore it
+        response = self.session.get(f"{self.base_url}{endpoint}", params=params)
         response.raise_for_status()
         return response.json()['result']
 
@@ -60,6 +73,62 @@ class DeribitAPI:
     def get_ticker(self, instrument_name):
         return self._get(f"/public/ticker", {"instrument_name": instrument_name})
 
+    def _async_client(self) -> httpx.AsyncClient:
+        if self._aclient is None:
+            self._aclient = httpx.AsyncClient(http2=HAS_H2, timeout=TICKER_TIMEOUT_S, limits=LIMITS)
+        return self._aclient
+
+    async def _aget(self, endpoint, params=None):
+        headers = {'Authorization': self.session.headers['Authorization']} if 'Authorization' in self.session.headers else None
+        response = await self._async_client().get(f"{self.base_url}{endpoint}", params=params, headers=headers)
+        response.raise_for_status()
+        return response.json()['result']
+
+    async def get_tickers_bulk(self, instruments: List[str]) -> Dict[str, dict]:
+        """
+        Fetch /public/ticker for every instrument concurrently over the instance's connection pool.
+        Await it on the API's own loop (get_tickers does); the pool is bound to that loop.
+        """
+        results = await asyncio.gather(*(self._aget("/public/ticker", {"instrument_name": name}) for name in instruments))
+        return dict(zip(instruments, results))
+
+    def _run(self, coro):
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+        return self._loop.run_until_complete(coro)
+
+    def get_book_summary(self, currency="BTC", kind="option") -> Dict[str, dict]:
+        """
+        Mark/IV/underlying summary for every live instrument of a currency in one call.
+        """
+        rows = self._get("/public/get_book_summary_by_currency", {"currency": currency, "kind": kind})
+        return {row['instrument_name']: row for row in rows}
+
+    def get_tickers(self, instruments: List[str], currency="BTC") -> Dict[str, dict]:
+        """
+        Market data for many instruments: one book-summary call for large books, a concurrent
+        ticker fan-out otherwise (sequential when already inside a running event loop).
+        """
+        if not instruments:
+            return {}
+        if len(instruments) >= BOOK_SUMMARY_MIN_INSTRUMENTS:
+            summary = self.get_book_summary(currency)
+            return {name: summary[name] for name in instruments if name in summary}
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return self._run(self.get_tickers_bulk(instruments))
+        return {name: self.get_ticker(name) for name in instruments}
+
+    def close(self):
+        if self._aclient is not None:
+            self._run(self._aclient.aclose())
+            self._aclient = None
+        if self._loop is not None:
+            self._loop.close()
+            self._loop = None
+        self.session.close()
+
     def get_account_summary(self, currency="BTC"):
         if USE_MOCK:
             return {"equity": 1.0, "available_funds": 0.8}
@@ -81,13 +150,18 @@ class RiskEngine:
 
     def fetch_and_compute(self):
         positions = self.api.get_positions()
+        # Refresh spot and implied vol for all option legs in one batch before pricing
+        if not USE_MOCK:
+            legs = {pos['instrument_name']: pos for pos in positions if pos['kind'] == 'option'}
+            for name, ticker in self.api.get_tickers(list(legs)).items():
+                pos = legs[name]
+                pos['S'] = ticker.get('underlying_price', pos['S'])
+                if ticker.get('mark_iv'):
+                    pos['sigma'] = ticker['mark_iv'] / 100
         # Compute Greeks for each position
         for pos in positions:
             if pos['kind'] == 'option':
-                pos['delta'] = calculate_delta(pos['S'], pos['K'], pos['T'], pos['r'], pos['sigma'], pos['option_type'])
-                pos['gamma'] = calculate_gamma(pos['S'], pos['K'], pos['T'], pos['r'], pos['sigma'])
-                pos['vega'] = calculate_vega(pos['S'], pos['K'], pos['T'], pos['r'], pos['sigma'])
-                pos['theta'] = calculate_theta(pos['S'], pos['K'], pos['T'], pos['r'], pos['sigma'], pos['option_type'])
+                pos.update(calculate_greeks_cached(pos['S'], pos['K'], pos['T'], pos['r'], pos['sigma'], pos['option_type']))
             else:
                 pos['delta'] = pos['size']
                 pos['gamma'] = 0
@@ -95,15 +169,15 @@ class RiskEngine:
                 pos['theta'] = 0
         agg = aggregate_portfolio_risks(positions)
         # Mock price series for VaR
-        price_series = [57000 + 1000 * np.sin(i/5) for i in range(100)]
+        price_series = 57000.0 + 1000.0 * np.sin(np.arange(100, dtype=np.float64) / 5.0)
         var = calculate_var(price_series)
         return {"positions": positions, "aggregate": agg, "VaR": var}
 
 if __name__ == "__main__":
-    import numpy as np
     deribit = DeribitAPI()
     engine = RiskEngine(deribit)
     result = engine.fetch_and_compute()
+    deribit.close()
     print("\n--- Real-Time Risk Metrics ---")
     print("Positions:")
     for pos in result["positions"]:
@@ -1,53 +1,191 @@
 import numpy as np
 import pandas as pd
-from scipy.stats import norm
 import math
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Union
 import os
 import csv
+from functools import lru_cache
+from scipy.special import ndtr, ndtri
+from utils.jit import njit, prange, HAS_NUMBA
 from config import get_config  # Assumes get_config() returns a dict or has a method to get config values
 
+SQRT_2 = math.sqrt(2.0)
+SQRT_2PI = math.sqrt(2 * math.pi)
+
+# --- Scalar Black-Scholes kernels (Numba-compiled when available) ---
+@njit(cache=True, fastmath=True)
+def _ncdf(x):
+    return 0.5 * math.erfc(-x / SQRT_2)
+
+@njit(cache=True, fastmath=True)
+def _npdf(x):
+    return math.exp(-0.5 * x * x) / SQRT_2PI
+
+@njit(cache=True, fastmath=True)
+def _d1(S, K, T, r, sigma):
+    return (math.log(S / K) + (r + 0.5 * sigma * sigma) * T) / (sigma * math.sqrt(T))
+
+@njit(cache=True, fastmath=True)
+def _bs_price_kernel(S, K, T, r, sigma, is_call):
+    d1 = _d1(S, K, T, r, sigma)
+    d2 = d1 - sigma * math.sqrt(T)
+    if is_call:
+        return S * _ncdf(d1) - K * math.exp(-r * T) * _ncdf(d2)
+    return K * math.exp(-r * T) * _ncdf(-d2) - S * _ncdf(-d1)
+
+@njit(cache=True, fastmath=True)
+def _delta_kernel(S, K, T, r, sigma, is_call):
+    nd1 = _ncdf(_d1(S, K, T, r, sigma))
+    return nd1 if is_call else nd1 - 1.0
+
+@njit(cache=True, fastmath=True)
+def _gamma_kernel(S, K, T, r, sigma):
+    return _npdf(_d1(S, K, T, r, sigma)) / (S * sigma * math.sqrt(T))
+
+@njit(cache=True, fastmath=True)
+def _vega_kernel(S, K, T, r, sigma):
+    return S * _npdf(_d1(S, K, T, r, sigma)) * math.sqrt(T) / 100
+
+@njit(cache=True, fastmath=True)
+def _theta_kernel(S, K, T, r, sigma, is_call):
+    sqrt_t = math.sqrt(T)
+    d1 = _d1(S, K, T, r, sigma)
+    d2 = d1 - sigma * sqrt_t
+    decay = -S * _npdf(d1) * sigma / (2 * sqrt_t)
+    if is_call:
+        return (decay - r * K * math.exp(-r * T) * _ncdf(d2)) / 365
+    return (decay + r * K * math.exp(-r * T) * _ncdf(-d2)) / 365
+
 def black_scholes_price(S: float, K: float, T: float, r: float, sigma: float, option_type: str) -> float:
     """
     Calculate Black-Scholes price for European options.
     """
-    d1 = (math.log(S / K) + (r + 0.5 * sigma ** 2) * T) / (sigma * math.sqrt(T))
-    d2 = d1 - sigma * math.sqrt(T)
-    if option_type == 'call':
-        price = S * norm.cdf(d1) - K * math.exp(-r * T) * norm.cdf(d2)
-    else:
-        price = K * math.exp(-r * T) * norm.cdf(-d2) - S * norm.cdf(-d1)
-    return price
+    return _bs_price_kernel(float(S), float(K), float(T), float(r), float(sigma), option_type == 'call')
 
 def calculate_delta(S: float, K: float, T: float, r: float, sigma: float, option_type: str) -> float:
-    d1 = (math.log(S / K) + (r + 0.5 * sigma ** 2) * T) / (sigma * math.sqrt(T))
-    if option_type == 'call':
-        return norm.cdf(d1)
-    else:
-        return norm.cdf(d1) - 1
+    return _delta_kernel(float(S), float(K), float(T), float(r), float(sigma), option_type == 'call')
 
 def calculate_gamma(S: float, K: float, T: float, r: float, sigma: float) -> float:
-    d1 = (math.log(S / K) + (r + 0.5 * sigma ** 2) * T) / (sigma * math.sqrt(T))
-    return norm.pdf(d1) / (S * sigma * math.sqrt(T))
+    return _gamma_kernel(float(S), float(K), float(T), float(r), float(sigma))
 
 def calculate_vega(S: float, K: float, T: float, r: float, sigma: float) -> float:
-    d1 = (math.log(S / K) + (r + 0.5 * sigma ** 2) * T) / (sigma * math.sqrt(T))
-    return S * norm.pdf(d1) * math.sqrt(T) / 100  # Per 1% change in vol
+    return _vega_kernel(float(S), float(K), float(T), float(r), float(sigma))  # Per 1% change in vol
 
 def calculate_theta(S: float, K: float, T: float, r: float, sigma: float, option_type: str) -> float:
-    d1 = (math.log(S / K) + (r + 0.5 * sigma ** 2) * T) / (sigma * math.sqrt(T))
-    d2 = d1 - sigma * math.sqrt(T)
-    if option_type == 'call':
-        theta = (-S * norm.pdf(d1) * sigma / (2 * math.sqrt(T)) - r * K * math.exp(-r * T) * norm.cdf(d2)) / 365
+    return _theta_kernel(float(S), float(K), float(T), float(r), float(sigma), option_type == 'call')
+
+@njit(cache=True, fastmath=True)
+def _all_greeks_kernel(S, K, T, r, sigma, is_call):
+    sqrt_t = math.sqrt(T)
+    d1 = _d1(S, K, T, r, sigma)
+    d2 = d1 - sigma * sqrt_t
+    pdf_d1 = _npdf(d1)
+    decay = -S * pdf_d1 * sigma / (2 * sqrt_t)
+    disc = r * K * math.exp(-r * T)
+    if is_call:
+        delta = _ncdf(d1)
+        theta = (decay - disc * _ncdf(d2)) / 365
     else:
-        theta = (-S * norm.pdf(d1) * sigma / (2 * math.sqrt(T)) + r * K * math.exp(-r * T) * norm.cdf(-d2)) / 365
-    return theta
-
-def calculate_var(price_series: List[float], confidence_level: float = 0.95) -> float:
-    returns = np.diff(np.log(price_series))
-    mean = np.mean(returns)
-    std = np.std(returns)
-    var = norm.ppf(1 - confidence_level, mean, std) * np.mean(price_series)
+        delta = _ncdf(d1) - 1.0
+        theta = (decay + disc * _ncdf(-d2)) / 365
+    return delta, pdf_d1 / (S * sigma * sqrt_t), S * pdf_d1 * sqrt_t / 100, theta
+
+def compute_all_greeks(S: float, K: float, T: float, r: float, sigma: float, option_type: str) -> tuple:
+    """
+    (delta, gamma, vega, theta) for one option with d1/d2 and the normal terms computed once.
+    """
+    return _all_greeks_kernel(float(S), float(K), float(T), float(r), float(sigma), option_type == 'call')
+
+def warm_up_kernels():
+    """
+    Compile (or load from the numba cache) every scalar pricing kernel once, so the first
+    risk command or monitor tick does not pay JIT latency.
+    """
+    args = (57000.0, 60000.0, 0.1, 0.05, 0.65)
+    _bs_price_kernel(*args, True)
+    _delta_kernel(*args, True)
+    _gamma_kernel(*args)
+    _vega_kernel(*args)
+    _theta_kernel(*args, True)
+    _all_greeks_kernel(*args, True)
+    calculate_greeks_batch(*args, True)
+
+# Quantization applied to cache keys: spot to 0.1, expiry to 1e-5 yr, vol to 1e-4
+GREEKS_CACHE_SIZE = 8192
+
+@lru_cache(maxsize=GREEKS_CACHE_SIZE)
+def _greeks_cached(S: float, K: float, T: float, r: float, sigma: float, option_type: str) -> tuple:
+    return compute_all_greeks(S, K, T, r, sigma, option_type)
+
+def calculate_greeks_cached(S: float, K: float, T: float, r: float, sigma: float, option_type: str) -> Dict[str, float]:
+    """
+    Memoized delta/gamma/vega/theta for one option on a quantized (S, K, T, r, sigma, type) key.
+    Repeated rebalances with shared strikes or a slow-moving spot hit the cache instead of norm.cdf.
+    """
+    delta, gamma, vega, theta = _greeks_cached(round(S, 1), K, round(T, 5), r, round(sigma, 4), option_type)
+    return {'delta': delta, 'gamma': gamma, 'vega': vega, 'theta': theta}
+
+def clear_greeks_cache():
+    """Drop memoized greeks, e.g. after the session closes and expiries roll."""
+    _greeks_cached.cache_clear()
+
+@njit(parallel=True, fastmath=True, cache=True)
+def _greeks_batch_kernel(S, K, T, r, sigma, is_call, out):
+    # Fused per-option pass: no d1/d2/pdf temporaries, rows of out are delta/gamma/vega/theta
+    for i in prange(S.shape[0]):
+        out[0, i], out[1, i], out[2, i], out[3, i] = _all_greeks_kernel(S[i], K[i], T[i], r[i], sigma[i], is_call[i])
+
+def calculate_greeks_batch(S, K, T, r, sigma, is_call) -> Dict[str, np.ndarray]:
+    """
+    Delta, gamma, vega and theta for arrays of options in one pass (same units as the scalar functions).
+    d1/d2 and the normal cdf/pdf terms are computed once and shared across the greeks;
+    with numba this is a single fused parallel pass, otherwise NumPy ufuncs.
+    """
+    S, K, T, r, sigma = (np.asarray(x, dtype=np.float64) for x in (S, K, T, r, sigma))
+    is_call = np.asarray(is_call, dtype=bool)
+    if HAS_NUMBA:
+        shape = np.broadcast_shapes(S.shape, K.shape, T.shape, r.shape, sigma.shape, is_call.shape)
+        args = [np.broadcast_to(a, shape).ravel() for a in (S, K, T, r, sigma, is_call)]
+        out = np.empty((4, args[0].size))
+        _greeks_batch_kernel(*args, out)
+        return dict(zip(('delta', 'gamma', 'vega', 'theta'), out.reshape((4,) + shape)))
+    sign = np.where(is_call, 1.0, -1.0)
+    sqrt_t = np.sqrt(T)
+    d1 = (np.log(S / K) + (r + 0.5 * sigma * sigma) * T) / (sigma * sqrt_t)
+    d2 = d1 - sigma * sqrt_t
+    # ndtr is the ufunc behind norm.cdf, without the rv_continuous dispatch
+    pdf_d1 = np.exp(-0.5 * d1 * d1) / SQRT_2PI
+    disc = K * np.exp(-r * T)
+    decay = -S * pdf_d1 * sigma / (2 * sqrt_t)
+    return {
+        'delta': ndtr(d1) - (1.0 - sign) / 2,
+        'gamma': pdf_d1 / (S * sigma * sqrt_t),
+        'vega': S * pdf_d1 * sqrt_t / 100,
+        'theta': (decay - sign * r * disc * ndtr(sign * d2)) / 365,
+    }
+
+def calculate_delta_batch(S, K, T, r, sigma, is_call) -> np.ndarray:
+    S, K, T, r, sigma = (np.asarray(x, dtype=np.float64) for x in (S, K, T, r, sigma))
+    d1 = (np.log(S / K) + (r + 0.5 * sigma ** 2) * T) / (sigma * np.sqrt(T))
+    nd1 = ndtr(d1)
+    return np.where(np.asarray(is_call, dtype=bool), nd1, nd1 - 1)
+
+def aggregate_greeks_arrays(S, K, T, r, sigma, is_call, sizes) -> Dict[str, float]:
+    """
+    Size-weighted portfolio greeks for options given as parallel arrays; empty arrays give zeros.
+    """
+    greeks = calculate_greeks_batch(S, K, T, r, sigma, is_call)
+    sizes = np.asarray(sizes, dtype=np.float64)
+    return {g: float(v @ sizes) for g, v in greeks.items()}
+
+def calculate_var(price_series: Union[List[float], np.ndarray], confidence_level: float = 0.95) -> float:
+    prices = np.asarray(price_series, dtype=np.float64)
+    # Log returns computed in one scratch buffer: log in place, then diff into its head
+    lr = np.log(prices, out=np.empty_like(prices))
+    returns = np.subtract(lr[1:], lr[:-1], out=lr[:-1])
+    mean = returns.mean()
+    std = returns.std()
+    var = (ndtri(1 - confidence_level) * std + mean) * prices.mean()
     return abs(var)
 
 def calculate_correlation_matrix(price_dict: Dict[str, List[float]]) -> pd.DataFrame:
@@ -66,32 +204,18 @@ def aggregate_portfolio_risks(positions: List[Dict], use_dynamic_optimization: O
     # For now, just log the toggle and proceed as normal
     if use_dynamic_optimization:
         print("[INFO] Dynamic strike/expiry optimization enabled for risk aggregation.")
-    total_delta = 0
-    total_gamma = 0
-    total_vega = 0
-    total_theta = 0
-    for pos in positions:
-        size = pos.get('position_size', 1)
-        if pos['type'] == 'option':
-            delta = calculate_delta(pos['S'], pos['K'], pos['T'], pos['r'], pos['sigma'], pos['option_type']) * size
-            gamma = calculate_gamma(pos['S'], pos['K'], pos['T'], pos['r'], pos['sigma']) * size
-            vega = calculate_vega(pos['S'], pos['K'], pos['T'], pos['r'], pos['sigma']) * size
-            theta = calculate_theta(pos['S'], pos['K'], pos['T'], pos['r'], pos['sigma'], pos['option_type']) * size
-        else:
-            delta = size
-            gamma = 0
-            vega = 0
-            theta = 0
-        total_delta += delta
-        total_gamma += gamma
-        total_vega += vega
-        total_theta += theta
-    return {
-        'delta': total_delta,
-        'gamma': total_gamma,
-        'vega': total_vega,
-        'theta': total_theta
-    }
+    options = [pos for pos in positions if pos['type'] == 'option']
+    others = [pos for pos in positions if pos['type'] != 'option']
+    totals = {'delta': 0.0, 'gamma': 0.0, 'vega': 0.0, 'theta': 0.0}
+    if options:
+        n = len(options)
+        fields = (np.fromiter((pos[f] for pos in options), dtype=np.float64, count=n) for f in ('S', 'K', 'T', 'r', 'sigma'))
+        is_call = np.fromiter((pos['option_type'] == 'call' for pos in options), dtype=bool, count=n)
+        sizes = np.fromiter((pos.get('position_size', 1) for pos in options), dtype=np.float64, count=n)
+        totals.update(aggregate_greeks_arrays(*fields, is_call, sizes))
+    # Non-option legs carry delta equal to their size and no higher-order greeks
+    totals['delta'] += float(sum(pos.get('position_size', 1) for pos in others))
+    return totals
 
 def import_historical_csv(csv_path: str) -> pd.DataFrame:
     """
@@ -180,3 +304,100 @@ def import_positions_from_csv(csv_path: str) -> list:
                 pass
         positions.append(pos)
     return positions
+
+# --- Unit Test ---
+def _reference_greeks(S, K, T, r, sigma, is_call):
+    # Textbook Black-Scholes through scipy.stats.norm, in the units used above
+    from scipy.stats import norm
+    S, K, T, r, sigma = (np.asarray(x, dtype=np.float64) for x in (S, K, T, r, sigma))
+    is_call = np.asarray(is_call, dtype=bool)
+    d1 = (np.log(S / K) + (r + 0.5 * sigma ** 2) * T) / (sigma * np.sqrt(T))
+    d2 = d1 - sigma * np.sqrt(T)
+    disc = K * np.exp(-r * T)
+    price = np.where(is_call, S * norm.cdf(d1) - disc * norm.cdf(d2), disc * norm.cdf(-d2) - S * norm.cdf(-d1))
+    decay = -S * norm.pdf(d1) * sigma / (2 * np.sqrt(T))
+    return {
+        'price': price,
+        'delta': np.where(is_call, norm.cdf(d1), norm.cdf(d1) - 1),
+        'gamma': norm.pdf(d1) / (S * sigma * np.sqrt(T)),
+        'vega': S * norm.pdf(d1) * np.sqrt(T) / 100,
+        'theta': np.where(is_call, decay - r * disc * norm.cdf(d2), decay + r * disc * norm.cdf(-d2)) / 365,
+    }
+
+def _greek_grid(n=2000, seed=0):
+    # Deep ITM/OTM strikes, expiries from hours to two years, zero and non-zero rates
+    rng = np.random.default_rng(seed)
+    S = rng.uniform(20000, 80000, n)
+    K = S * np.exp(rng.uniform(-1.0, 1.0, n))
+    T = np.exp(rng.uniform(np.log(1 / (365 * 24)), np.log(2.0), n))
+    r = rng.choice([0.0, 0.01, 0.05], n)
+    sigma = rng.uniform(0.1, 1.5, n)
+    is_call = rng.random(n) < 0.5
+    return S, K, T, r, sigma, is_call
+
+GREEK_RTOL = 1e-9
+# Absolute floor for values that are ~0 far out of the money
+GREEK_ATOL = 1e-12
+
+def _check_scalar_kernels():
+    S, K, T, r, sigma, is_call = _greek_grid()
+    ref = _reference_greeks(S, K, T, r, sigma, is_call)
+    for i in range(len(S)):
+        args = (S[i], K[i], T[i], r[i], sigma[i])
+        kind = 'call' if is_call[i] else 'put'
+        scalar = {
+            'price': black_scholes_price(*args, kind),
+            'delta': calculate_delta(*args, kind),
+            'gamma': calculate_gamma(*args),
+            'vega': calculate_vega(*args),
+            'theta': calculate_theta(*args, kind),
+        }
+        fused = dict(zip(('delta', 'gamma', 'vega', 'theta'), compute_all_greeks(*args, kind)))
+        for g, v in scalar.items():
+            want = ref[g][i]
+            # Prices are compared relative to spot: the call-put difference of two large terms loses digits
+            tol = GREEK_RTOL * (S[i] if g == 'price' else abs(want)) + GREEK_ATOL
+            assert abs(v - want) <= tol, (g, args, kind, v, want)
+            if g in fused:
+                assert abs(fused[g] - want) <= tol, (g, args, kind, fused[g], want)
+    print("Scalar Black-Scholes kernels match scipy.stats.norm.")
+
+def _check_batch_kernels():
+    S, K, T, r, sigma, is_call = _greek_grid(seed=1)
+    ref = _reference_greeks(S, K, T, r, sigma, is_call)
+    batch = calculate_greeks_batch(S, K, T, r, sigma, is_call)
+    for g in batch:
+        assert batch[g].shape == S.shape
+        assert np.allclose(batch[g], ref[g], rtol=GREEK_RTOL, atol=GREEK_ATOL), g
+
+    # Scalar rate broadcast against the option arrays
+    batch = calculate_greeks_batch(S, K, T, 0.05, sigma, is_call)
+    ref = _reference_greeks(S, K, T, 0.05, sigma, is_call)
+    for g in batch:
+        assert np.allclose(batch[g], ref[g], rtol=GREEK_RTOL, atol=GREEK_ATOL), g
+
+    # 2-D strike x expiry surface from a row of strikes and a column of expiries
+    S2, K2, T2 = 50000.0, np.linspace(30000, 70000, 9), np.array([[1 / 365], [0.25], [1.0]])
+    batch = calculate_greeks_batch(S2, K2, T2, 0.01, 0.6, True)
+    ref = _reference_greeks(S2, K2, T2, 0.01, 0.6, True)
+    for g in batch:
+        assert batch[g].shape == (3, 9)
+        assert np.allclose(batch[g], ref[g], rtol=GREEK_RTOL, atol=GREEK_ATOL), g
+
+    sizes = np.random.default_rng(2).uniform(-5, 5, S.size)
+    agg = aggregate_greeks_arrays(S, K, T, r, sigma, is_call, sizes)
+    ref = _reference_greeks(S, K, T, r, sigma, is_call)
+    for g, v in agg.items():
+        want = float(ref[g] @ sizes)
+        assert abs(v - want) <= 1e-9 * np.abs(ref[g] * sizes).sum() + GREEK_ATOL, g
+    empty = np.empty(0)
+    assert aggregate_greeks_arrays(empty, empty, empty, empty, empty, empty.astype(bool), empty) == \
+        {'delta': 0.0, 'gamma': 0.0, 'vega': 0.0, 'theta': 0.0}
+    print("Batch greeks and portfolio aggregation match scipy.stats.norm.")
+
+def _unit_test():
+    _check_scalar_kernels()
+    _check_batch_kernels()
+
+if __name__ == "__main__":
+    _unit_test()
@@ -1,39 +1,71 @@
-from datetime import datetime, timedelta
+import numpy as np
+from datetime import datetime
 
-def select_option(option_chain, type, moneyness="ATM", days_to_expiry=7):
+_DAY_US = int(np.timedelta64(1, 'D') // np.timedelta64(1, 'us'))
+
+def prepare_chain(option_chain):
+    """
+    Bucket an option chain by type into arrays sorted by expiry once, so repeated
+    select_option calls skip expiry string parsing and find the expiry window by binary search.
+    Expiries must be ISO dates (YYYY-MM-DD).
+    Returns {'call': {'strike', 'expiry', 'delta', 'spot', 'order', 'ref'}, 'put': {...}};
+    'ref' holds the original dicts and 'order' their position in the chain.
+    """
+    prepared = {}
+    for type in ('call', 'put'):
+        ref = [o for o in option_chain if o['type'] == type]
+        expiry = np.array([o['expiry'] for o in ref], dtype='datetime64[D]').astype('datetime64[us]')
+        order = np.argsort(expiry, kind='stable')
+        prepared[type] = {
+            'strike': np.array([o['strike'] for o in ref], dtype=np.float64)[order],
+            'expiry': expiry[order],
+            'delta': np.array([o.get('delta', np.nan) for o in ref], dtype=np.float64)[order],
+            'spot': np.array([o.get('spot', 0) for o in ref], dtype=np.float64)[order],
+            'order': order,
+            'ref': ref,
+        }
+    return prepared
+
+def select_option(option_chain, type, moneyness="ATM", days_to_expiry=7, spot=None):
     """
     Select an option from the chain by type, moneyness, and expiry window.
     moneyness: 'ATM', 'OTM', 'ITM'
+    option_chain may be a list of option dicts or the output of prepare_chain.
+    spot overrides any per-option 'spot' field.
     """
-    now = datetime.utcnow()
-    filtered = [o for o in option_chain if o['type'] == type]
-    # Expiry filter
-    filtered = [o for o in filtered if abs((datetime.strptime(o['expiry'], "%Y-%m-%d") - now).days) <= days_to_expiry]
-    if not filtered:
+    chain = option_chain if isinstance(option_chain, dict) else prepare_chain(option_chain)
+    bucket = chain.get(type)
+    if bucket is None or not bucket['ref']:
+        return None
+    # Whole days to expiry (floored like timedelta.days) within +/-k  <=>  expiry in [now - k, now + k + 1)
+    k = int(np.floor(days_to_expiry))
+    if k < 0:
         return None
+    now = int(np.datetime64(datetime.utcnow(), 'us').astype(np.int64))
+    expiry_us = bucket['expiry'].view(np.int64)
+    lo = int(expiry_us.searchsorted(now - k * _DAY_US))
+    hi = int(expiry_us.searchsorted(now + (k + 1) * _DAY_US))
+    if lo == hi:
+        return None
+    strike = bucket['strike'][lo:hi]
+    spot = bucket['spot'][lo:hi] if spot is None else spot
     # Moneyness filter
-    if moneyness == "ATM":
-        filtered = sorted(filtered, key=lambda x: abs(x['strike'] - x.get('spot', 0)))
-    elif moneyness == "OTM":
-        if type == 'put':
-            filtered = [o for o in filtered if o['strike'] < o.get('spot', 0)]
-        else:
-            filtered = [o for o in filtered if o['strike'] > o.get('spot', 0)]
+    if moneyness == "OTM":
+        idx = np.flatnonzero((strike < spot) if type == 'put' else (strike > spot))
     elif moneyness == "ITM":
-        if type == 'put':
-            filtered = [o for o in filtered if o['strike'] > o.get('spot', 0)]
-        else:
-            filtered = [o for o in filtered if o['strike'] < o.get('spot', 0)]
-    if not filtered:
+        idx = np.flatnonzero((strike > spot) if type == 'put' else (strike < spot))
+    else:
+        idx = np.arange(hi - lo)
+    if not len(idx):
         return None
-    # Closest to ATM or OTM
-    return min(filtered, key=lambda x: abs(x['strike'] - x.get('spot', 0)))
+    # Closest to ATM; ties go to the option listed first in the chain
+    dist = np.abs(strike - spot)[idx] if np.ndim(spot) else np.abs(strike[idx] - spot)
+    order = bucket['order'][lo:hi][idx]
+    return bucket['ref'][int(order[dist == dist.min()].min())]
 
 def hedge_with_protective_put(asset, spot_price, portfolio_delta, option_chain):
-    # Attach spot to each option for moneyness
-    for o in option_chain:
-        o['spot'] = spot_price
-    put = select_option(option_chain, 'put', moneyness="OTM", days_to_expiry=14)
+    chain = option_chain if isinstance(option_chain, dict) else prepare_chain(option_chain)
+    put = select_option(chain, 'put', moneyness="OTM", days_to_expiry=14, spot=spot_price)
     if not put:
         return {'action': 'no_put_found'}
     contracts = abs(portfolio_delta) / abs(put['delta']) if put['delta'] else 1
@@ -46,9 +78,8 @@ def hedge_with_protective_put(asset, spot_price, portfolio_delta, option_chain):
     }
 
 def hedge_with_covered_call(asset, spot_price, holdings, option_chain):
-    for o in option_chain:
-        o['spot'] = spot_price
-    call = select_option(option_chain, 'call', moneyness="OTM", days_to_expiry=14)
+    chain = option_chain if isinstance(option_chain, dict) else prepare_chain(option_chain)
+    call = select_option(chain, 'call', moneyness="OTM", days_to_expiry=14, spot=spot_price)
     if not call:
         return {'action': 'no_call_found'}
     contracts = abs(holdings) / abs(call['delta']) if call['delta'] else 1
@@ -61,10 +92,9 @@ def hedge_with_covered_call(asset, spot_price, holdings, option_chain):
     }
 
 def hedge_with_collar(asset, spot_price, holdings, option_chain):
-    for o in option_chain:
-        o['spot'] = spot_price
-    put = select_option(option_chain, 'put', moneyness="OTM", days_to_expiry=14)
-    call = select_option(option_chain, 'call', moneyness="OTM", days_to_expiry=14)
+    chain = option_chain if isinstance(option_chain, dict) else prepare_chain(option_chain)
+    put = select_option(chain, 'put', moneyness="OTM", days_to_expiry=14, spot=spot_price)
+    call = select_option(chain, 'call', moneyness="OTM", days_to_expiry=14, spot=spot_price)
     if not put or not call:
         return {'action': 'no_collar_found'}
     put_contracts = abs(holdings) / abs(put['delta']) if put['delta'] else 1
@@ -107,6 +137,50 @@ def _unit_test():
     print('Router (put):', select_hedging_strategy('protective_put', 'BTC', spot, delta, mock_chain))
     print('Router (call):', select_hedging_strategy('covered_call', 'BTC', spot, holdings, mock_chain))
     print('Router (collar):', select_hedging_strategy('collar', 'BTC', spot, holdings, mock_chain))
+    _check_select_option_equivalence()
+
+def _select_option_reference(option_chain, type, moneyness="ATM", days_to_expiry=7, spot=None):
+    # The original list/strptime selection, with the spot override applied per option
+    from datetime import datetime as dt
+    now = dt.utcnow()
+    spot_of = (lambda o: o.get('spot', 0)) if spot is None else (lambda o: spot)
+    filtered = [o for o in option_chain if o['type'] == type]
+    filtered = [o for o in filtered if abs((dt.strptime(o['expiry'], "%Y-%m-%d") - now).days) <= days_to_expiry]
+    if moneyness == "OTM":
+        filtered = [o for o in filtered if (o['strike'] < spot_of(o) if type == 'put' else o['strike'] > spot_of(o))]
+    elif moneyness == "ITM":
+        filtered = [o for o in filtered if (o['strike'] > spot_of(o) if type == 'put' else o['strike'] < spot_of(o))]
+    if not filtered:
+        return None
+    return min(filtered, key=lambda o: abs(o['strike'] - spot_of(o)))
+
+def _check_select_option_equivalence(n_chains=300, seed=0):
+    """
+    select_option must pick the same dict as the reference on chains with tied strikes
+    and expiries on both edges of the window.
+    """
+    from datetime import timedelta
+    rng = np.random.default_rng(seed)
+    today = datetime.utcnow().date()
+    for _ in range(n_chains):
+        window = int(rng.integers(0, 15))
+        # Offsets cluster on and around +/-window, where the floored day count flips
+        offsets = np.concatenate([[-window - 1, -window, window, window + 1], rng.integers(-20, 21, 4)])
+        chain = [{
+            'type': 'put' if rng.random() < 0.5 else 'call',
+            'strike': float(rng.choice([29000, 30000, 31000, 32000, 33000])),
+            'expiry': (today + timedelta(days=int(rng.choice(offsets)))).isoformat(),
+            'spot': float(rng.choice([30500, 31000, 31500])),
+        } for _ in range(int(rng.integers(1, 25)))]
+        prepared = prepare_chain(chain)
+        for type in ('call', 'put'):
+            for moneyness in ('ATM', 'OTM', 'ITM'):
+                for spot in (None, 31000.0, 30500.0):
+                    days = window + float(rng.choice([0, 0.5]))
+                    want = _select_option_reference(chain, type, moneyness, days, spot)
+                    got = select_option(prepared, type, moneyness, days, spot)
+                    assert got is want, (type, moneyness, days, spot, got, want, chain)
+    print("select_option matches the reference selection.")
 
 if __name__ == "__main__":
     _unit_test()
@@ -1,12 +1,20 @@
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import ApplicationBuilder, CommandHandler, ContextTypes, CallbackQueryHandler
-from config import TELEGRAM_BOT_TOKEN
+from telegram.ext import ApplicationBuilder, CommandHandler, ContextTypes, CallbackQueryHandler, AIORateLimiter
+from config import TELEGRAM_BOT_TOKEN, SYMBOL_MAPPINGS
 from utils.logger import logger
 import os
 import asyncio
+import time
+import random
+import hashlib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Dict, Optional
 from exchange_api.deribit_api import DeribitClient
+from exchange_api.ws_cache import tob_cache, HAS_WEBSOCKETS
 from risk_engine.risk_metrics import (
-    calculate_delta, calculate_gamma, calculate_vega, calculate_theta,
+    calculate_greeks_batch, warm_up_kernels,
     aggregate_portfolio_risks, calculate_var
 )
 import json
@@ -14,11 +22,12 @@ from dotenv import load_dotenv
 import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-from hedge_commands import hedge_now, hedge_status, hedge_callback_handler
+from hedge_commands import hedge_now, hedge_status
 from ml.volatility_model import format_vol_forecast_message
 from portfolio.multi_asset_hedging import (
     calculate_cross_asset_correlation, compute_portfolio_exposure, optimal_hedge_allocation, format_hedge_portfolio_message
 )
+from portfolio.types import Position
 from hedging.advanced_strategies import construct_iron_condor, construct_butterfly_spread, construct_straddle, evaluate_strategy_payoff
 from backtesting.backtest_engine import BacktestEngine, delta_neutral_strategy
 from compliance.reporting import generate_risk_report
@@ -26,10 +35,178 @@ from analytics.performance_attribution import generate_performance_report
 import numpy as np
 import pandas as pd
 
+try:
+    import aiolimiter  # backs AIORateLimiter (python-telegram-bot[rate-limiter])
+    HAS_RATE_LIMITER = True
+except ImportError:
+    HAS_RATE_LIMITER = False
+
+try:
+    import uvloop  # faster event loop for many concurrent chats and Deribit requests
+    HAS_UVLOOP = True
+except ImportError:
+    HAS_UVLOOP = False
+
 load_dotenv(dotenv_path=".env.local")
 USE_MOCK = os.getenv("USE_MOCK_DERIBIT", "False").lower() == "true"
+# Bot API pool sized for many monitored chats alerting at once; polling gets its own connection
+BOT_POOL_SIZE = 64
+BOT_POOL_TIMEOUT_S = 20
+UPDATES_POOL_TIMEOUT_S = 30
+
+# Rendered reports keyed by a digest of their inputs; renders faster than the threshold are not worth caching
+REPORT_CACHE_SIZE = 256
+REPORT_CACHE_TTL_S = 60
+MIN_CACHED_RENDER_S = 100e-6
+_report_cache = OrderedDict()
+
+def _input_digest(*inputs) -> bytes:
+    h = hashlib.blake2b(digest_size=16)
+    for item in inputs:
+        if isinstance(item, pd.DataFrame):
+            h.update(pd.util.hash_pandas_object(item).values.tobytes())
+            h.update(json.dumps(list(map(str, item.columns))).encode())
+        else:
+            h.update(json.dumps(item, sort_keys=True, default=str).encode())
+        h.update(b'|')
+    return h.digest()
+
+def cached_report(render, *inputs) -> str:
+    """
+    render(*inputs), reusing the output for identical inputs seen within REPORT_CACHE_TTL_S.
+    Only for renders that depend on their inputs alone (nothing stamped with the current time).
+    """
+    key = (render.__name__, _input_digest(*inputs))
+    now = time.monotonic()
+    hit = _report_cache.get(key)
+    if hit is not None and now - hit[0] < REPORT_CACHE_TTL_S:
+        _report_cache.move_to_end(key)
+        return hit[1]
+    report = render(*inputs)
+    if time.monotonic() - now >= MIN_CACHED_RENDER_S:
+        _report_cache[key] = (now, report)
+        _report_cache.move_to_end(key)
+        if len(_report_cache) > REPORT_CACHE_SIZE:
+            _report_cache.popitem(last=False)
+    return report
+
+# The mock price series is constant, so its VaR is computed once
+_MOCK_PRICES = 57000.0 + 1000.0 * np.sin(np.arange(100, dtype=np.float64) / 5.0)
+_MOCK_VAR = calculate_var(_MOCK_PRICES)
+
+# Per-chat risk monitor task and the event that stops it
+monitoring_tasks: Dict[int, asyncio.Task] = {}
+stop_events: Dict[int, asyncio.Event] = {}
+MONITOR_INTERVAL_S = 30
+# After a failed tick, retry after 1, 2, 4, ... s (capped, jittered +/-50%) so chats do not retry in lockstep
+MONITOR_BACKOFF_BASE_S = 1.0
+MONITOR_BACKOFF_MAX_S = 300.0
+MOCK_SPOT = 57000.0
+
+# Outgoing monitor messages: bounded concurrency under Telegram's ~30 msg/s bot limit, and
+# alerts for the same chat within the coalescing window collapse to the latest one
+MAX_CONCURRENT_SENDS = 25
+ALERT_COALESCE_S = 0.1
+_SEND_SEM = asyncio.Semaphore(MAX_CONCURRENT_SENDS)
+_pending_alerts: Dict[int, asyncio.Task] = {}
+_latest_alerts: Dict[int, dict] = {}
+
+async def send_limited(bot, chat_id, **kwargs):
+    async with _SEND_SEM:
+        return await bot.send_message(chat_id=chat_id, **kwargs)
+
+async def _flush_alert(bot, chat_id):
+    await asyncio.sleep(ALERT_COALESCE_S)
+    _pending_alerts.pop(chat_id, None)
+    kwargs = _latest_alerts.pop(chat_id, None)
+    if kwargs is None:
+        return
+    try:
+        await send_limited(bot, chat_id, **kwargs)
+    except Exception as e:
+        # Nobody awaits this task; log here so blocked chats and network errors are not lost
+        logger.error(f"Alert send to chat {chat_id} failed: {e}")
+
+def send_alert(bot, chat_id, **kwargs):
+    """
+    Queue an alert for chat_id; a send is scheduled once per coalescing window with the newest alert.
+    """
+    _latest_alerts[chat_id] = kwargs
+    if chat_id not in _pending_alerts:
+        _pending_alerts[chat_id] = asyncio.create_task(_flush_alert(bot, chat_id))
+
+async def _stop_monitor(chat_id) -> bool:
+    """
+    Signal the chat's monitor to stop and wait for it to finish; False if none was running.
+    """
+    task = monitoring_tasks.pop(chat_id, None)
+    event = stop_events.pop(chat_id, None)
+    if task is None:
+        return False
+    event.set()
+    await asyncio.gather(task, return_exceptions=True)
+    return True
+
+# One authenticated Deribit client shared by all handlers; closed on shutdown
+_deribit_singleton: Optional[DeribitClient] = None
+_deribit_lock = asyncio.Lock()
+
+async def get_client() -> DeribitClient:
+    """
+    Shared DeribitClient, re-authenticating only when its token is missing or about to expire.
+    """
+    global _deribit_singleton
+    async with _deribit_lock:
+        if _deribit_singleton is None:
+            _deribit_singleton = DeribitClient()
+        if _deribit_singleton.is_expired():
+            await _deribit_singleton.authenticate()
+        return _deribit_singleton
 
-monitoring_tasks = {}
+async def close_client(application=None):
+    global _deribit_singleton
+    if _deribit_singleton is not None:
+        await _deribit_singleton.close()
+        _deribit_singleton = None
+
+async def on_startup(application=None):
+    # Hedges read order books from the websocket cache instead of polling REST
+    if HAS_WEBSOCKETS:
+        tob_cache.start(list(SYMBOL_MAPPINGS))
+    else:
+        logger.warning("websockets is not installed; hedges will use REST order books")
+
+async def on_shutdown(application=None):
+    global _BT_POOL
+    await tob_cache.stop()
+    await close_client(application)
+    if _BT_POOL is not None:
+        _BT_POOL.shutdown(cancel_futures=True)
+        _BT_POOL = None
+
+# Message templates, filled with format_map
+_SUMMARY_TMPL = (
+    "\U0001F4CA <b>Portfolio Risk Summary</b>\n"
+    "Delta: <b>{delta:.4f}</b>\n"
+    "Gamma: <b>{gamma:.4f}</b>\n"
+    "Vega: <b>{vega:.4f}</b>\n"
+    "Theta: <b>{theta:.4f}</b>\n"
+    "VaR (mock): <b>{var:.2f}</b>\n"
+)
+_ALERT_TMPL = (
+    "⚠️ <b>Risk Alert for {symbol}</b>\n"
+    "Delta: <b>{delta:.4f}</b>\n"
+    "VaR: <b>{var:.2f}</b>\n"
+    "Suggested hedge: SELL {hedge:.4f} {symbol} futures\n"
+    "Estimated cost: ~${cost:.2f}"
+)
+
+# Breach alert buttons are the same for every chat and tick
+_RISK_ALERT_KEYBOARD = InlineKeyboardMarkup([
+    [InlineKeyboardButton("Hedge Now", callback_data="hedge_now")],
+    [InlineKeyboardButton("Adjust Threshold", callback_data="adjust_threshold")],
+    [InlineKeyboardButton("Stop Monitoring", callback_data="stop_monitoring")]
+])
 
 # Store user monitoring context (symbol, position_size, threshold)
 user_monitor_context = {}
@@ -39,93 +216,114 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def health(update: Update, context: ContextTypes.DEFAULT_TYPE):
     try:
-        client = DeribitClient()
-        await client.authenticate()
-        await client.close()
+        await get_client()
         await update.message.reply_text("✅ Bot is online and Deribit API reachable!")
     except Exception as e:
         await update.message.reply_text(f"❌ Deribit API error: {e}")
 
+MOCK_POSITIONS_PATH = "mock_positions.json"
+_DEFAULT_POSITIONS = (
+    {"instrument_name": "BTC-30AUG24-60000-C", "size": 1, "type": "option", "option_type": "call", "S": 57000, "K": 60000, "T": 0.1, "r": 0.05, "sigma": 0.65},
+    {"instrument_name": "BTC-PERPETUAL", "size": 0.5, "type": "spot", "option_type": None, "S": 57000, "K": 0, "T": 0, "r": 0, "sigma": 0},
+)
+# Parsed positions file, re-read only when its mtime changes
+_positions_cache = {"mtime": None, "data": None}
+
+def load_positions(path: str = MOCK_POSITIONS_PATH) -> list:
+    """
+    Positions from path (or the built-in mock book if it is missing), as fresh dicts callers may mutate.
+    """
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return [dict(pos) for pos in _DEFAULT_POSITIONS]
+    if mtime != _positions_cache["mtime"]:
+        with open(path, "r") as f:
+            _positions_cache["data"] = json.load(f)
+        _positions_cache["mtime"] = mtime
+    return [dict(pos) for pos in _positions_cache["data"]]
+
 async def risk_summary(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text("⏳ Calculating risk summary, please wait...")
     try:
-        client = DeribitClient()
-        await client.authenticate()
+        client = await get_client()
         # Load positions (mocked or from file)
-        MOCK_POSITIONS_PATH = "mock_positions.json"
-        if os.path.exists(MOCK_POSITIONS_PATH):
-            with open(MOCK_POSITIONS_PATH, "r") as f:
-                positions = json.load(f)
-        else:
-            positions = [
-                {"instrument_name": "BTC-30AUG24-60000-C", "size": 1, "type": "option", "option_type": "call", "S": 57000, "K": 60000, "T": 0.1, "r": 0.05, "sigma": 0.65},
-                {"instrument_name": "BTC-PERPETUAL", "size": 0.5, "type": "spot", "option_type": None, "S": 57000, "K": 0, "T": 0, "r": 0, "sigma": 0}
-            ]
-        # Compute Greeks
+        positions = load_positions()
+        # Compute Greeks: all option legs in one vectorized Black-Scholes pass
+        options = [pos for pos in positions if pos["type"] == "option"]
+        if options:
+            inputs = ([pos[f] for pos in options] for f in ("S", "K", "T", "r", "sigma"))
+            greeks = calculate_greeks_batch(*inputs, [pos["option_type"] == "call" for pos in options])
+            for name, values in greeks.items():
+                for pos, value in zip(options, values.tolist()):
+                    pos[name] = value
         for pos in positions:
-            if pos["type"] == "option":
-                pos["delta"] = calculate_delta(pos["S"], pos["K"], pos["T"], pos["r"], pos["sigma"], pos["option_type"])
-                pos["gamma"] = calculate_gamma(pos["S"], pos["K"], pos["T"], pos["r"], pos["sigma"])
-                pos["vega"] = calculate_vega(pos["S"], pos["K"], pos["T"], pos["r"], pos["sigma"])
-                pos["theta"] = calculate_theta(pos["S"], pos["K"], pos["T"], pos["r"], pos["sigma"], pos["option_type"])
-            else:
+            if pos["type"] != "option":
                 pos["delta"] = pos["size"]
                 pos["gamma"] = 0
                 pos["vega"] = 0
                 pos["theta"] = 0
         agg = aggregate_portfolio_risks(positions)
-        price_series = [57000 + 1000 * __import__('math').sin(i/5) for i in range(100)]
-        var = calculate_var(price_series)
-        summary = (
-            f"\U0001F4CA <b>Portfolio Risk Summary</b>\n"
-            f"Delta: <b>{agg['delta']:.4f}</b>\n"
-            f"Gamma: <b>{agg['gamma']:.4f}</b>\n"
-            f"Vega: <b>{agg['vega']:.4f}</b>\n"
-            f"Theta: <b>{agg['theta']:.4f}</b>\n"
-            f"VaR (mock): <b>{var:.2f}</b>\n"
-        )
-        await client.close()
+        var = _MOCK_VAR
+        summary = _SUMMARY_TMPL.format_map({**agg, "var": var})
         await update.message.reply_text(summary, parse_mode="HTML")
     except Exception as e:
         await update.message.reply_text(f"❌ Error: {e}")
 
+async def _on_hedge_now(query, chat_id, ctx):
+    # Mocked hedge logic
+    symbol = ctx.get("symbol", "BTC")
+    size = ctx.get("position_size", 0.0)
+    threshold = ctx.get("risk_threshold", 0.0)
+    # Compute optimal hedge size (mocked)
+    hedge_size = size - threshold
+    # Mock execution
+    status = "success"
+    cost = abs(hedge_size) * 57000  # Mock price
+    slippage = 0.001 * cost
+    msg = (
+        f"✅ Hedge Executed\n"
+        f"Asset: {symbol}\n"
+        f"Hedge Size: {hedge_size:.4f}\n"
+        f"Instrument: {symbol}-PERPETUAL\n"
+        f"Estimated Cost: ${cost:.2f}\n"
+        f"Estimated Slippage: ${slippage:.2f}\n"
+        f"Status: {status}"
+    )
+    await query.edit_message_text(msg)
+
+async def _on_adjust_threshold(query, chat_id, ctx):
+    await query.edit_message_text("Please send the new risk threshold (as a number):")
+    # Set a flag to expect next message as threshold
+    ctx["awaiting_threshold"] = True
+    user_monitor_context[chat_id] = ctx
+
+async def _on_stop_monitoring(query, chat_id, ctx):
+    await _stop_monitor(chat_id)
+    await query.edit_message_text("🛑 Stopped risk monitoring.")
+
+async def _on_view_analytics(query, chat_id, ctx):
+    await query.edit_message_text(f"Button pressed: {query.data}")
+
+_CB_ROUTES = {
+    "hedge_now": _on_hedge_now,
+    "adjust_threshold": _on_adjust_threshold,
+    "stop_monitoring": _on_stop_monitoring,
+    "view_analytics": _on_view_analytics,
+}
+
 async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Single entry point for every inline button; dispatches on callback data.
+    """
     query = update.callback_query
     await query.answer()
     chat_id = query.message.chat_id
-    data = query.data.lower()
-    ctx = user_monitor_context.get(chat_id, {})
-    if data == "hedge_now":
-        # Mocked hedge logic
-        symbol = ctx.get("symbol", "BTC")
-        size = ctx.get("position_size", 0.0)
-        threshold = ctx.get("risk_threshold", 0.0)
-        # Compute optimal hedge size (mocked)
-        hedge_size = size - threshold
-        # Mock execution
-        status = "success"
-        cost = abs(hedge_size) * 57000  # Mock price
-        slippage = 0.001 * cost
-        msg = (
-            f"✅ Hedge Executed\n"
-            f"Asset: {symbol}\n"
-            f"Hedge Size: {hedge_size:.4f}\n"
-            f"Instrument: {symbol}-PERPETUAL\n"
-            f"Estimated Cost: ${cost:.2f}\n"
-            f"Estimated Slippage: ${slippage:.2f}\n"
-            f"Status: {status}"
-        )
-        await query.edit_message_text(msg)
-    elif data == "adjust_threshold":
-        await query.edit_message_text("Please send the new risk threshold (as a number):")
-        # Set a flag to expect next message as threshold
-        ctx["awaiting_threshold"] = True
-        user_monitor_context[chat_id] = ctx
-    elif data == "stop_monitoring":
-        monitoring_tasks[chat_id] = False
-        await query.edit_message_text("🛑 Stopped risk monitoring.")
-    else:
+    route = _CB_ROUTES.get(query.data.lower())
+    if route is None:
         await query.edit_message_text("Unknown action.")
+        return
+    await route(query, chat_id, user_monitor_context.get(chat_id, {}))
 
 async def handle_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat_id = update.effective_chat.id
@@ -154,54 +352,60 @@ async def monitor_risk(update: Update, context: ContextTypes.DEFAULT_TYPE):
         user_monitor_context[chat_id] = {"symbol": symbol, "position_size": position_size, "risk_threshold": risk_threshold}
         await update.message.reply_text(f"Started monitoring {symbol} with position size {position_size} and risk threshold {risk_threshold}.")
 
-        async def monitor_loop():
-            import time
-            while monitoring_tasks.get(chat_id):
+        async def monitor_loop(stop: asyncio.Event):
+            # One price window per monitor, rolled in place; mock VaR until it holds only live marks
+            prices = _MOCK_PRICES.copy()
+            live_ticks = 0
+            var = _MOCK_VAR
+            # For demo, use only Deribit. Extend to OKX/Bybit as needed.
+            # Built once per monitor; ticks only refresh the spot in place
+            positions = [
+                {"instrument_name": f"{symbol}-PERPETUAL", "size": position_size, "position_size": position_size,
+                 "type": "spot", "option_type": None, "S": MOCK_SPOT, "K": 0, "T": 0, "r": 0, "sigma": 0,
+                 "delta": position_size, "gamma": 0, "vega": 0, "theta": 0}
+            ]
+            backoff = MONITOR_BACKOFF_BASE_S
+            while not stop.is_set():
+                delay = MONITOR_INTERVAL_S
                 try:
-                    client = DeribitClient()
-                    await client.authenticate()
-                    # For demo, use only Deribit. Extend to OKX/Bybit as needed.
-                    positions = [
-                        {"instrument_name": f"{symbol}-PERPETUAL", "size": position_size, "type": "spot", "option_type": None, "S": 57000, "K": 0, "T": 0, "r": 0, "sigma": 0}
-                    ]
-                    for pos in positions:
-                        pos["delta"] = pos["size"]
-                        pos["gamma"] = 0
-                        pos["vega"] = 0
-                        pos["theta"] = 0
+                    client = await get_client()
+                    if not USE_MOCK:
+                        mark = (await client.get_orderbook(f"{symbol}-PERPETUAL")).get("mark_price")
+                        if mark:
+                            positions[0]["S"] = mark
+                            prices[:-1] = prices[1:]
+                            prices[-1] = mark
+                            live_ticks += 1
+                            if live_ticks >= len(prices):
+                                var = calculate_var(prices)
                     agg = aggregate_portfolio_risks(positions)
-                    price_series = [57000 + 1000 * __import__('math').sin(i/5) for i in range(100)]
-                    var = calculate_var(price_series)
-                    breached = agg['delta'] > user_monitor_context[chat_id]["risk_threshold"]
-                    if breached:
-                        keyboard = [
-                            [InlineKeyboardButton("Hedge Now", callback_data="hedge_now")],
-                            [InlineKeyboardButton("Adjust Threshold", callback_data="adjust_threshold")],
-                            [InlineKeyboardButton("Stop Monitoring", callback_data="stop_monitoring")]
-                        ]
-                        reply_markup = InlineKeyboardMarkup(keyboard)
-                        msg = (
-                            f"⚠️ <b>Risk Alert for {symbol}</b>\n"
-                            f"Delta: <b>{agg['delta']:.4f}</b>\n"
-                            f"VaR: <b>{var:.2f}</b>\n"
-                            f"Suggested hedge: SELL {agg['delta'] - user_monitor_context[chat_id]['risk_threshold']:.4f} {symbol} futures\n"
-                            f"Estimated cost: ~${abs(agg['delta'] - user_monitor_context[chat_id]['risk_threshold']) * 57000:.2f}"
-                        )
-                        await context.bot.send_message(chat_id=chat_id, text=msg, parse_mode="HTML", reply_markup=reply_markup)
-                    await client.close()
+                    delta = agg['delta']
+                    excess = delta - user_monitor_context[chat_id]["risk_threshold"]
+                    if excess > 0:
+                        msg = _ALERT_TMPL.format_map({"symbol": symbol, "delta": delta, "var": var,
+                                                      "hedge": excess, "cost": excess * MOCK_SPOT})
+                        send_alert(context.bot, chat_id, text=msg, parse_mode="HTML", reply_markup=_RISK_ALERT_KEYBOARD)
+                    backoff = MONITOR_BACKOFF_BASE_S
                 except Exception as e:
-                    await context.bot.send_message(chat_id=chat_id, text=f"❌ Monitor error: {e}")
-                await asyncio.sleep(30)  # Monitor interval
-        # Start background task
-        monitoring_tasks[chat_id] = True
-        asyncio.create_task(monitor_loop())
+                    # Report the first failure of a streak only; retries back off instead of spamming the chat
+                    if backoff == MONITOR_BACKOFF_BASE_S:
+                        await send_limited(context.bot, chat_id, text=f"❌ Monitor error: {e}")
+                    delay = min(backoff, MONITOR_BACKOFF_MAX_S) * random.uniform(0.5, 1.5)
+                    backoff *= 2
+                try:
+                    await asyncio.wait_for(stop.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+        # Start background task, replacing any monitor already running for this chat
+        await _stop_monitor(chat_id)
+        stop_events[chat_id] = event = asyncio.Event()
+        monitoring_tasks[chat_id] = asyncio.create_task(monitor_loop(event))
     except Exception as e:
         await update.message.reply_text(f"❌ Error: {e}")
 
 async def stop_risk_monitoring(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat_id = update.effective_chat.id
-    if monitoring_tasks.get(chat_id):
-        monitoring_tasks[chat_id] = False
+    if await _stop_monitor(chat_id):
         await update.message.reply_text("🛑 Stopped risk monitoring.")
     else:
         await update.message.reply_text("No active risk monitoring task found.")
@@ -217,12 +421,12 @@ async def vol_forecast(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 # --- Multi-Asset Portfolio Hedging Command ---
 async def hedge_portfolio(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    # Mock positions and prices
-    positions = [
+    # Mock positions and prices; positions are validated into Position once, at ingest
+    positions = [Position.from_dict(pos) for pos in (
         {'symbol': 'BTC', 'delta': 1.2, 'gamma': 0.1, 'vega': 0.2, 'theta': -0.01},
         {'symbol': 'ETH', 'delta': -0.5, 'gamma': 0.05, 'vega': 0.1, 'theta': -0.005},
         {'symbol': 'BTC', 'delta': -0.7, 'gamma': 0.02, 'vega': 0.05, 'theta': -0.002}
-    ]
+    )]
     price_data = {'BTC': [10000, 10100, 10200, 10150, 10300], 'ETH': [200, 202, 204, 203, 207]}
     exposures = compute_portfolio_exposure(positions)
     corr = calculate_cross_asset_correlation(price_data)
@@ -231,29 +435,52 @@ async def hedge_portfolio(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text(msg)
 
 # --- Advanced Options Strategies Command ---
-async def strategy_payoff(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    args = context.args
-    if not args or args[0] not in ["iron_condor", "butterfly", "straddle"]:
-        await update.message.reply_text("Usage: /strategy_payoff <iron_condor|butterfly|straddle>")
-        return
+# Demo strategy parameters are fixed, so each strategy's payoff curve is built once
+_PRICE_RANGE = np.linspace(80, 120, 41)
+_STRATEGY_NAMES = frozenset({"iron_condor", "butterfly", "straddle"})
+PAYOFF_SAMPLE_POINTS = 5
+
+@lru_cache(maxsize=None)
+def _strategy_payoff(name: str) -> np.ndarray:
     S, K, width, T, r, sigma = 100, 100, 10, 0.1, 0.01, 0.5
-    price_range = np.linspace(80, 120, 41)
-    if args[0] == "iron_condor":
+    if name == "iron_condor":
         strat = construct_iron_condor(S, K, width, T, r, sigma)
-    elif args[0] == "butterfly":
+    elif name == "butterfly":
         strat = construct_butterfly_spread(S, K, width, T, r, sigma)
     else:
         strat = construct_straddle(S, K, T, r, sigma)
-    payoff = evaluate_strategy_payoff(strat, price_range)
-    msg = f"Strategy: {args[0].replace('_', ' ').title()}\nPayoff (sample): {payoff[:5]}..."
+    payoff = evaluate_strategy_payoff(strat, _PRICE_RANGE)
+    payoff.flags.writeable = False
+    return payoff
+
+async def strategy_payoff(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    args = context.args
+    if not args or args[0] not in _STRATEGY_NAMES:
+        await update.message.reply_text("Usage: /strategy_payoff <iron_condor|butterfly|straddle>")
+        return
+    payoff = _strategy_payoff(args[0])
+    msg = (f"Strategy: {args[0].replace('_', ' ').title()}\n"
+           f"Payoff (sample): {np.array2string(payoff[:PAYOFF_SAMPLE_POINTS], precision=4, separator=', ', suppress_small=True)}...")
     await update.message.reply_text(msg)
 
 # --- Backtesting Command ---
+# Backtests are CPU-bound; they run in worker processes so the bot keeps serving other chats
+BACKTEST_WORKERS = 2
+_BT_POOL: Optional[ProcessPoolExecutor] = None
+
+def _get_bt_pool() -> ProcessPoolExecutor:
+    global _BT_POOL
+    if _BT_POOL is None:
+        _BT_POOL = ProcessPoolExecutor(max_workers=BACKTEST_WORKERS)
+    return _BT_POOL
+
+def _do_backtest(positions: list, price_data: pd.DataFrame) -> dict:
+    return BacktestEngine().run_backtest(delta_neutral_strategy, positions, price_data, 'delta_neutral')
+
 async def backtest(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    engine = BacktestEngine()
     price_data = pd.DataFrame({'close': np.linspace(10000, 11000, 100)})
     positions = []
-    res = engine.run_backtest(delta_neutral_strategy, positions, price_data, 'delta_neutral')
+    res = await asyncio.get_running_loop().run_in_executor(_get_bt_pool(), _do_backtest, positions, price_data)
     msg = f"Backtest complete. Final PnL: {res.get('final_pnl', 0):.2f}"
     await update.message.reply_text(msg)
 
@@ -265,6 +492,7 @@ async def risk_report(update: Update, context: ContextTypes.DEFAULT_TYPE):
     ]
     metrics = aggregate_portfolio_risks(positions)
     compliance_thresholds = {'delta': 1.0, 'var': 1000}
+    # The report header carries its generation time, so it is rendered fresh every call
     report = generate_risk_report(positions, metrics, compliance_thresholds)
     await update.message.reply_text(report, parse_mode='HTML')
 
@@ -273,7 +501,7 @@ async def performance_report(update: Update, context: ContextTypes.DEFAULT_TYPE)
     # Mock hedge logs and pnl data
     hedge_logs = pd.DataFrame({'cost': [10, 12, 8, 11]})
     pnl_data = {'pnl': [100, 120, 110, 130], 'hedged_pnl': [90, 115, 108, 125]}
-    report = generate_performance_report(hedge_logs, pnl_data)
+    report = cached_report(generate_performance_report, hedge_logs, pnl_data)
     await update.message.reply_text(report, parse_mode='HTML')
 
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -291,43 +519,20 @@ async def orders_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def set_thresholds_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text("Not implemented yet.")
 
-# --- ASYNC VERSIONS for hedge_now and hedge_status ---
-from execution.execution_engine import ExecutionEngine
-engine = ExecutionEngine()
-
-async def hedge_now(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    args = context.args
-    if len(args) != 3:
-        await update.message.reply_text("Usage: /hedge_now <asset> <size> <side>")
-        return
-    asset, size, side = args[0], float(args[1]), args[2]
-    await update.message.reply_text(f"\U0001F4CD Executing Hedge: {asset} | Size: {size} | Side: {side.title()}...")
-    # Simulate execution (replace with real logic as needed)
-    result = engine.execute_perpetual_hedge(asset, size, side)
-    price = result.get('price', 0)
-    slippage = result.get('slippage', 0)
-    cost = result.get('cost', 0)
-    msg = (f"\u2705 Executed at ${price:,.2f} | Slippage: {slippage/price*100 if price else 0:.2f}% | Cost: ${cost:.2f}")
-    await update.message.reply_text(msg)
-
-async def hedge_status(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    args = context.args
-    if len(args) != 1:
-        await update.message.reply_text("Usage: /hedge_status <asset>")
-        return
-    asset = args[0].upper()
-    # Simulate lookup (replace with real logic as needed)
-    last = {'timestamp': '2025-07-11T16:00:00Z', 'size': 1, 'side': 'sell', 'price': 57000, 'cost': 100, 'slippage': 0.5}
-    msg = (f"Last Hedge for {asset}:\n"
-           f"Time: {last['timestamp']}\n"
-           f"Size: {last['size']} | Side: {last['side']}\n"
-           f"Price: ${last['price']:,.2f} | Cost: ${last['cost']:.2f}\n"
-           f"Slippage: {last['slippage']:.4f}")
-    await update.message.reply_text(msg)
-
 def main():
     logger.info("Starting Telegram bot...")
-    application = ApplicationBuilder().token(TELEGRAM_BOT_TOKEN).build()
+    if HAS_UVLOOP:
+        uvloop.install()
+    warm_up_kernels()
+    builder = (
+        ApplicationBuilder().token(TELEGRAM_BOT_TOKEN)
+        .connection_pool_size(BOT_POOL_SIZE).pool_timeout(BOT_POOL_TIMEOUT_S)
+        .get_updates_connection_pool_size(1).get_updates_pool_timeout(UPDATES_POOL_TIMEOUT_S)
+        .post_init(on_startup).post_shutdown(on_shutdown)
+    )
+    if HAS_RATE_LIMITER:
+        builder = builder.rate_limiter(AIORateLimiter())
+    application = builder.build()
     application.add_handler(CommandHandler("start", start))
     application.add_handler(CommandHandler("health", health))
     application.add_handler(CommandHandler("risk_summary", risk_summary))
@@ -336,7 +541,6 @@ def main():
     application.add_handler(CommandHandler("hedge_now", hedge_now))
     application.add_handler(CommandHandler("hedge_status", hedge_status))
     application.add_handler(CallbackQueryHandler(button_callback))
-    application.add_handler(CallbackQueryHandler(hedge_callback_handler))
     application.add_handler(CommandHandler("positions", positions_command))
     application.add_handler(CommandHandler("orders", orders_command))
     application.add_handler(CommandHandler("set_thresholds", set_thresholds_command))
@@ -0,0 +1,142 @@
+import asyncio
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+from utils.logger import logger
+
+# Telegram rejects messages longer than this
+TELEGRAM_MAX_CHARS = 4096
+FLUSH_DELAY_S = 0.05
+
+class TelegramBatcher:
+    """
+    Defers hedge alerts for a short window and sends one digest per chat,
+    so a burst of executions costs one send_message call per chat instead of one per fill.
+    """
+    def __init__(self, bot, flush_delay_s: float = FLUSH_DELAY_S, separator: str = "\n"):
+        self.bot = bot
+        self.flush_delay_s = flush_delay_s
+        self.separator = separator
+        self._queue: List[Tuple[int, str]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: set = set()
+
+    def bind(self, loop: asyncio.AbstractEventLoop):
+        """
+        Attach to an event loop so submit() can be called from worker threads.
+        """
+        self._loop = loop
+
+    def submit(self, chat_id, msg: str):
+        """
+        Queue a message; the first message in a window schedules the flush.
+        Safe to call from the loop or (after bind) from another thread.
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is None:
+            if self._loop is None:
+                raise RuntimeError("TelegramBatcher.submit needs a running event loop or bind(loop)")
+            self._loop.call_soon_threadsafe(self._enqueue, chat_id, msg)
+            return
+        self._loop = loop
+        self._enqueue(chat_id, msg)
+
+    async def asubmit(self, chat_id, msg: str):
+        self.submit(chat_id, msg)
+
+    def _enqueue(self, chat_id, msg: str):
+        self._queue.append((chat_id, msg))
+        if self._flush_handle is None:
+            self._flush_handle = self._loop.call_later(self.flush_delay_s, self._schedule_flush)
+
+    def _schedule_flush(self):
+        task = self._loop.create_task(self._flush())
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    @staticmethod
+    def _digests(messages: List[str], separator: str, limit: int = TELEGRAM_MAX_CHARS) -> List[str]:
+        """
+        Join messages into as few chunks as possible without exceeding limit;
+        a single oversized message is split on its own.
+        """
+        digests, current = [], ""
+        for msg in messages:
+            while len(msg) > limit:
+                if current:
+                    digests.append(current)
+                    current = ""
+                digests.append(msg[:limit])
+                msg = msg[limit:]
+            candidate = f"{current}{separator}{msg}" if current else msg
+            if len(candidate) > limit:
+                digests.append(current)
+                current = msg
+            else:
+                current = candidate
+        if current:
+            digests.append(current)
+        return digests
+
+    async def _flush(self):
+        self._flush_handle = None
+        queue, self._queue = self._queue, []
+        if not queue:
+            return []
+        by_chat: Dict[object, List[str]] = defaultdict(list)
+        for chat_id, msg in queue:
+            by_chat[chat_id].append(msg)
+        sends = [self.bot.send_message(chat_id=chat_id, text=digest)
+                 for chat_id, msgs in by_chat.items()
+                 for digest in self._digests(msgs, self.separator)]
+        results = await asyncio.gather(*sends, return_exceptions=True)
+        for r in results:
+            if isinstance(r, Exception):
+                logger.error(f"Telegram digest send failed: {r}")
+        return results
+
+    async def flush(self):
+        """
+        Send everything queued now (e.g. on shutdown).
+        """
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+        await self._flush()
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+
+def _unit_test():
+    class FakeBot:
+        def __init__(self):
+            self.sent = []
+
+        async def send_message(self, chat_id, text):
+            self.sent.append((chat_id, text))
+
+    async def run():
+        bot = FakeBot()
+        batcher = TelegramBatcher(bot)
+        for i in range(5):
+            batcher.submit(1, f"fill {i}")
+        await batcher.asubmit(2, "other chat")
+        await asyncio.sleep(0.1)
+        assert sorted(c for c, _ in bot.sent) == [1, 2], bot.sent
+        assert dict(bot.sent)[1].count("fill") == 5
+        batcher.submit(1, "x" * 5000)
+        await batcher.flush()
+        assert [len(t) for _, t in bot.sent[2:]] == [4096, 904]
+        # submit from a worker thread once bound
+        batcher.bind(asyncio.get_running_loop())
+        t = threading.Thread(target=batcher.submit, args=(3, "threaded"))
+        t.start(); t.join()
+        await asyncio.sleep(0.1)
+        assert bot.sent[-1] == (3, "threaded")
+    asyncio.run(run())
+    print("TelegramBatcher unit test passed.")
+
+if __name__ == "__main__":
+    _unit_test()
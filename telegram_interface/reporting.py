@@ -5,7 +5,6 @@ from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, InputMe
 from telegram.ext import CallbackContext, CommandHandler, CallbackQueryHandler
 from analytics.reporting import generate_hedge_report, plot_risk_metrics_over_time
 from risk_engine.risk_metrics import aggregate_portfolio_risks, calculate_var
-import matplotlib.pyplot as plt
 from dotenv import load_dotenv
 
 load_dotenv(dotenv_path=".env.local")
@@ -65,8 +64,7 @@ def send_threshold_breach_alert(context: CallbackContext, asset: str, net_delta:
 
 # --- Analytics Charts ---
 def send_risk_chart(update: Update, context: CallbackContext, risk_history, metric: str = "delta"):
-    if USE_HEADLESS:
-        plt.switch_backend('Agg')
+    # Rendered on a backend-independent Figure, so no pyplot backend switch is needed
     buf = io.BytesIO()
     plot_risk_metrics_over_time(risk_history, metric, out_path=buf)
     buf.seek(0)
@@ -1,154 +1,332 @@
 import os
-import threading
+import math
 import time
+import random
+import asyncio
+from collections import OrderedDict
+from functools import lru_cache
+import numpy as np
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import Updater, CommandHandler, CallbackQueryHandler, CallbackContext
+from telegram.ext import ApplicationBuilder, CommandHandler, CallbackQueryHandler, ContextTypes, MessageHandler, filters
 from utils.logger import logger
-from exchange_api.deribit_api import DeribitClient
-from risk_engine.risk_metrics import (
-    calculate_delta, calculate_gamma, calculate_vega, calculate_theta,
-    aggregate_portfolio_risks, calculate_var
-)
+from exchange_api.deribit_api import DeribitClient, parse_option_instrument
+from exchange_api.ws_cache import tob_cache, HAS_WEBSOCKETS
+from config import SYMBOL_MAPPINGS
+from risk_engine.risk_metrics import aggregate_greeks_arrays
+from telegram_interface.batcher import TelegramBatcher
 from hedging_engine import HedgingEngine
-import json
 from dotenv import load_dotenv
 
+try:
+    import uvloop  # faster event loop for many concurrent chats and Deribit requests
+    HAS_UVLOOP = True
+except ImportError:
+    HAS_UVLOOP = False
+
 load_dotenv(dotenv_path=".env.local")
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 USE_MOCK = os.getenv("USE_MOCK_DERIBIT", "False").lower() == "true"
+MONITOR_INTERVAL_S = 30
+# After a failed tick, skip ticks for 30, 60, 120, ... s (capped, jittered +/-50%) so chats do not retry in lockstep
+MONITOR_BACKOFF_MAX_S = 300.0
+# Updates from different chats are handled concurrently on the event loop
+CONCURRENT_UPDATES = 32
+MOCK_SPOT = 57000.0
+RISK_FREE_RATE = 0.05
+YEAR_S = 365 * 24 * 3600
+# Legs at or past expiry are priced an hour out instead of dividing by zero
+MIN_T_YEARS = 1 / (365 * 24)
+# Long-poll getUpdates on its own connection; reads allow the poll window plus network latency
+POLL_TIMEOUT_S = 20
+BOT_POOL_SIZE = 32
+CONNECT_TIMEOUT_S = 5
+READ_TIMEOUT_S = 25
+HELP_TEXT = "Use /monitor_risk, /stop, /hedge_now, /hedge_status, /auto_hedge"
 
+# chat_id -> repeating monitor Job on the application's JobQueue
 monitoring_tasks = {}
 user_monitor_context = {}
+# Settings of chats with no running monitor are dropped after a day without interaction
+CONTEXT_TTL_S = 24 * 3600
+CONTEXT_SWEEP_INTERVAL_S = 3600
+
+# Recently handled callback query ids (redelivered updates) and alert messages whose hedge is running (double clicks)
+SEEN_CALLBACKS_SIZE = 1024
+_seen_callbacks = OrderedDict()
+_hedges_in_flight = set()
+
+async def _deribit(context: ContextTypes.DEFAULT_TYPE) -> DeribitClient:
+    """
+    One authenticated DeribitClient per application, kept in bot_data and refreshed only when its token expires.
+    """
+    client = context.bot_data.get("deribit")
+    if client is None:
+        client = context.bot_data["deribit"] = DeribitClient()
+    if client.is_expired():
+        await client.authenticate()
+    return client
+
+async def _on_startup(application):
+    # Hedge notifications are submitted from worker threads, so the batcher needs the loop up front
+    application.bot_data["alert_batcher"].bind(asyncio.get_running_loop())
+    # HedgingEngine routes on the streamed books; without websockets it keeps its fallback books
+    if HAS_WEBSOCKETS:
+        tob_cache.start(list(SYMBOL_MAPPINGS))
+    else:
+        logger.warning("websockets is not installed; hedges will not use streamed order books")
+
+async def _shutdown(application):
+    await application.bot_data["alert_batcher"].flush()
+    await tob_cache.stop()
+    client = application.bot_data.pop("deribit", None)
+    if client is not None:
+        await client.close()
+
+async def _run_hedge(context: ContextTypes.DEFAULT_TYPE, chat_id, asset: str, size: float) -> dict:
+    # HedgingEngine is synchronous; run it off the loop. Its execution alerts go through the batcher,
+    # so hedges fired together for one chat arrive as one digest instead of one message each.
+    # The shared engine holds no per-order state, so concurrent worker threads can use it.
+    engine = context.bot_data["hedge_engine"]
+    batcher = context.bot_data["alert_batcher"]
+    market_data = {"option_delta": 1}
+    hedge_size = engine.compute_optimal_hedge_size({"delta": size}, market_data, strategy="perpetual")
+    return await asyncio.to_thread(engine.execute_hedge, "perpetual", asset, hedge_size,
+                                   notify=lambda msg: batcher.submit(chat_id, msg))
+
+# Only the Hedge Now payload varies between alerts; a steady book re-sends the same markup
+ALERT_KEYBOARD_CACHE_SIZE = 64
+_STATIC_ALERT_ROWS = (
+    (InlineKeyboardButton("View Analytics", callback_data="view_analytics"),),
+    (InlineKeyboardButton("Adjust Threshold", callback_data="adjust_threshold"),),
+)
+
+@lru_cache(maxsize=ALERT_KEYBOARD_CACHE_SIZE)
+def _alert_keyboard(asset: str, delta: str) -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup(((InlineKeyboardButton("Hedge Now", callback_data=f"hedge_now|{asset}|{delta}"),),) + _STATIC_ALERT_ROWS)
+
+_BREACH_TMPL = (
+    "⚠️ Risk Threshold Breached: Delta = {delta:.2f} is beyond ±{threshold}. "
+    "Recommended Hedge: {hedge:.2f} {asset}"
+)
+
+# --- Monitor job ---
+async def check_once(context: ContextTypes.DEFAULT_TYPE):
+    chat_id = context.job.chat_id
+    ctx = user_monitor_context.get(chat_id)
+    if ctx is None:
+        return
+    asset, delta_threshold = ctx["asset"], ctx["delta_threshold"]
+    book = context.job.data
+    if time.monotonic() < book["resume_at"]:
+        return
+    try:
+        delta = ctx["position_size"]
+        if len(book["K"]):
+            client = await _deribit(context)
+            # Only spot and time to expiry move between ticks; the rest of the book arrays are reused as-is
+            book["S"].fill((await client.get_orderbook(f"{asset}-PERPETUAL")).get("mark_price") or MOCK_SPOT)
+            np.subtract(book["expiry"], time.time(), out=book["T"])
+            np.divide(book["T"], YEAR_S, out=book["T"])
+            np.maximum(book["T"], MIN_T_YEARS, out=book["T"])
+            delta += aggregate_greeks_arrays(book["S"], book["K"], book["T"], book["r"], book["sigma"], book["is_call"], book["size"])["delta"]
+        # Short and long exposure both breach; quiet ticks stop at this comparison
+        excess = abs(delta) - delta_threshold
+        if excess > 0:
+            reply_markup = _alert_keyboard(asset, f"{delta:.4f}")
+            msg = _BREACH_TMPL.format_map({"delta": delta, "threshold": delta_threshold,
+                                           "hedge": -math.copysign(excess, delta), "asset": asset})
+            await context.bot.send_message(chat_id=chat_id, text=msg, reply_markup=reply_markup)
+        book["backoff"] = MONITOR_INTERVAL_S
+    except Exception as e:
+        logger.error(f"Monitor error: {e}")
+        book["resume_at"] = time.monotonic() + min(book["backoff"], MONITOR_BACKOFF_MAX_S) * random.uniform(0.5, 1.5)
+        book["backoff"] *= 2
+
+def _touch(chat_id) -> dict:
+    ctx = user_monitor_context.setdefault(chat_id, {})
+    ctx["last_seen"] = time.monotonic()
+    return ctx
+
+async def _evict_stale_contexts(context: ContextTypes.DEFAULT_TYPE):
+    cutoff = time.monotonic() - CONTEXT_TTL_S
+    stale = [chat_id for chat_id, ctx in user_monitor_context.items()
+             if chat_id not in monitoring_tasks and ctx.get("last_seen", 0) < cutoff]
+    for chat_id in stale:
+        del user_monitor_context[chat_id]
+
+def _monitor_book(n_options: int = 0) -> dict:
+    """
+    Option legs of a monitored book as parallel arrays, built once per /monitor_risk,
+    plus the job's error backoff state.
+    The perpetual leg is carried as position_size and adds its size to delta.
+    """
+    book = {f: np.zeros(n_options) for f in ("S", "K", "T", "r", "sigma", "size", "expiry")}
+    book["is_call"] = np.zeros(n_options, dtype=bool)
+    book["backoff"] = MONITOR_INTERVAL_S
+    book["resume_at"] = 0.0
+    return book
+
+async def _load_book(client: DeribitClient, asset: str) -> dict:
+    """
+    Account option positions in asset as a monitor book; implied vols are the marks at load time.
+    """
+    legs = [pos for pos in await client.get_positions(asset, kind="option") if pos.get("kind") == "option"]
+    order_books = await asyncio.gather(*(client.get_orderbook(pos["instrument_name"]) for pos in legs))
+    book = _monitor_book(len(legs))
+    for i, (pos, ob) in enumerate(zip(legs, order_books)):
+        book["expiry"][i], book["K"][i], book["is_call"][i] = parse_option_instrument(pos["instrument_name"])
+        book["size"][i] = pos["size"]
+        book["sigma"][i] = ob["mark_iv"] / 100
+    book["r"].fill(RISK_FREE_RATE)
+    return book
+
+def _cancel_monitor(chat_id) -> bool:
+    job = monitoring_tasks.pop(chat_id, None)
+    if job is None:
+        return False
+    job.schedule_removal()
+    return True
 
 # --- Command Handlers ---
-def monitor_risk(update: Update, context: CallbackContext):
+async def monitor_risk(update: Update, context: ContextTypes.DEFAULT_TYPE):
     args = context.args
     if len(args) < 3:
-        update.message.reply_text("Usage: /monitor_risk <asset> <position_size> <delta_threshold>")
+        await update.message.reply_text("Usage: /monitor_risk <asset> <position_size> <delta_threshold>")
         return
     asset = args[0].upper()
     position_size = float(args[1])
     delta_threshold = float(args[2])
     chat_id = update.effective_chat.id
     user_monitor_context[chat_id] = {"asset": asset, "position_size": position_size, "delta_threshold": delta_threshold}
-    update.message.reply_text(f"Started monitoring {asset} with position size {position_size} and delta threshold {delta_threshold}.")
-    def monitor_loop():
-        while monitoring_tasks.get(chat_id):
-            try:
-                client = DeribitClient()
-                client.authenticate()
-                positions = [{"instrument_name": f"{asset}-PERPETUAL", "size": position_size, "type": "spot", "option_type": None, "S": 57000, "K": 0, "T": 0, "r": 0, "sigma": 0}]
-                for pos in positions:
-                    pos["delta"] = pos["size"]
-                agg = aggregate_portfolio_risks(positions)
-                breached = agg['delta'] > delta_threshold
-                if breached:
-                    keyboard = [
-                        [InlineKeyboardButton("Hedge Now", callback_data=f"hedge_now|{asset}|{agg['delta']}")],
-                        [InlineKeyboardButton("View Analytics", callback_data="view_analytics")],
-                        [InlineKeyboardButton("Adjust Threshold", callback_data="adjust_threshold")]
-                    ]
-                    reply_markup = InlineKeyboardMarkup(keyboard)
-                    msg = (
-                        f"⚠️ Risk Threshold Breached: Delta = {agg['delta']:.2f} > {delta_threshold}. "
-                        f"Recommended Hedge: {-agg['delta'] + delta_threshold:.2f} {asset}"
-                    )
-                    context.bot.send_message(chat_id=chat_id, text=msg, reply_markup=reply_markup)
-                time.sleep(30)
-            except Exception as e:
-                logger.error(f"Monitor error: {e}")
-                time.sleep(30)
-    monitoring_tasks[chat_id] = True
-    threading.Thread(target=monitor_loop, daemon=True).start()
-
-def hedge_now(update: Update, context: CallbackContext):
+    _touch(chat_id)
+    await update.message.reply_text(f"Started monitoring {asset} with position size {position_size} and delta threshold {delta_threshold}.")
+    try:
+        book = await _load_book(await _deribit(context), asset)
+    except Exception as e:
+        # Still monitor the perpetual leg; option legs join on the next /monitor_risk
+        logger.error(f"Could not load {asset} option positions: {e}")
+        book = _monitor_book()
+    # All chats share the event loop's timers instead of one sleeping thread each
+    _cancel_monitor(chat_id)
+    monitoring_tasks[chat_id] = context.job_queue.run_repeating(
+        check_once, interval=MONITOR_INTERVAL_S, first=0, chat_id=chat_id, data=book,
+        name=f"monitor-{chat_id}")
+
+async def stop_monitoring(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if _cancel_monitor(update.effective_chat.id):
+        await update.message.reply_text("Stopped risk monitoring.")
+    else:
+        await update.message.reply_text("No active risk monitoring.")
+
+async def hedge_now(update: Update, context: ContextTypes.DEFAULT_TYPE):
     args = context.args
     if len(args) < 2:
-        update.message.reply_text("Usage: /hedge_now <asset> <size>")
+        await update.message.reply_text("Usage: /hedge_now <asset> <size>")
         return
     asset = args[0].upper()
     size = float(args[1])
-    engine = HedgingEngine(logger=logger)
-    # Mock market data
-    market_data = {"option_delta": 1}
-    hedge_size = engine.compute_optimal_hedge_size({"delta": size}, market_data, strategy="perpetual")
-    order = engine.execute_hedge("perpetual", asset, hedge_size, notify=lambda msg: update.message.reply_text(msg))
-    update.message.reply_text(f"Hedge order sent: {order}")
+    order = await _run_hedge(context, update.effective_chat.id, asset, size)
+    await update.message.reply_text(f"Hedge order sent: {order}")
 
-def hedge_status(update: Update, context: CallbackContext):
+async def hedge_status(update: Update, context: ContextTypes.DEFAULT_TYPE):
     args = context.args
     if len(args) < 1:
-        update.message.reply_text("Usage: /hedge_status <asset>")
+        await update.message.reply_text("Usage: /hedge_status <asset>")
         return
     asset = args[0].upper()
     # Mock: show current exposure
-    update.message.reply_text(f"Current exposure for {asset}: 0.0 (mock)")
+    await update.message.reply_text(f"Current exposure for {asset}: 0.0 (mock)")
 
-def auto_hedge(update: Update, context: CallbackContext):
+async def auto_hedge(update: Update, context: ContextTypes.DEFAULT_TYPE):
     args = context.args
     if len(args) < 2:
-        update.message.reply_text("Usage: /auto_hedge <strategy> <threshold>")
+        await update.message.reply_text("Usage: /auto_hedge <strategy> <threshold>")
         return
     strategy = args[0]
     threshold = float(args[1])
-    update.message.reply_text(f"Auto-hedging enabled: {strategy} with threshold {threshold}")
+    await update.message.reply_text(f"Auto-hedging enabled: {strategy} with threshold {threshold}")
 
-def button_callback(update: Update, context: CallbackContext):
+async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
-    query.answer()
+    if query.id in _seen_callbacks:
+        return
+    _seen_callbacks[query.id] = None
+    if len(_seen_callbacks) > SEEN_CALLBACKS_SIZE:
+        _seen_callbacks.popitem(last=False)
+    await query.answer()
     data = query.data
     chat_id = query.message.chat_id
     if data.startswith("hedge_now"):
-        _, asset, delta = data.split("|")
-        engine = HedgingEngine(logger=logger)
-        market_data = {"option_delta": 1}
-        hedge_size = engine.compute_optimal_hedge_size({"delta": float(delta)}, market_data, strategy="perpetual")
-        order = engine.execute_hedge("perpetual", asset, hedge_size, notify=lambda msg: query.edit_message_text(msg))
-        query.edit_message_text(f"Hedge order sent: {order}")
+        key = (chat_id, query.message.message_id)
+        if key in _hedges_in_flight:
+            return
+        _hedges_in_flight.add(key)
+        try:
+            _, asset, delta = data.split("|", 2)
+            order = await _run_hedge(context, chat_id, asset, float(delta))
+            await query.edit_message_text(f"Hedge order sent: {order}")
+        finally:
+            _hedges_in_flight.discard(key)
     elif data == "view_analytics":
-        query.edit_message_text("Portfolio Greeks and VaR: (mock)")
+        await query.edit_message_text("Portfolio Greeks and VaR: (mock)")
     elif data == "adjust_threshold":
-        query.edit_message_text("Send new delta threshold:")
-        user_monitor_context[chat_id]["awaiting_threshold"] = True
+        await query.edit_message_text("Send new delta threshold:")
+        _touch(chat_id)["awaiting_threshold"] = True
     else:
-        query.edit_message_text("Unknown action.")
+        await query.edit_message_text("Unknown action.")
 
-def handle_text(update: Update, context: CallbackContext):
+async def handle_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat_id = update.effective_chat.id
     ctx = user_monitor_context.get(chat_id, {})
     if ctx.get("awaiting_threshold"):
         try:
             new_threshold = float(update.message.text)
+            ctx = _touch(chat_id)
             ctx["delta_threshold"] = new_threshold
             ctx["awaiting_threshold"] = False
-            user_monitor_context[chat_id] = ctx
-            update.message.reply_text(f"Delta threshold updated to {new_threshold}.")
+            await update.message.reply_text(f"Delta threshold updated to {new_threshold}.")
         except Exception:
-            update.message.reply_text("Invalid threshold. Please send a number.")
+            await update.message.reply_text("Invalid threshold. Please send a number.")
+
+def _reply(text: str):
+    async def handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        await update.message.reply_text(text)
+    return handler
 
 def main():
-    updater = Updater(TELEGRAM_BOT_TOKEN, use_context=True)
-    dp = updater.dispatcher
-    dp.add_handler(CommandHandler("monitor_risk", monitor_risk))
-    dp.add_handler(CommandHandler("hedge_now", hedge_now))
-    dp.add_handler(CommandHandler("hedge_status", hedge_status))
-    dp.add_handler(CommandHandler("auto_hedge", auto_hedge))
-    dp.add_handler(CallbackQueryHandler(button_callback))
-    dp.add_handler(CommandHandler("help", lambda u, c: u.message.reply_text("Use /monitor_risk, /hedge_now, /hedge_status, /auto_hedge")))
-    dp.add_handler(CommandHandler("start", lambda u, c: u.message.reply_text("Welcome to the Risk Bot!")))
-    dp.add_handler(CommandHandler("stop", lambda u, c: u.message.reply_text("Not implemented yet.")))
-    dp.add_handler(CommandHandler("set_thresholds", lambda u, c: u.message.reply_text("Not implemented yet.")))
-    dp.add_handler(CommandHandler("positions", lambda u, c: u.message.reply_text("Not implemented yet.")))
-    dp.add_handler(CommandHandler("orders", lambda u, c: u.message.reply_text("Not implemented yet.")))
-    dp.add_handler(CommandHandler("risk_report", lambda u, c: u.message.reply_text("Not implemented yet.")))
-    dp.add_handler(CommandHandler("hedge_history", lambda u, c: u.message.reply_text("Not implemented yet.")))
-    dp.add_handler(CommandHandler("hedge_status", hedge_status))
-    dp.add_handler(CommandHandler("auto_hedge", auto_hedge))
-    dp.add_handler(CommandHandler("monitor_risk", monitor_risk))
-    dp.add_handler(CommandHandler("hedge_now", hedge_now))
-    dp.add_handler(CommandHandler("help", lambda u, c: u.message.reply_text("Use /monitor_risk, /hedge_now, /hedge_status, /auto_hedge")))
-    updater.start_polling()
-    updater.idle()
+    if HAS_UVLOOP:
+        uvloop.install()
+    application = (
+        ApplicationBuilder()
+        .token(TELEGRAM_BOT_TOKEN)
+        .concurrent_updates(CONCURRENT_UPDATES)
+        .connection_pool_size(BOT_POOL_SIZE)
+        .connect_timeout(CONNECT_TIMEOUT_S)
+        .read_timeout(READ_TIMEOUT_S)
+        .get_updates_connect_timeout(CONNECT_TIMEOUT_S)
+        .get_updates_read_timeout(READ_TIMEOUT_S)
+        .post_init(_on_startup)
+        .post_shutdown(_shutdown)
+        .build()
+    )
+    application.bot_data["hedge_engine"] = HedgingEngine(logger=logger)
+    application.bot_data["alert_batcher"] = TelegramBatcher(application.bot)
+    application.job_queue.run_repeating(_evict_stale_contexts, interval=CONTEXT_SWEEP_INTERVAL_S)
+    application.add_handler(CommandHandler("monitor_risk", monitor_risk))
+    application.add_handler(CommandHandler("stop", stop_monitoring))
+    application.add_handler(CommandHandler("hedge_now", hedge_now))
+    application.add_handler(CommandHandler("hedge_status", hedge_status))
+    application.add_handler(CommandHandler("auto_hedge", auto_hedge))
+    application.add_handler(CallbackQueryHandler(button_callback))
+    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_text))
+    application.add_handler(CommandHandler("help", _reply(HELP_TEXT)))
+    application.add_handler(CommandHandler("start", _reply("Welcome to the Risk Bot!")))
+    for command in ("set_thresholds", "positions", "orders", "risk_report", "hedge_history"):
+        application.add_handler(CommandHandler(command, _reply("Not implemented yet.")))
+    application.run_polling(
+        poll_interval=0.0, timeout=POLL_TIMEOUT_S, bootstrap_retries=-1,
+        allowed_updates=[Update.MESSAGE, Update.CALLBACK_QUERY],
+    )
 
 if __name__ == "__main__":
     main()
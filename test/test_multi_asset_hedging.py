@@ -1,19 +1,31 @@
 import pandas as pd
 import numpy as np
+import pytest
 from portfolio.multi_asset_hedging import (
     calculate_cross_asset_correlation,
+    calculate_cross_asset_correlation_arr,
     compute_portfolio_exposure,
     optimal_hedge_allocation
 )
+from portfolio.types import Position
 
-def test_correlation():
-    price_data = {
-        'BTC': [10000, 10100, 10200, 10150, 10300],
-        'ETH': [200, 202, 204, 203, 207]
-    }
-    corr = calculate_cross_asset_correlation(price_data)
+PRICE_DATA = {
+    'BTC': [10000, 10100, 10200, 10150, 10300],
+    'ETH': [200, 202, 204, 203, 207]
+}
+
+@pytest.fixture(scope="module")
+def price_df():
+    return pd.DataFrame(PRICE_DATA)
+
+def test_correlation(price_df):
+    corr = calculate_cross_asset_correlation(price_df)
     print('Correlation matrix:\n', corr)
     assert corr.shape == (2, 2)
+    expected = price_df.pct_change().corr().to_numpy()
+    assert np.allclose(corr.to_numpy(), expected)
+    assert np.allclose(calculate_cross_asset_correlation(PRICE_DATA).to_numpy(), expected)
+    assert np.allclose(calculate_cross_asset_correlation_arr(price_df.to_numpy()), expected)
 
 def test_exposure():
     positions = [
@@ -25,6 +37,8 @@ def test_exposure():
     print('Exposures:', exposures)
     assert abs(exposures['BTC']['delta'] - 0.5) < 1e-6
     assert abs(exposures['ETH']['delta'] + 0.5) < 1e-6
+    # Positions converted at ingest aggregate the same way
+    assert compute_portfolio_exposure([Position.from_dict(p) for p in positions]) == exposures
 
 def test_optimal_hedge():
     exposures = {
@@ -37,7 +51,7 @@ def test_optimal_hedge():
     assert 'BTC' in alloc and 'ETH' in alloc
 
 if __name__ == "__main__":
-    test_correlation()
+    test_correlation(pd.DataFrame(PRICE_DATA))
     test_exposure()
     test_optimal_hedge()
     print('All multi-asset hedging tests passed.')
@@ -0,0 +1,18 @@
+import time
+
+# (second, formatted prefix) swapped as one tuple so readers never see a mismatched pair
+_prefix_cache = (None, '')
+
+def fast_utcnow_iso() -> str:
+    """
+    UTC now as 'YYYY-MM-DDTHH:MM:SS.ffffff', like datetime.utcnow().isoformat()
+    but re-running strftime only when the second changes.
+    """
+    global _prefix_cache
+    ns = time.time_ns()
+    sec = ns // 1_000_000_000
+    cached_sec, prefix = _prefix_cache
+    if sec != cached_sec:
+        prefix = time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(sec))
+        _prefix_cache = (sec, prefix)
+    return f"{prefix}.{(ns % 1_000_000_000) // 1000:06d}"
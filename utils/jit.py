@@ -0,0 +1,16 @@
+try:
+    from numba import njit, prange
+    from numba.core.errors import NumbaError
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+    prange = range
+
+    class NumbaError(Exception):
+        """Never raised without numba; keeps `except NumbaError` clauses valid."""
+
+    def njit(*args, **kwargs):
+        """No-op stand-in for numba.njit, usable bare or with options."""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda f: f
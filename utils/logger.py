@@ -1,23 +1,49 @@
+import atexit
 import logging
+import logging.handlers
+import os
+import queue
 import sys
 
+LOGGER_NAME = 'quant'
+LOG_PATH = 'app.log'
+LOG_MAX_BYTES = 50_000_000
+LOG_BACKUP_COUNT = 5
+# Console and file verbosity are set independently; the file keeps warnings and errors by default
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+FILE_LOG_LEVEL = os.getenv('FILE_LOG_LEVEL', 'WARNING').upper()
+
+# Background thread draining the log queue; kept at module level so it is not collected
+_listener = None
+
 def setup_logger():
     """Set up a basic logger with file and console output."""
-    logger = logging.getLogger(__name__)
-    logger.setLevel(logging.INFO)
+    global _listener
+    logger = logging.getLogger(LOGGER_NAME)
+    # Reloads and repeat calls reuse the handlers (and listener) already attached
+    if logger.handlers:
+        return logger
+    logger.propagate = False
 
     # Create handlers
     console_handler = logging.StreamHandler(sys.stdout)
-    file_handler = logging.FileHandler('app.log')
+    file_handler = logging.handlers.RotatingFileHandler(LOG_PATH, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT)
+    console_handler.setLevel(LOG_LEVEL)
+    file_handler.setLevel(FILE_LOG_LEVEL)
+    # Records below both handler levels are dropped before they are queued
+    logger.setLevel(min(console_handler.level, file_handler.level))
 
     # Create formatters and add it to handlers
     formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
     console_handler.setFormatter(formatter)
     file_handler.setFormatter(formatter)
 
-    # Add handlers to the logger
-    logger.addHandler(console_handler)
-    logger.addHandler(file_handler)
+    # Callers only enqueue records; the listener thread does the console and disk writes
+    log_queue = queue.Queue(-1)
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    _listener = logging.handlers.QueueListener(log_queue, console_handler, file_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
 
     return logger
 